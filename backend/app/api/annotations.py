@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
@@ -6,12 +9,15 @@ from ..database import get_db
 from ..schemas.annotation import Annotation, AnnotationCreate, AnnotationUpdate, CommentItem
 from ..services.auth import get_current_user
 from ..services.annotation import (
+    AnnotationSave,
     create_or_update_annotation,
     get_annotation,
     get_document_annotations,
     delete_comment_from_annotation,
     delete_user_annotation
 )
+from ..services.search import search_comments
+from ..services import write_queue
 from ..models.user import User
 
 # 标注保存请求模型
@@ -23,6 +29,35 @@ class AnnotationSaveRequest(BaseModel):
 
 router = APIRouter()
 
+@router.get("/search")
+async def search_annotation_comments(
+    q: str = Query(..., min_length=1, max_length=200),
+    field: str = Query("all", pattern="^(all|text|selection)$"),
+    match: str = Query("any", pattern="^(any|all)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    全文检索标注评论（仅管理员）
+
+    检索评论内容（text）和选中的文本（selection），多个检索词以空格分隔，
+    match=any 命中任一即可，match=all 需全部命中；翻页时传入上一页返回的 next_cursor
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有管理员可以检索标注评论"
+        )
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="检索词不能为空")
+
+    try:
+        return search_comments(db, q, field=field, match_all=(match == "all"), limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/{document_id}")
 async def save_annotation(
     document_id: int,
@@ -38,6 +73,15 @@ async def save_annotation(
             selection = comment.get("selection") or comment.get("range", "")
             comment_items.append(CommentItem(text=comment["text"], selection=str(selection)))
 
+    if write_queue.GROUP_COMMIT:
+        # 组提交：与同一时段的其他保存在一个事务中提交，提交后返回
+        comments_json = json.dumps([comment.dict() for comment in comment_items]) if comment_items else "[]"
+        annotation_id = await asyncio.wrap_future(write_queue.annotation_write_queue.submit(AnnotationSave(
+            document_id, current_user.id, request.evaluation, comments_json,
+            request.time_spent, request.is_completed
+        )))
+        return {"message": "标注保存成功", "annotation_id": annotation_id}
+
     annotation = create_or_update_annotation(
         db=db,
         document_id=document_id,
@@ -61,7 +105,6 @@ async def get_user_annotation(
         return {"evaluation": None, "comments": []}
 
     # 解析评论JSON
-    import json
     comments = json.loads(annotation.comments) if annotation.comments else []
 
     return {
@@ -87,7 +130,6 @@ async def get_document_all_annotations(
     annotations = get_document_annotations(db, document_id)
     result = []
     for annotation in annotations:
-        import json
         comments = json.loads(annotation.comments) if annotation.comments else []
         result.append({
             "annotation_id": annotation.id,
@@ -125,7 +167,6 @@ async def delete_comment(
         )
 
     # 解析更新后的评论数据返回给前端
-    import json
     comments = json.loads(result.comments) if result.comments else []
 
     return {
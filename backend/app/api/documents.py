@@ -1,18 +1,38 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import json
+import tempfile
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
+from sqlalchemy.orm import Session, joinedload
 
 from ..database import get_db
-from ..schemas.document import Document, DocumentCreate, DocumentList, DocumentAssignment
+from ..schemas.document import Document, DocumentCreate, DocumentList, DocumentAssignment, BulkAssignment
 from ..services.auth import get_current_user
 from ..services.document import (
-    create_document, get_documents, get_document, get_document_with_annotation,
-    check_document_permission, assign_document, get_user_documents
+    create_document, get_documents, get_document,
+    check_document_permission, assign_document, get_user_documents,
+    get_content_refs, get_document_contents, get_paragraphs, document_etag, CONTENT_FIELDS,
+    SORT_COLUMNS
 )
+from ..services.annotation import get_annotation
+from .. import blob_store
+from ..responses import FastJSONResponse
+from ..services.dedup import find_similar_documents, get_duplicate_groups
+from ..services.ingest import ingest_batch, publish_imported, DEFAULT_BATCH_SIZE
+from ..services.search import search_documents
+from ..services.assignment import bulk_assign_documents
+from ..services.lease import lease_next_document, renew_lease, release_lease, claim_unassigned_document, LEASE_SECONDS
 from ..models.user import User
+from ..models.annotation import Annotation
 
 router = APIRouter()
 
+# 原子批量导入时请求体在内存中缓存的上限，超出后写入临时文件
+BULK_SPOOL_MEMORY = 16 << 20
+
 @router.post("/", response_model=Document)
 async def create_new_document(
     document: DocumentCreate,
@@ -28,23 +48,399 @@ async def create_new_document(
 
     return create_document(db, document)
 
+async def _iter_jsonl_lines(request: Request):
+    """逐行读取流式请求体，产出 (行号, 行内容)；跨多个分块的长行先收集各段，读到换行时一次拼接"""
+    pending = []
+    line_no = 0
+    async for chunk in request.stream():
+        *lines, rest = chunk.split(b"\n")
+        if lines:
+            pending.append(lines[0])
+            lines[0] = b"".join(pending)
+            pending = []
+            for line in lines:
+                line_no += 1
+                yield line_no, line
+        if rest:
+            pending.append(rest)
+    if pending:
+        yield line_no + 1, b"".join(pending)
+
+class _BulkImport:
+    """按批验证并写入JSONL行（同步执行，由接口放入线程池）；atomic 时全部行在一个事务中"""
+
+    def __init__(self, db: Session, overwrite: bool, atomic: bool, batch_size: int):
+        self.db = db
+        self.overwrite = overwrite
+        self.atomic = atomic
+        self.batch_size = batch_size
+        self.results = []
+        self.failed = False
+        self.batch = []
+        # 原子导入提交后统一推送文档计数变化
+        self.status_delta = Counter()
+
+    def add(self, line_no: int, line: bytes) -> bool:
+        """解析一行，返回是否已凑满一批（由调用方调用 flush）"""
+        if self.failed or not line.strip():
+            return False
+        try:
+            doc_data = json.loads(line)
+        except ValueError as e:
+            self.results.append({"key": line_no, "status": "invalid", "errors": [f"JSON解析失败: {e}"]})
+            if self.atomic:
+                self._fail()
+            return False
+        self.batch.append((line_no, doc_data))
+        return len(self.batch) >= self.batch_size
+
+    def flush(self):
+        batch, self.batch = self.batch, []
+        if not batch or self.failed:
+            return
+        try:
+            batch_results = ingest_batch(self.db, batch, overwrite=self.overwrite, commit=not self.atomic,
+                                         status_delta=self.status_delta)
+        except Exception as e:
+            self.db.rollback()
+            batch_results = [
+                {"key": key, "status": "error", "errors": [str(e)]} for key, _ in batch
+            ]
+        self.results.extend(batch_results)
+        if self.atomic and any(r["status"] in ("invalid", "error") for r in batch_results):
+            self._fail()
+
+    def finish(self):
+        self.flush()
+        if self.atomic and not self.failed:
+            self.db.commit()
+            publish_imported(self.results, self.status_delta)
+
+    def run(self, lines):
+        for line_no, line in lines:
+            if self.add(line_no, line):
+                self.flush()
+        self.finish()
+
+    def _fail(self):
+        self.failed = True
+        self.batch = []
+        self.db.rollback()
+
+@router.post("/bulk")
+async def bulk_create_documents(
+    request: Request,
+    overwrite: bool = False,
+    atomic: bool = False,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=900),
+    report: str = Query("summary", pattern="^(summary|lines)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    批量导入文档（仅管理员）
+
+    请求体为JSONL流，每行一个文档对象（字段同导入脚本），按批写入：
+    - 默认每批一个事务，出错的行不影响其他行
+    - atomic=true 时整个请求在一个事务中，任意一行失败则全部回滚
+    - report=lines 返回每行结果，默认只返回汇总和未成功导入的行
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有管理员可以创建文档"
+        )
+
+    importer = _BulkImport(db, overwrite, atomic, batch_size)
+    if atomic:
+        # 原子导入的事务从第一批写入持有写锁（见 app/write_lock.py）直到提交，不能跨越 await：
+        # 先把请求体读入临时文件，再在线程池中一次性写入，慢速上传期间不占用写锁和事件循环
+        with tempfile.SpooledTemporaryFile(max_size=BULK_SPOOL_MEMORY) as body:
+            async for chunk in request.stream():
+                body.write(chunk)
+            body.seek(0)
+            await run_in_threadpool(importer.run, enumerate(body, 1))
+    else:
+        async for line_no, line in _iter_jsonl_lines(request):
+            if importer.add(line_no, line):
+                await run_in_threadpool(importer.flush)
+        await run_in_threadpool(importer.finish)
+    results, failed = importer.results, importer.failed
+
+    for result in results:
+        result["line"] = result.pop("key")
+        if failed and result["status"] == "created":
+            result["status"] = "rolled_back"
+
+    counts = {"created": 0, "skipped": 0, "failed": 0}
+    for result in results:
+        if result["status"] in ("created", "skipped"):
+            counts[result["status"]] += 1
+        elif result["status"] != "rolled_back":
+            counts["failed"] += 1
+
+    response = {
+        "total": len(results),
+        **counts,
+        "committed": not (atomic and failed)
+    }
+    if report == "lines":
+        response["results"] = results
+    else:
+        response["failures"] = [r for r in results if r["status"] not in ("created", "skipped", "rolled_back")]
+    return response
+
+def document_list_filters(
+    status: Optional[str] = Query(None, pattern="^(pending|in_progress|completed)$"),
+    assigned_to: Optional[int] = None,
+    unassigned: bool = False,
+    annotation_status: Optional[str] = Query(None, pattern="^(未标注|进行中|已标注)$"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    updated_from: Optional[datetime] = None,
+    updated_to: Optional[datetime] = None,
+    sort: str = Query("id", pattern="^(" + "|".join(SORT_COLUMNS) + ")$"),
+    order: str = Query("asc", pattern="^(asc|desc)$")
+) -> dict:
+    """文档列表的筛选和排序参数"""
+    return {
+        "status": status, "assigned_to": assigned_to, "unassigned": unassigned,
+        "annotation_status": annotation_status,
+        "created_from": created_from, "created_to": created_to,
+        "updated_from": updated_from, "updated_to": updated_to,
+        "sort": sort, "order": order
+    }
+
 @router.get("/", response_model=List[DocumentList])
 async def read_documents(
     skip: int = 0,
     limit: int = 2000,
+    filters: dict = Depends(document_list_filters),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取文档列表，支持按状态、分配专家、标注状态、创建/更新时间筛选及排序
+
+    unassigned=true 只返回未分配的文档；sort 可选 id、title、status、created_at、
+    updated_at、word_count_source、word_count_generated，order 为 asc 或 desc
+    """
+    # 行已是 DocumentList 的字段，直接编码，不再经 response_model 校验
+    return FastJSONResponse(get_documents(db, skip=skip, limit=limit, user_id=current_user.id,
+                                          user_role=current_user.role, **filters))
+
+@router.get("/available", response_model=List[DocumentList])
+async def get_available_documents(
+    skip: int = 0,
+    limit: int = 1000,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """获取未分配的文档（供专家认领）"""
+    if current_user.role == "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="管理员不需要使用此接口"
+        )
+
+    # 只获取未分配的文档，标注状态批量查询
+    return FastJSONResponse(get_documents(db, skip=skip, limit=limit, user_id=current_user.id,
+                                          user_role=current_user.role, unassigned=True))
+
+@router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    field: str = Query("all", pattern="^(all|title|source|generated)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    全文检索文档（标题、原始素材、生成内容）
+
+    多个检索词以空格分隔，需同时命中；结果按相关度排序并带命中片段，
+    翻页时传入上一页返回的 next_cursor。专家只能检索到自己可访问的文档。
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="检索词不能为空")
+    try:
+        return search_documents(db, q, field=field, limit=limit, cursor=cursor,
+                                user_id=current_user.id, user_role=current_user.role)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/duplicates")
+async def read_duplicate_groups(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """列出近似重复文档组（仅管理员）"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有管理员可以查看重复文档"
+        )
+
+    return get_duplicate_groups(db, skip=skip, limit=limit)
+
+@router.get("/{document_id}/duplicates")
+async def read_document_duplicates(
+    document_id: int,
+    threshold: float = 0.8,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """查询与指定文档近似重复的文档（仅管理员）"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有管理员可以查看重复文档"
+        )
+
+    duplicates = find_similar_documents(db, document_id, threshold=threshold)
+    if duplicates is None:
+        raise HTTPException(status_code=404, detail="文档不存在或尚未建立重复索引")
+
+    return {"document_id": document_id, "duplicates": duplicates}
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """判断 If-None-Match 是否命中当前ETag（GET请求按弱比较）"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+def _parse_range(range_header: str, size: int):
+    """解析单段 Range 请求头，返回闭区间 (start, end)；无法满足时返回None"""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            start = max(size - int(end_text), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        return None
+    return start, end
+
+@router.get("/{document_id}/content/{field}")
+async def read_document_content(
+    document_id: int,
+    field: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return get_documents(db, skip=skip, limit=limit, user_id=current_user.id, user_role=current_user.role)
+    """
+    获取文档正文原文（text/plain）
+
+    正文位于文件存储时直接以文件发送，支持 Range 请求（通过mmap按字节范围读取）；
+    位于数据库时解压后返回。
+    """
+    if field not in CONTENT_FIELDS:
+        raise HTTPException(status_code=404, detail="正文类型不存在")
+
+    has_permission, document = check_document_permission(db, document_id, current_user.id, current_user.role)
+    if not has_permission:
+        raise HTTPException(status_code=403, detail="没有权限访问此文档")
+    if not document:
+        raise HTTPException(status_code=404, detail="文档不存在")
+
+    media_type = "text/plain; charset=utf-8"
+    digest = get_content_refs(db, document_id)[field]
+    etag = f'"{digest}"' if digest else document_etag(document, [], "content", field)
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if digest and not range_header:
+        return FileResponse(blob_store.blob_path(digest), media_type=media_type, headers=headers)
+
+    if digest:
+        size = blob_store.blob_size(digest)
+        data = None
+    else:
+        data = get_document_contents(db, document)[f"{field}_content"].encode("utf-8")
+        size = len(data)
+
+    if not range_header:
+        return Response(content=data, media_type=media_type, headers=headers)
+
+    byte_range = _parse_range(range_header, size)
+    if byte_range is None:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    start, end = byte_range
+    chunk = blob_store.read_blob_range(digest, start, end) if digest else data[start:end + 1]
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=chunk, status_code=206, media_type=media_type, headers=headers)
+
+@router.get("/{document_id}/paragraphs")
+async def read_document_paragraphs(
+    document_id: int,
+    request: Request,
+    response: Response,
+    field: str = Query("generated", pattern="^(source|generated)$"),
+    start: int = Query(0, ge=0),
+    count: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    按段落范围获取正文，供客户端虚拟滚动、按需加载超长文档
+
+    返回段落总数和 [start, start+count) 范围内的段落（含在正文中的字符偏移）
+    """
+    has_permission, document = check_document_permission(db, document_id, current_user.id, current_user.role)
+    if not has_permission:
+        raise HTTPException(status_code=403, detail="没有权限访问此文档")
+    if not document:
+        raise HTTPException(status_code=404, detail="文档不存在")
+
+    etag = document_etag(document, [], "paragraphs", field, start, count)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    return get_paragraphs(db, document, field, start, count)
 
 @router.get("/{document_id}")
 async def read_document(
     document_id: int,
+    request: Request,
+    content: str = Query("inline", pattern="^(inline|url)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # 检查权限
-    has_permission, document = check_document_permission(db, document_id, current_user.id, current_user.role)
+    """
+    获取文档详情及标注
+
+    content=url 时不返回正文，只返回正文下载地址（/{document_id}/content/{field}），
+    适用于超长文档或正文位于文件存储的情况。
+    响应带强ETag，请求头 If-None-Match 命中时返回304，不再加载正文和解析评论。
+    """
+    # 检查权限（只加载元数据，正文按需从缓存或数据库读取）
+    has_permission, document = check_document_permission(
+        db, document_id, current_user.id, current_user.role
+    )
     if not has_permission:
         raise HTTPException(status_code=403, detail="没有权限访问此文档")
     if not document:
@@ -53,30 +449,37 @@ async def read_document(
     # 根据用户角色获取不同的标注数据
     if current_user.role == "admin":
         # 管理员：获取文档和所有标注信息
-        from ..models.annotation import Annotation
-        from sqlalchemy.orm import joinedload
-
         # 使用 joinedload 来确保关联的用户数据被正确加载
         annotations = db.query(Annotation).options(
             joinedload(Annotation.annotator)
-        ).filter(Annotation.document_id == document_id).all()
-
-        response_data = {
-            "id": document.id,
-            "title": document.title,
-            "status": document.status,
-            "word_count_source": document.word_count_source,
-            "word_count_generated": document.word_count_generated,
-            "created_at": document.created_at,
-            "updated_at": document.updated_at,
-            "source_content": document.source_content,
-            "generated_content": document.generated_content,
-            "annotations": []
-        }
+        ).filter(Annotation.document_id == document_id).order_by(Annotation.id).all()
+        annotator_names = [annotation.annotator.full_name or annotation.annotator.username
+                           for annotation in annotations]
+        etag = document_etag(document, annotations, "admin", content, annotator_names)
+    else:
+        # 专家：获取自己的标注信息
+        annotation = get_annotation(db, document_id, current_user.id)
+        annotations = [annotation] if annotation else []
+        etag = document_etag(document, annotations, "expert", content)
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response_data = {
+        "id": document.id,
+        "title": document.title,
+        "status": document.status,
+        "word_count_source": document.word_count_source,
+        "word_count_generated": document.word_count_generated,
+        "created_at": document.created_at,
+        "updated_at": document.updated_at,
+        **get_document_contents(db, document, content)
+    }
 
+    if current_user.role == "admin":
         # 添加所有标注数据
-        import json
-        for annotation in annotations:
+        response_data["annotations"] = []
+        for annotation, annotator_name in zip(annotations, annotator_names):
             try:
                 comments_data = json.loads(annotation.comments) if annotation.comments else []
             except (json.JSONDecodeError, TypeError):
@@ -85,7 +488,7 @@ async def read_document(
             annotation_data = {
                 "annotation_id": annotation.id,
                 "annotator_id": annotation.annotator_id,
-                "annotator_name": annotation.annotator.full_name or annotation.annotator.username,
+                "annotator_name": annotator_name,
                 "evaluation": annotation.evaluation,
                 "comments": comments_data,
                 "time_spent": annotation.time_spent,
@@ -102,44 +505,80 @@ async def read_document(
         else:
             response_data["annotation_status"] = "进行中"
 
+    # 如果有标注，添加标注数据
+    elif annotations:
+        annotation = annotations[0]
+        # 解析JSON字符串形式的评论
+        try:
+            comments_data = json.loads(annotation.comments) if annotation.comments else []
+        except (json.JSONDecodeError, TypeError):
+            comments_data = []
+
+        response_data.update({
+            "annotation_status": "已标注" if annotation.is_completed else "进行中",
+            "evaluation": annotation.evaluation,
+            "comments": comments_data,
+            "time_spent": annotation.time_spent,
+            "annotated_at": annotation.created_at
+        })
     else:
-        # 专家：获取自己的标注信息
-        result = get_document_with_annotation(db, document_id, current_user.id)
-        document = result["document"]
-        annotation = result["annotation"]
-
-        response_data = {
-            "id": document.id,
-            "title": document.title,
-            "status": document.status,
-            "word_count_source": document.word_count_source,
-            "word_count_generated": document.word_count_generated,
-            "created_at": document.created_at,
-            "updated_at": document.updated_at,
-            "source_content": document.source_content,
-            "generated_content": document.generated_content
-        }
-
-        # 如果有标注，添加标注数据
-        if annotation:
-            # 解析JSON字符串形式的评论
-            import json
-            try:
-                comments_data = json.loads(annotation.comments) if annotation.comments else []
-            except (json.JSONDecodeError, TypeError):
-                comments_data = []
+        response_data["annotation_status"] = "未标注"
 
-            response_data.update({
-                "annotation_status": "已标注" if annotation.is_completed else "进行中",
-                "evaluation": annotation.evaluation,
-                "comments": comments_data,
-                "time_spent": annotation.time_spent,
-                "annotated_at": annotation.created_at
-            })
-        else:
-            response_data["annotation_status"] = "未标注"
+    # 正文可能很长，直接编码（datetime 同样按 isoformat() 输出），不经 jsonable_encoder 逐个字段转换
+    return FastJSONResponse(response_data, headers={"ETag": etag})
+
+def _lease_response(document) -> dict:
+    return {
+        "document_id": document.id,
+        "title": document.title,
+        "lease_expires_at": document.lease_expires_at.isoformat(),
+        "lease_seconds": LEASE_SECONDS
+    }
 
-    return response_data
+@router.post("/next")
+async def lease_next(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    领取下一篇待标注的文档（仅专家）
+
+    文档分配给当前专家并带有租约（默认30分钟，由 DOCUMENT_LEASE_SECONDS 指定），
+    到期前需续期或完成标注，否则文档被收回供他人领取。已持有未完成的租约时返回该文档。
+    """
+    if current_user.role != "expert":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有专家可以领取文档"
+        )
+
+    document = lease_next_document(db, current_user.id)
+    if not document:
+        raise HTTPException(status_code=404, detail="暂无可领取的文档")
+    return _lease_response(document)
+
+@router.post("/{document_id}/lease")
+async def renew_document_lease(
+    document_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """续期当前专家持有的文档租约"""
+    document = renew_lease(db, document_id, current_user.id)
+    if not document:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="未持有该文档的租约")
+    return _lease_response(document)
+
+@router.delete("/{document_id}/lease")
+async def release_document_lease(
+    document_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """释放当前专家持有的文档租约，文档重新变为未分配"""
+    if not release_lease(db, document_id, current_user.id):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="未持有该文档的租约")
+    return {"message": "已释放文档", "document_id": document_id}
 
 # 文档分配相关API
 @router.post("/assign")
@@ -170,7 +609,10 @@ async def assign_document_to_user(
             raise HTTPException(status_code=400, detail="只能分配文档给专家")
 
     # 执行分配
-    assigned_document = assign_document(db, assignment.document_id, assignment.assigned_to)
+    assigned_document = assign_document(
+        db, assignment.document_id, assignment.assigned_to,
+        include_duplicates=assignment.include_duplicates
+    )
     if not assigned_document:
         raise HTTPException(status_code=400, detail="分配失败")
 
@@ -188,70 +630,54 @@ async def assign_document_to_user(
         "assigned_to_name": target_user_name
     }
 
-@router.get("/my/assigned", response_model=List[DocumentList])
-async def get_my_assigned_documents(
-    skip: int = 0,
-    limit: int = 1000,
+@router.post("/assign/bulk")
+async def bulk_assign(
+    assignment: BulkAssignment,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取分配给当前用户的文档"""
-    if current_user.role == "admin":
+    """
+    批量分配文档（仅管理员）
+
+    按 document_ids 或 filter 选择文档，按 strategy 分给 expert_ids（为空表示全部专家）：
+    round_robin 平均分配，least_loaded 优先分给未完成文档少的专家，weighted 按近期标注速度加权。
+    默认跳过已分配的文档（reassign=true 时重新分配）；dry_run=true 只返回分配预览
+    """
+    if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="管理员不需要使用此接口，请使用 /documents"
+            detail="只有管理员可以分配文档"
         )
 
-    return get_user_documents(db, current_user.id, skip=skip, limit=limit)
+    filters = assignment.filter.model_dump(exclude_none=True) if assignment.filter else None
+    try:
+        return bulk_assign_documents(
+            db, document_ids=assignment.document_ids, filters=filters,
+            expert_ids=assignment.expert_ids, strategy=assignment.strategy,
+            reassign=assignment.reassign, throughput_days=assignment.throughput_days,
+            dry_run=assignment.dry_run
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/available")
-async def get_available_documents(
+@router.get("/my/assigned", response_model=List[DocumentList])
+async def get_my_assigned_documents(
     skip: int = 0,
     limit: int = 1000,
+    filters: dict = Depends(document_list_filters),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取未分配的文档（供专家认领）"""
+    """获取分配给当前用户的文档"""
     if current_user.role == "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="管理员不需要使用此接口"
-        )
-
-    # 只获取未分配的文档
-    from ..models.document import Document
-    documents = db.query(Document).filter(Document.assigned_to.is_(None)).offset(skip).limit(limit).all()
-
-    # 转换为DocumentList格式
-    result = []
-    for doc in documents:
-        from ..models.annotation import Annotation
-        annotation_count = db.query(Annotation).filter(Annotation.document_id == doc.id).count()
-        completed_count = db.query(Annotation).filter(
-            Annotation.document_id == doc.id,
-            Annotation.is_completed == True
-        ).count()
-
-        if annotation_count == 0:
-            annotation_status = "未标注"
-        elif completed_count == annotation_count:
-            annotation_status = "已标注"
-        else:
-            annotation_status = "进行中"
-
-        doc_list = DocumentList(
-            id=doc.id,
-            title=doc.title,
-            status=doc.status,
-            word_count_source=doc.word_count_source,
-            word_count_generated=doc.word_count_generated,
-            created_at=doc.created_at.isoformat(),
-            assigned_to=doc.assigned_to,
-            annotation_status=annotation_status
+            detail="管理员不需要使用此接口，请使用 /documents"
         )
-        result.append(doc_list)
 
-    return result
+    # 该接口只返回分配给自己的文档，忽略分配筛选
+    filters.update(assigned_to=None, unassigned=False)
+    return FastJSONResponse(get_user_documents(db, current_user.id, skip=skip, limit=limit, **filters))
 
 @router.post("/claim/{document_id}")
 async def claim_document(
@@ -266,20 +692,15 @@ async def claim_document(
             detail="只有专家可以认领文档"
         )
 
-    # 检查文档是否存在且未分配
-    document = get_document(db, document_id)
-    if not document:
-        raise HTTPException(status_code=404, detail="文档不存在")
-    if document.assigned_to is not None:
+    # 条件更新：只有文档仍未分配时才会写入，并发认领时只有一人成功
+    if not claim_unassigned_document(db, document_id, current_user.id):
+        if not get_document(db, document_id):
+            raise HTTPException(status_code=404, detail="文档不存在")
         raise HTTPException(status_code=400, detail="该文档已被分配")
 
-    # 认领文档
-    assigned_document = assign_document(db, document_id, current_user.id)
-    if not assigned_document:
-        raise HTTPException(status_code=400, detail="认领失败")
-
+    document = get_document(db, document_id)
     return {
-        "message": f"成功认领文档 '{assigned_document.title}'",
-        "document_id": assigned_document.id,
+        "message": f"成功认领文档 '{document.title}'",
+        "document_id": document.id,
         "assigned_to": current_user.id
-    }
\ No newline at end of file
+    }
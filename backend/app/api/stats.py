@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from ..database import get_db
-from ..services.auth import get_current_user
+from ..database import get_db, SessionLocal
+from ..responses import FastJSONResponse
+from ..events import broker, format_event, HEARTBEAT, HEARTBEAT_SECONDS, RESYNC
+from ..services.auth import get_current_user, get_user_from_token
 from ..services.stats import (
     get_annotation_stats, get_user_stats, get_all_user_stats,
     get_temporal_stats, get_user_activity_distribution,
-    get_document_completion_stats, get_approval_rate_analysis
+    get_document_completion_stats, get_approval_rate_analysis, get_progress_counters,
+    get_dashboard, DASHBOARD_SECTIONS, ADMIN_DASHBOARD_SECTIONS
 )
+from ..services.agreement import get_agreement_stats
 from ..models.user import User
 
 router = APIRouter()
@@ -80,4 +87,128 @@ async def get_approval_analysis(
     current_user: User = Depends(get_current_user)
 ):
     """获取好评率详细分析"""
-    return get_approval_rate_analysis(db)
\ No newline at end of file
+    return get_approval_rate_analysis(db)
+
+@router.get("/dashboard")
+async def get_dashboard_stats(
+    sections: Optional[str] = None,
+    days: int = 30,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    统计页的各项统计（一次请求、同一快照）
+
+    sections 为逗号分隔的统计项：overview、my_stats、all_users、temporal、user_activity、
+    document_completion、approval_analysis，省略时返回当前用户可查看的全部统计项；
+    all_users 和 user_activity 仅管理员可查看
+    """
+    if days < 1 or days > 365:
+        raise HTTPException(
+            status_code=400,
+            detail="天数必须在1-365之间"
+        )
+    if sections is None:
+        requested = [
+            section for section in DASHBOARD_SECTIONS
+            if current_user.role == "admin" or section not in ADMIN_DASHBOARD_SECTIONS
+        ]
+    else:
+        requested = [section.strip() for section in sections.split(",") if section.strip()]
+        unknown = [section for section in requested if section not in DASHBOARD_SECTIONS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"未知的统计项: {', '.join(unknown)}"
+            )
+        if current_user.role != "admin" and ADMIN_DASHBOARD_SECTIONS & set(requested):
+            raise HTTPException(
+                status_code=403,
+                detail="只有管理员可以查看所有用户统计和用户活跃度分布"
+            )
+    # 结果只含基本类型，直接编码，跳过 jsonable_encoder 对数十万条文档记录的逐项转换（输出与 JSONResponse 相同）
+    return FastJSONResponse(get_dashboard(db, current_user.id, requested, days))
+
+@router.get("/agreement")
+async def get_agreement(
+    min_overlap: int = Query(10, ge=1),
+    pair_limit: int = Query(100, ge=0, le=10000),
+    expert_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    专家间一致性（仅管理员）
+
+    基于已完成标注的整体评价计算 Fleiss' kappa、两两专家的 Cohen's kappa（共同评价不少于
+    min_overlap 篇，按kappa从低到高返回前 pair_limit 对）及每位专家与多数意见的偏离率
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="只有管理员可以查看标注一致性"
+        )
+    return get_agreement_stats(db, min_overlap=min_overlap, pair_limit=pair_limit, expert_id=expert_id)
+
+
+def _snapshot_event() -> bytes:
+    """当前计数快照；event_id 为快照时已发布的最后一条事件，客户端忽略编号不大于它的事件"""
+    db = SessionLocal()
+    try:
+        counters = get_progress_counters(db)
+    finally:
+        db.close()
+    return format_event(None, "snapshot", {"event_id": broker.last_id, "counters": counters})
+
+@router.get("/stream")
+async def stream_progress(request: Request, token: Optional[str] = None):
+    """
+    进度推送（Server-Sent Events）
+
+    连接后先收到 snapshot（各状态文档数和标注计数），之后收到写入时推送的增量事件：
+    annotation、annotation_deleted、document_status、documents_created、documents_assigned、leases_reclaimed，
+    事件中的 counters 为计数增量。EventSource 无法设置请求头，令牌可通过 token 参数传入；
+    断线重连时按 Last-Event-ID 补发，无法补发时重新发送 snapshot
+    """
+    if token is None:
+        authorization = request.headers.get("authorization", "")
+        token = authorization[7:] if authorization.lower().startswith("bearer ") else ""
+
+    # 长连接不占用数据库会话：鉴权后立即关闭
+    db = SessionLocal()
+    try:
+        get_user_from_token(db, token)
+    finally:
+        db.close()
+
+    last_event_id = request.headers.get("last-event-id")
+    resume = last_event_id.isdigit() if last_event_id else False
+    queue = broker.subscribe(int(last_event_id) if resume else None)
+    initial = None if resume else _snapshot_event()
+
+    async def events():
+        try:
+            if initial:
+                yield initial
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                # 一次写出已积压的全部事件
+                messages = [message]
+                while not queue.empty():
+                    messages.append(queue.get_nowait())
+                if RESYNC in messages:
+                    # 快照已包含积压的事件
+                    yield _snapshot_event()
+                else:
+                    yield b"".join(messages)
+        finally:
+            broker.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
@@ -0,0 +1,116 @@
+"""
+内容寻址的文档正文文件存储
+
+正文以原始UTF-8写入 BLOB_STORE_DIR/ab/cd/<sha256>，数据库中只保存哈希引用，
+读取原文时可直接以文件形式发送（FileResponse）或通过mmap按字节范围读取。
+相同内容只存一份；文件写入后不再修改。
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+import time
+from typing import Iterable, Optional
+
+# 正文存储位置：database（压缩后存入数据库，默认）或 blob（大正文写入文件存储）
+CONTENT_STORAGE = os.environ.get("CONTENT_STORAGE", "database")
+BLOB_STORE_DIR = os.environ.get("BLOB_STORE_DIR", "./blobs")
+# 小于该字节数的正文仍存入数据库
+BLOB_MIN_SIZE = 16 * 1024
+# 超过该大小的文件通过mmap读取
+MMAP_THRESHOLD = 1 << 20
+
+
+def blob_storage_enabled() -> bool:
+    return CONTENT_STORAGE == "blob"
+
+
+def blob_path(digest_hex: str) -> str:
+    return os.path.join(BLOB_STORE_DIR, digest_hex[:2], digest_hex[2:4], digest_hex)
+
+
+def put_blob(data: bytes) -> bytes:
+    """写入正文并返回SHA-256摘要；文件落盘（fsync）后才返回，保证数据库引用先于提交持久化"""
+    digest = hashlib.sha256(data).digest()
+    path = blob_path(digest.hex())
+    if os.path.exists(path):
+        return digest
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return digest
+
+
+def read_blob(digest_hex: str) -> str:
+    """读取并解码整个正文"""
+    path = blob_path(digest_hex)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            return f.read().decode("utf-8")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, "utf-8")
+
+
+def blob_size(digest_hex: str) -> int:
+    return os.path.getsize(blob_path(digest_hex))
+
+
+def read_blob_range(digest_hex: str, start: int, end: int) -> bytes:
+    """通过mmap读取 [start, end] 闭区间内的字节"""
+    with open(blob_path(digest_hex), "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[start:end + 1]
+
+
+def iter_blob_digests() -> Iterable[str]:
+    """遍历文件存储中的全部摘要"""
+    if not os.path.isdir(BLOB_STORE_DIR):
+        return
+    for dirpath, _, filenames in os.walk(BLOB_STORE_DIR):
+        for filename in filenames:
+            if not filename.startswith(".tmp-"):
+                yield filename
+
+
+def collect_garbage(referenced: Iterable[str], min_age_seconds: int = 3600,
+                    dry_run: bool = False) -> int:
+    """
+    删除未被数据库引用的文件，返回删除数量
+
+    只删除超过 min_age_seconds 的文件，避免误删尚未提交的事务刚写入的正文。
+    """
+    referenced = set(referenced)
+    cutoff = time.time() - min_age_seconds
+    removed = 0
+    for digest_hex in list(iter_blob_digests()):
+        if digest_hex in referenced:
+            continue
+        path = blob_path(digest_hex)
+        if os.path.getmtime(path) > cutoff:
+            continue
+        if not dry_run:
+            os.unlink(path)
+        removed += 1
+    return removed
+
+
+def parse_digest(value) -> Optional[str]:
+    """从原始列值中解析文件存储引用，非引用返回None"""
+    from .compression import BLOB_REF, BLOB_REF_SIZE
+    if isinstance(value, (bytes, bytearray, memoryview)) and len(value) == BLOB_REF_SIZE and value[0] == BLOB_REF:
+        return bytes(value[1:]).hex()
+    return None
@@ -0,0 +1,209 @@
+"""
+文档正文压缩编解码
+
+存储格式：首字节为编码标记，其后为数据
+- 0x00: 未压缩的UTF-8（正文过短或压缩无收益）
+- 0x01: zlib
+- 0x02: zlib + 预置字典（标记后4字节为字典ID）
+- 0x03: zstd
+- 0x04: zstd + 训练字典（标记后4字节为字典ID）
+- 0x05: 文件存储引用（标记后32字节为正文的SHA-256，见 blob_store）
+旧数据库中的未压缩TEXT值以str形式读出，原样返回，因此可以逐步迁移。
+"""
+
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from . import blob_store
+
+try:
+    import zstandard
+except ImportError:  # zstd为可选依赖，未安装时使用zlib
+    zstandard = None
+
+# 压缩算法：zlib（默认）、zstd（需安装zstandard）、none
+CONTENT_CODEC = os.environ.get("CONTENT_CODEC", "zlib")
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+# 小于该字节数的正文不压缩
+MIN_COMPRESS_SIZE = 256
+# zlib预置字典最大32KB
+ZLIB_MAX_DICT_SIZE = 32 * 1024
+
+RAW = 0x00
+ZLIB = 0x01
+ZLIB_DICT = 0x02
+ZSTD = 0x03
+ZSTD_DICT = 0x04
+BLOB_REF = 0x05
+BLOB_REF_SIZE = 33
+
+_DICT_ID = struct.Struct(">I")
+
+_lock = threading.Lock()
+_dictionaries: Dict[int, Tuple[str, bytes]] = {}
+_active_dictionary: Optional[Tuple[int, str, bytes]] = None
+_active_loaded = False
+
+
+def _engine():
+    from .database import engine
+    return engine
+
+
+def _load_dictionary(dict_id: int) -> Tuple[str, bytes]:
+    """按ID加载字典（字典不可变，加载后永久缓存）"""
+    cached = _dictionaries.get(dict_id)
+    if cached is not None:
+        return cached
+
+    with _engine().connect() as conn:
+        row = conn.execute(
+            text("SELECT codec, data FROM compression_dictionaries WHERE id = :id"),
+            {"id": dict_id}
+        ).first()
+    if row is None:
+        raise ValueError(f"压缩字典 {dict_id} 不存在")
+
+    with _lock:
+        _dictionaries[dict_id] = (row.codec, bytes(row.data))
+    return _dictionaries[dict_id]
+
+
+def get_active_dictionary() -> Optional[Tuple[int, str, bytes]]:
+    """获取当前压缩算法对应的最新字典 (id, codec, data)，没有则返回None"""
+    global _active_dictionary, _active_loaded
+    if _active_loaded:
+        return _active_dictionary
+
+    try:
+        with _engine().connect() as conn:
+            row = conn.execute(
+                text("SELECT id, codec, data FROM compression_dictionaries "
+                     "WHERE codec = :codec ORDER BY id DESC LIMIT 1"),
+                {"codec": CONTENT_CODEC}
+            ).first()
+    except Exception:
+        # 字典表尚未创建
+        row = None
+
+    with _lock:
+        _active_dictionary = (row.id, row.codec, bytes(row.data)) if row else None
+        _active_loaded = True
+    return _active_dictionary
+
+
+def reset_dictionary_cache():
+    """训练新字典后调用，使后续写入使用最新字典"""
+    global _active_loaded
+    with _lock:
+        _active_loaded = False
+
+
+def compress_text(value: str) -> bytes:
+    """按当前配置压缩正文；启用文件存储时大正文写入文件，只返回引用"""
+    raw = value.encode("utf-8")
+    if blob_store.blob_storage_enabled() and len(raw) >= blob_store.BLOB_MIN_SIZE:
+        return bytes([BLOB_REF]) + blob_store.put_blob(raw)
+    if CONTENT_CODEC == "none" or len(raw) < MIN_COMPRESS_SIZE:
+        return bytes([RAW]) + raw
+
+    dictionary = get_active_dictionary()
+    if CONTENT_CODEC == "zstd" and zstandard is not None:
+        if dictionary:
+            dict_id, _, data = dictionary
+            compressor = zstandard.ZstdCompressor(
+                level=ZSTD_LEVEL, dict_data=zstandard.ZstdCompressionDict(data)
+            )
+            packed = bytes([ZSTD_DICT]) + _DICT_ID.pack(dict_id) + compressor.compress(raw)
+        else:
+            packed = bytes([ZSTD]) + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    elif dictionary and dictionary[1] == "zlib":
+        dict_id, _, data = dictionary
+        compressor = zlib.compressobj(ZLIB_LEVEL, zdict=data)
+        packed = bytes([ZLIB_DICT]) + _DICT_ID.pack(dict_id) + compressor.compress(raw) + compressor.flush()
+    else:
+        packed = bytes([ZLIB]) + zlib.compress(raw, ZLIB_LEVEL)
+
+    if len(packed) >= len(raw) + 1:
+        return bytes([RAW]) + raw
+    return packed
+
+
+def decompress_text(value) -> str:
+    """解压正文；旧的未压缩TEXT值原样返回"""
+    if isinstance(value, str):
+        return value
+
+    data = memoryview(value)
+    marker = data[0]
+    if marker == RAW:
+        return str(data[1:], "utf-8")
+    if marker == ZLIB:
+        return zlib.decompress(data[1:]).decode("utf-8")
+    if marker == BLOB_REF:
+        return blob_store.read_blob(bytes(data[1:BLOB_REF_SIZE]).hex())
+    if marker == ZLIB_DICT:
+        dict_id = _DICT_ID.unpack_from(data, 1)[0]
+        decompressor = zlib.decompressobj(zdict=_load_dictionary(dict_id)[1])
+        return (decompressor.decompress(data[5:]) + decompressor.flush()).decode("utf-8")
+    if marker in (ZSTD, ZSTD_DICT):
+        if zstandard is None:
+            raise RuntimeError("读取zstd压缩的正文需要安装 zstandard")
+        if marker == ZSTD:
+            return zstandard.ZstdDecompressor().decompress(data[1:]).decode("utf-8")
+        dict_id = _DICT_ID.unpack_from(data, 1)[0]
+        decompressor = zstandard.ZstdDecompressor(
+            dict_data=zstandard.ZstdCompressionDict(_load_dictionary(dict_id)[1])
+        )
+        return decompressor.decompress(data[5:]).decode("utf-8")
+    raise ValueError(f"未知的正文编码标记: {marker}")
+
+
+def train_zlib_dictionary(samples, size: int = ZLIB_MAX_DICT_SIZE) -> bytes:
+    """
+    从样本正文中提取高频片段作为zlib预置字典
+
+    zlib只能引用最近32KB的内容，且距离越近编码越短，
+    因此按收益（出现次数 × 长度）从低到高拼接，收益最高的片段放在末尾。
+    """
+    from collections import Counter
+
+    size = min(size, ZLIB_MAX_DICT_SIZE)
+    counter = Counter()
+    for sample in samples:
+        for length in (4, 8, 16):
+            step = length // 2
+            for start in range(0, max(len(sample) - length, 0) + 1, step):
+                counter[sample[start:start + length]] += 1
+
+    picked = []
+    total = 0
+    for fragment, count in sorted(counter.items(), key=lambda item: item[1] * len(item[0]), reverse=True):
+        if count < 2:
+            break
+        encoded = fragment.encode("utf-8")
+        if total + len(encoded) > size:
+            continue
+        picked.append(encoded)
+        total += len(encoded)
+        if total >= size - 16:
+            break
+
+    return b"".join(reversed(picked))
+
+
+def train_dictionary(samples, codec: str = None, size: int = None) -> bytes:
+    """按压缩算法训练字典"""
+    codec = codec or CONTENT_CODEC
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("训练zstd字典需要安装 zstandard")
+        encoded = [sample.encode("utf-8") for sample in samples]
+        return zstandard.train_dictionary(size or 112 * 1024, encoded).as_bytes()
+    return train_zlib_dictionary(samples, size or ZLIB_MAX_DICT_SIZE)
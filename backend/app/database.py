@@ -1,12 +1,42 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLITE_DATABASE_URL = "sqlite:///./database.db"
+# 可通过环境变量指定数据库（如基准测试使用临时库）
+SQLITE_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./database.db")
 
+connect_args = {"check_same_thread": False}
+
+# 文件数据库：WAL模式（读不被写阻塞，多个工作进程可并行读），写事务经 write_lock 排队（见 app/write_lock.py）。
+# WRITE_LOCK=0 关闭写锁；SQLITE_JOURNAL_MODE 可改回 DELETE 等模式
+DATABASE_FILE = make_url(SQLITE_DATABASE_URL).database
+FILE_DATABASE = SQLITE_DATABASE_URL.startswith("sqlite") and DATABASE_FILE not in (None, "", ":memory:")
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+if FILE_DATABASE and os.environ.get("WRITE_LOCK", "1") == "1":
+    from .write_lock import CoordinatedConnection, WRITE_LOCK_TIMEOUT
+    # 写入已在写锁上排队，SQLite自身的等待只需覆盖检查点等少数情况
+    connect_args.update(factory=CoordinatedConnection, timeout=WRITE_LOCK_TIMEOUT)
+
+# 连接池上限 DB_POOL_SIZE + DB_MAX_OVERFLOW（默认20 + 80）：async 接口在事件循环线程中同步访问数据库，
+# 连接由线程池中执行的 get_db 取出和归还，上限须明显高于并发会话数（20个并发会话时默认的5 + 10即不够用）。
+# 连接用尽时取连接最多等待 DB_POOL_TIMEOUT 秒后报错，过载时尽快失败，而不是无限增加连接和文件句柄
 engine = create_engine(
-    SQLITE_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLITE_DATABASE_URL, connect_args=connect_args,
+    pool_size=int(os.environ.get("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", "80")),
+    pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", "10"))
 )
+
+if FILE_DATABASE:
+    @event.listens_for(engine, "connect")
+    def _set_journal_mode(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.close()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
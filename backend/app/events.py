@@ -0,0 +1,119 @@
+"""
+进度事件推送（Server-Sent Events）
+
+写入路径（保存/删除标注、文档状态变化、导入、分配）调用 publish() 发布紧凑的增量事件，
+GET /api/stats/stream 的每个连接订阅一个有界队列。事件只序列化一次，编码后的同一份字节
+放入所有订阅者的队列，扇出代价与连接数成线性且不重复序列化。
+
+- publish() 可在任意线程调用（通过 call_soon_threadsafe 交给事件循环），从未有客户端连接时直接返回
+- 保留最近 EVENT_HISTORY_SIZE 条事件，客户端断线重连时按 Last-Event-ID 补发
+- 订阅者队列已满（客户端读取过慢）或无法补发时，队列中放入 RESYNC，由推送接口重新发送快照
+"""
+
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+EVENT_HISTORY_SIZE = int(os.environ.get("EVENT_HISTORY_SIZE", "1000"))
+SUBSCRIBER_QUEUE_SIZE = 256
+HEARTBEAT_SECONDS = 15
+
+
+def format_event(event_id: Optional[int], event_type: str, data: Any) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+HEARTBEAT = b": ping\n\n"
+# 队列中的标记：需要重新发送快照
+RESYNC = object()
+
+
+class EventBroker:
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.last_id = 0
+        self.published = 0
+        self.dropped = 0
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=history_size)
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> asyncio.Queue:
+        """在事件循环中调用；last_event_id 之后的历史事件先放入队列"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                missed = [message for event_id, message in self._history if event_id > last_event_id]
+                oldest = self._history[0][0] if self._history else self.last_id + 1
+                # 断线期间的事件已不在历史中（或服务已重启，编号重新开始），无法补全
+                if last_event_id < oldest - 1 or last_event_id > self.last_id or len(missed) > self.queue_size:
+                    queue.put_nowait(RESYNC)
+                else:
+                    for message in missed:
+                        queue.put_nowait(message)
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    def publish(self, event_type: str, data: Dict[str, Any]):
+        """发布事件（线程安全）；从未有客户端连接时直接返回"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        # 暂时没有订阅者时仍记录历史，供断线重连的客户端补发
+        with self._lock:
+            self.last_id += 1
+            message = format_event(self.last_id, event_type, data)
+            self._history.append((self.last_id, message))
+            self.published += 1
+            if not self._subscribers:
+                return
+        loop.call_soon_threadsafe(self._fan_out, message)
+
+    def _fan_out(self, message: bytes):
+        with self._lock:
+            subscribers: List[asyncio.Queue] = list(self._subscribers)
+        for queue in subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # 客户端跟不上：丢弃积压，让其重新获取快照
+                self.dropped += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+
+broker = EventBroker()
+
+
+def publish(event_type: str, data: Dict[str, Any]):
+    broker.publish(event_type, data)
+
+
+def counter_delta(documents: Optional[Dict[str, int]] = None,
+                  annotations: Optional[Dict[str, int]] = None) -> Dict[str, Dict[str, int]]:
+    """计数增量（结构同 stats.get_progress_counters），省略为0的项"""
+    delta = {}
+    for name, values in (("documents", documents), ("annotations", annotations)):
+        values = {key: value for key, value in (values or {}).items() if value}
+        if values:
+            delta[name] = values
+    return delta
@@ -0,0 +1,286 @@
+"""
+运行指标（Prometheus文本格式）
+
+MetricsMiddleware 是纯ASGI中间件，记录每个路由的请求数、耗时直方图、响应大小和进行中的请求数；
+instrument_engine() 在SQLAlchemy引擎上注册事件，统计SQL语句数、耗时和提交次数，
+并按请求汇总（每个请求的语句数与数据库耗时直方图，慢查询日志与N+1检测见 querylog）。GET /metrics 输出 render() 的结果。
+
+- 路由标签取匹配到的路由模板（如 /api/documents/{document_id}），未匹配的请求记为 unmatched，避免标签基数膨胀
+- 指标更新只做加法和一次二分查找，不分配对象，自动保存等高频路径上的开销可以忽略
+- 请求内的数据库统计通过 contextvars 传递，在线程池中执行的同步代码也计入所属请求
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import querylog
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        # 无标签的指标从0开始输出
+        self._values: Dict[tuple, float] = {} if self.label_names else {(): 0}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class CallbackGauge(_Metric):
+    """采集时才取值的指标（如缓存占用、推送连接数）"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.callback())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # 标签 -> [各桶计数（不累计，最后一个为 +Inf）, 总和, 次数]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return entry[2] if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标名重复: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def __iter__(self) -> Iterable[_Metric]:
+        return iter(list(self._metrics.values()))
+
+    def render(self) -> bytes:
+        lines = []
+        for metric in self:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+http_response_size = registry.register(Histogram(
+    "http_response_size_bytes", "HTTP response body size", ("method", "route"), SIZE_BUCKETS))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method",)))
+
+db_queries = registry.register(Counter("db_queries_total", "SQL statements executed"))
+db_query_latency = registry.register(Histogram("db_query_duration_seconds", "SQL statement latency"))
+db_commits = registry.register(Counter("db_commits_total", "Database transactions committed"))
+db_errors = registry.register(Counter(
+    "db_errors_total", "Failed SQL statements by kind (locked = SQLite 'database is locked')", ("kind",)))
+db_request_queries = registry.register(Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request", ("route",), QUERY_COUNT_BUCKETS))
+db_request_time = registry.register(Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL statements per HTTP request", ("route",)))
+db_request_commits = registry.register(Histogram(
+    "db_commits_per_request", "Commits per HTTP request", ("route",), QUERY_COUNT_BUCKETS))
+db_n_plus_one = registry.register(Counter(
+    "db_n_plus_one_requests_total", "Requests repeating one SQL statement above the N+1 threshold", ("route",)))
+db_write_lock_wait = registry.register(Histogram(
+    "db_write_lock_wait_seconds", "Time waiting for the single-writer lock before a write transaction"))
+annotation_write_batch = registry.register(Histogram(
+    "annotation_write_batch_size", "Annotation saves committed per group-commit transaction", (), QUERY_COUNT_BUCKETS))
+
+startup_phases = registry.register(Gauge(
+    "startup_phase_seconds", "Process startup time by phase (import, schema_check, warmup_*)", ("phase",)))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    db_queries.inc()
+    db_query_latency.observe(elapsed)
+    querylog.record_statement(statement, parameters, elapsed)
+
+
+def _handle_error(exception_context):
+    # 语句出错时 after_cursor_execute 不会触发，弹出对应的开始时间
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+    error = exception_context.original_exception
+    db_errors.inc("locked" if "database is locked" in str(error) else type(error).__name__)
+
+
+def _on_commit(conn):
+    db_commits.inc()
+    querylog.record_commit()
+
+
+def instrument_engine(engine: Engine):
+    """在引擎上注册统计事件（重复调用无副作用）"""
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    event.listen(engine, "commit", _on_commit)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """纯ASGI中间件：不包装请求/响应对象，流式响应（SSE）照常逐块发送"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        state = {"status": 500, "size": 0}
+        stats, token = querylog.begin_request(scope)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+            await send(message)
+
+        http_in_flight.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec(method)
+            querylog.end_request(stats, token)
+            # 路由匹配后 Router 把 route 写入同一个 scope
+            route = _route_label(scope)
+            http_requests.inc(method, route, str(state["status"]))
+            http_latency.observe(elapsed, method, route)
+            http_response_size.observe(state["size"], method, route)
+            db_request_queries.observe(stats.queries, route)
+            db_request_time.observe(stats.seconds, route)
+            db_request_commits.observe(stats.commits, route)
+            if querylog.N_PLUS_ONE_THRESHOLD > 0 and stats.repeated(querylog.N_PLUS_ONE_THRESHOLD):
+                db_n_plus_one.inc(route)
+
+
+def render() -> bytes:
+    return registry.render()
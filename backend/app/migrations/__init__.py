@@ -0,0 +1,138 @@
+"""
+数据库结构迁移
+
+create_all 只能创建缺少的表，无法修改已有数据库；已有表上的索引、列和数据回填由迁移完成。
+每个迁移是本包中名为 rNNNN_说明.py 的模块，定义：
+- REVISION：递增的版本号
+- DESCRIPTION：说明
+- PLAN_QUERIES：受影响的热点查询，迁移前后各执行一次 EXPLAIN QUERY PLAN 并记录
+- upgrade(engine)：执行迁移。DDL须可重复执行（IF NOT EXISTS），
+  数据回填使用 backfill_in_batches 分批提交，避免长时间持有写锁
+
+已执行的迁移记录在 schema_migrations 表中，启动时（main.py）与各脚本在 create_all 之后调用 upgrade()。
+"""
+
+import importlib
+import json
+import pkgutil
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+
+def _ensure_migrations_table(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+            "version INTEGER PRIMARY KEY, "
+            "description VARCHAR(200) NOT NULL, "
+            "applied_at DATETIME DEFAULT CURRENT_TIMESTAMP, "
+            "duration_ms FLOAT, "
+            "plans_before TEXT, "
+            "plans_after TEXT)"
+        ))
+
+
+def load_migrations() -> list:
+    """按版本号顺序加载全部迁移模块"""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        if not module_info.name.startswith("r"):
+            continue
+        migrations.append(importlib.import_module(f"{__name__}.{module_info.name}"))
+    migrations.sort(key=lambda module: module.REVISION)
+
+    versions = [module.REVISION for module in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"迁移版本号重复: {versions}")
+    return migrations
+
+
+def applied_versions(engine: Engine) -> Dict[int, dict]:
+    _ensure_migrations_table(engine)
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT * FROM {MIGRATIONS_TABLE} ORDER BY version")).mappings().all()
+    return {row["version"]: dict(row) for row in rows}
+
+
+def current_version(engine: Engine) -> int:
+    versions = applied_versions(engine)
+    return max(versions) if versions else 0
+
+
+def explain_queries(engine: Engine, queries: List[str]) -> Dict[str, List[str]]:
+    """返回每条查询的 EXPLAIN QUERY PLAN 结果（每步一行）"""
+    plans = {}
+    with engine.connect() as conn:
+        for query in queries:
+            try:
+                rows = conn.execute(text(f"EXPLAIN QUERY PLAN {query}")).all()
+                plans[query] = [row[-1] for row in rows]
+            except Exception as e:
+                # 迁移前查询涉及的表或列可能还不存在
+                plans[query] = [f"ERROR: {e}"]
+    return plans
+
+
+def backfill_in_batches(engine: Engine, select_ids: str, process_batch: Callable,
+                        batch_size: int = 500, log: Callable = None) -> int:
+    """
+    分批回填数据，每批一个短事务，期间其他连接仍可正常读写
+
+    select_ids 为按id递增返回待处理id的SQL，需接受 :last_id 和 :limit 参数；
+    process_batch(conn, ids) 在事务中处理一批。返回处理的总行数。
+    """
+    total = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            ids = [row[0] for row in conn.execute(
+                text(select_ids), {"last_id": last_id, "limit": batch_size}
+            )]
+            if not ids:
+                break
+            process_batch(conn, ids)
+        total += len(ids)
+        last_id = ids[-1]
+        if log:
+            log(f"    已回填 {total} 行")
+    return total
+
+
+def upgrade(engine: Engine, target: Optional[int] = None, log: Callable = None) -> List[int]:
+    """执行尚未执行的迁移（至 target 版本为止），返回本次执行的版本号"""
+    applied = applied_versions(engine)
+    executed = []
+    for migration in load_migrations():
+        if migration.REVISION in applied:
+            continue
+        if target is not None and migration.REVISION > target:
+            break
+
+        if log:
+            log(f"执行迁移 {migration.REVISION:04d}: {migration.DESCRIPTION}")
+        queries = list(getattr(migration, "PLAN_QUERIES", []))
+        plans_before = explain_queries(engine, queries)
+        start = time.perf_counter()
+        migration.upgrade(engine, log=log)
+        duration_ms = (time.perf_counter() - start) * 1000
+        plans_after = explain_queries(engine, queries)
+
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"INSERT OR IGNORE INTO {MIGRATIONS_TABLE} "
+                "(version, description, duration_ms, plans_before, plans_after) "
+                "VALUES (:version, :description, :duration_ms, :before, :after)"
+            ), {
+                "version": migration.REVISION,
+                "description": migration.DESCRIPTION,
+                "duration_ms": duration_ms,
+                "before": json.dumps(plans_before, ensure_ascii=False),
+                "after": json.dumps(plans_after, ensure_ascii=False),
+            })
+        executed.append(migration.REVISION)
+    return executed
@@ -0,0 +1,42 @@
+"""
+为热点查询补建索引
+
+- annotations(document_id, annotator_id)：读取/保存某专家对某文档的标注
+- annotations(annotator_id, is_completed)：专家个人统计、进度
+- annotations(created_at)：按时间段的统计
+- annotations(document_id, is_completed)、documents 上的列表筛选组合索引：此前只在新建库时创建
+documents(assigned_to) 由组合索引 documents(assigned_to, status, id) 的前缀覆盖，不单独建。
+"""
+
+from sqlalchemy import text
+
+REVISION = 1
+DESCRIPTION = "热点查询索引"
+
+INDEXES = [
+    ("ix_annotations_document_id_annotator_id", "annotations", "document_id, annotator_id"),
+    ("ix_annotations_annotator_id_is_completed", "annotations", "annotator_id, is_completed"),
+    ("ix_annotations_created_at", "annotations", "created_at"),
+    ("ix_annotations_document_id_is_completed", "annotations", "document_id, is_completed"),
+    ("ix_documents_assigned_to_status_id", "documents", "assigned_to, status, id"),
+    ("ix_documents_status_id", "documents", "status, id"),
+    ("ix_documents_created_at_id", "documents", "created_at, id"),
+    ("ix_documents_updated_at_id", "documents", "updated_at, id"),
+]
+
+PLAN_QUERIES = [
+    "SELECT id FROM annotations WHERE document_id = 1 AND annotator_id = 1",
+    "SELECT count(*) FROM annotations WHERE annotator_id = 1 AND is_completed = 1",
+    "SELECT date(created_at), count(id) FROM annotations "
+    "WHERE created_at >= '2026-01-01' AND created_at <= '2026-01-31' GROUP BY date(created_at)",
+    "SELECT id FROM documents WHERE assigned_to = 1 ORDER BY id LIMIT 50",
+    "SELECT id FROM documents WHERE assigned_to = 1 AND status = 'pending' ORDER BY id LIMIT 50",
+]
+
+
+def upgrade(engine, log=None):
+    for name, table, columns in INDEXES:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+        if log:
+            log(f"    索引 {name}")
@@ -0,0 +1,49 @@
+"""
+为段落索引上线前导入的文档回填段落索引
+
+此前这些文档在首次访问段落接口时才补建；分批回填后首次访问不再需要解压全文。
+"""
+
+from sqlalchemy import text
+
+REVISION = 2
+DESCRIPTION = "回填文档段落索引"
+
+PLAN_QUERIES = [
+    "SELECT paragraph_count FROM document_paragraph_index WHERE document_id = 1 AND field = 'generated'",
+]
+
+SELECT_MISSING = (
+    "SELECT id FROM documents WHERE id > :last_id AND NOT EXISTS ("
+    "SELECT 1 FROM document_paragraph_index p WHERE p.document_id = documents.id) "
+    "ORDER BY id LIMIT :limit"
+)
+
+
+def _backfill_batch(conn, ids):
+    from ..compression import decompress_text
+    from ..services.paragraphs import build_paragraph_index
+
+    rows = conn.execute(text(
+        "SELECT id, source_content, generated_content FROM documents WHERE id IN "
+        f"({', '.join(str(int(document_id)) for document_id in ids)})"
+    )).all()
+    values = []
+    for row in rows:
+        for field, raw in (("source", row.source_content), ("generated", row.generated_content)):
+            index = build_paragraph_index(row.id, field, decompress_text(raw))
+            values.append({
+                "document_id": index.document_id, "field": index.field,
+                "paragraph_count": index.paragraph_count,
+                "char_offsets": index.char_offsets, "byte_offsets": index.byte_offsets
+            })
+    conn.execute(text(
+        "INSERT OR IGNORE INTO document_paragraph_index "
+        "(document_id, field, paragraph_count, char_offsets, byte_offsets) "
+        "VALUES (:document_id, :field, :paragraph_count, :char_offsets, :byte_offsets)"
+    ), values)
+
+
+def upgrade(engine, log=None):
+    from . import backfill_in_batches
+    backfill_in_batches(engine, SELECT_MISSING, _backfill_batch, batch_size=200, log=log)
@@ -0,0 +1,31 @@
+"""
+文档领取租约
+
+documents 增加 lease_expires_at 列及其索引，供 POST /api/documents/next 领取文档时记录租约到期时间；
+部分索引 ix_documents_claimable 只包含未分配且未完成的文档，领取时按id取第一条无需扫描已分配的文档。
+"""
+
+from sqlalchemy import text
+
+REVISION = 3
+DESCRIPTION = "文档领取租约"
+
+PLAN_QUERIES = [
+    "SELECT id FROM documents WHERE lease_expires_at < '2026-01-01 00:00:00'",
+    "SELECT id FROM documents WHERE assigned_to IS NULL AND status != 'completed' ORDER BY id LIMIT 1",
+]
+
+
+def upgrade(engine, log=None):
+    with engine.begin() as conn:
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(documents)"))}
+        # 新建的库由 create_all 直接创建该列
+        if "lease_expires_at" not in columns:
+            conn.execute(text("ALTER TABLE documents ADD COLUMN lease_expires_at DATETIME"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_documents_lease_expires_at ON documents (lease_expires_at)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_documents_claimable ON documents (id) "
+            "WHERE assigned_to IS NULL AND status != 'completed'"
+        ))
@@ -0,0 +1,115 @@
+"""
+全文检索表改为无内容（contentless）FTS5表，分批回填
+
+documents_fts 此前保存标题和两段正文的未压缩副本，抵消了正文压缩与文件存储节省的空间；
+改为 content='' 后只保存倒排索引，检索结果的片段由应用从解压后的正文生成（见 services/search.py）。
+检索表此前由 create_all 的钩子创建，并在同一个事务中回填全部文档；现由本迁移创建，
+文档与评论分批回填，每批一个短事务。已有的带正文副本的检索表删除后重建（执行 VACUUM 回收空间）。
+当前SQLite不支持FTS5 trigram分词器（需3.34+）时跳过，检索退化为标题LIKE。
+"""
+
+from sqlalchemy import text
+
+from ..models.search import (
+    SEARCH_TABLE, SEARCH_COLUMNS, COMMENT_SEARCH_TABLE, COMMENT_SEARCH_COLUMNS, COMMENT_INDEX_BITS, comment_rows
+)
+
+REVISION = 4
+DESCRIPTION = "全文检索表改为无内容FTS5表"
+
+PLAN_QUERIES = [
+    f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH '\"经济发展\"' ORDER BY rank LIMIT 20",
+]
+
+# 无内容表不会拒绝重复的rowid（重复写入会损坏索引），回填只处理尚未写入的行，中断后可重新执行
+SELECT_MISSING_DOCUMENTS = (
+    "SELECT id FROM documents WHERE id > :last_id AND NOT EXISTS ("
+    f"SELECT 1 FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE}.rowid = documents.id) "
+    "ORDER BY id LIMIT :limit"
+)
+SELECT_MISSING_ANNOTATIONS = (
+    "SELECT id FROM annotations WHERE id > :last_id AND NOT EXISTS ("
+    f"SELECT 1 FROM {COMMENT_SEARCH_TABLE} WHERE {COMMENT_SEARCH_TABLE}.rowid "
+    f"BETWEEN annotations.id << {COMMENT_INDEX_BITS} "
+    f"AND (annotations.id << {COMMENT_INDEX_BITS}) | {(1 << COMMENT_INDEX_BITS) - 1}) "
+    "ORDER BY id LIMIT :limit"
+)
+
+
+def _fts5_trigram_supported(conn) -> bool:
+    try:
+        conn.execute(text("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x, tokenize = 'trigram')"))
+    except Exception:
+        return False
+    conn.execute(text("DROP TABLE temp.fts5_probe"))
+    return True
+
+
+def _table_sql(conn, name: str):
+    return conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+    ).scalar()
+
+
+def _backfill_documents(conn, ids):
+    from ..compression import decompress_text
+
+    rows = conn.execute(text(
+        "SELECT id, title, source_content, generated_content FROM documents WHERE id IN "
+        f"({', '.join(str(int(document_id)) for document_id in ids)})"
+    )).all()
+    conn.execute(text(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, source_content, generated_content) "
+        "VALUES (:id, :title, :source, :generated)"
+    ), [
+        {"id": row.id, "title": row.title,
+         "source": decompress_text(row.source_content),
+         "generated": decompress_text(row.generated_content)}
+        for row in rows
+    ])
+
+
+def _backfill_comments(conn, ids):
+    annotations = conn.execute(text(
+        "SELECT id, comments FROM annotations WHERE id IN "
+        f"({', '.join(str(int(annotation_id)) for annotation_id in ids)})"
+    )).all()
+    rows = []
+    for annotation in annotations:
+        rows.extend(comment_rows(annotation.id, annotation.comments))
+    if rows:
+        conn.execute(text(
+            f"INSERT INTO {COMMENT_SEARCH_TABLE} (rowid, text, selection) VALUES (:rowid, :text, :selection)"
+        ), rows)
+
+
+def upgrade(engine, log=None):
+    from . import backfill_in_batches
+
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        if not _fts5_trigram_supported(conn):
+            if log:
+                log("    当前SQLite不支持FTS5 trigram分词器，跳过全文检索表")
+            return
+        sql = _table_sql(conn, SEARCH_TABLE)
+        if sql is not None and "content=''" not in sql.replace(" ", "").lower():
+            conn.execute(text(f"DROP TABLE {SEARCH_TABLE}"))
+            if log:
+                log(f"    已删除保存正文副本的 {SEARCH_TABLE}，执行 VACUUM 可回收空间")
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            f"{', '.join(SEARCH_COLUMNS)}, content = '', tokenize = 'trigram')"
+        ))
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {COMMENT_SEARCH_TABLE} USING fts5("
+            f"{', '.join(COMMENT_SEARCH_COLUMNS)}, tokenize = 'trigram')"
+        ))
+
+    if log:
+        log("    回填文档检索表")
+    backfill_in_batches(engine, SELECT_MISSING_DOCUMENTS, _backfill_documents, batch_size=200, log=log)
+    if log:
+        log("    回填评论检索表")
+    backfill_in_batches(engine, SELECT_MISSING_ANNOTATIONS, _backfill_comments, batch_size=500, log=log)
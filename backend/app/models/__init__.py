@@ -1,5 +1,11 @@
 from .user import User
 from .document import Document
 from .annotation import Annotation
+from .fingerprint import DocumentFingerprint, DocumentLSHBucket
+from .compression import CompressionDictionary
+from .paragraph import DocumentParagraphIndex
 
-__all__ = ["User", "Document", "Annotation"]
\ No newline at end of file
+__all__ = [
+    "User", "Document", "Annotation", "DocumentFingerprint", "DocumentLSHBucket",
+    "CompressionDictionary", "DocumentParagraphIndex"
+]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -29,5 +29,17 @@ class Annotation(Base):
     document = relationship("Document", back_populates="annotations")
     annotator = relationship("User", back_populates="annotations")
 
+    # 已有数据库中的索引由迁移 r0001 补建
+    __table_args__ = (
+        # 文档列表按标注状态筛选（EXISTS子查询）
+        Index("ix_annotations_document_id_is_completed", "document_id", "is_completed"),
+        # 读取/保存某专家对某文档的标注
+        Index("ix_annotations_document_id_annotator_id", "document_id", "annotator_id"),
+        # 专家个人统计
+        Index("ix_annotations_annotator_id_is_completed", "annotator_id", "is_completed"),
+        # 按时间段统计
+        Index("ix_annotations_created_at", "created_at"),
+    )
+
     def __repr__(self):
         return f"<Annotation(id={self.id}, document_id={self.document_id}, evaluation={'好' if self.evaluation else '不好'})>"
\ No newline at end of file
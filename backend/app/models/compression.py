@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime
+from sqlalchemy.sql import func
+from ..database import Base
+
+class CompressionDictionary(Base):
+    """文档正文压缩字典（写入后不再修改，压缩数据通过ID引用）"""
+    __tablename__ = "compression_dictionaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    codec = Column(String(20), nullable=False)  # zlib, zstd
+    data = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<CompressionDictionary(id={self.id}, codec='{self.codec}', size={len(self.data or b'')})>"
@@ -1,15 +1,18 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, text
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from ..database import Base
+from .types import CompressedText
 
 class Document(Base):
     __tablename__ = "documents"
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(500), nullable=False)
-    source_content = Column(Text, nullable=False)  # 原始素材
-    generated_content = Column(Text, nullable=False)  # AI生成内容
+    # 正文默认延迟加载，列表等只需元数据的查询不会读取大段文本；
+    # 需要正文时使用 undefer_group("content") 一次性加载两列。正文压缩存储，读取时自动解压
+    source_content = deferred(Column(CompressedText, nullable=False), group="content")  # 原始素材
+    generated_content = deferred(Column(CompressedText, nullable=False), group="content")  # AI生成内容
     status = Column(String(20), default="pending")  # pending, in_progress, completed
     word_count_source = Column(Integer, default=0)
     word_count_generated = Column(Integer, default=0)
@@ -22,6 +25,20 @@ class Document(Base):
     # 关联分配的专家
     assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
     assigned_user = relationship("User", back_populates="assigned_documents")
+    # 通过 POST /api/documents/next 领取的文档带租约，到期未完成则收回；管理员分配和手动认领为空（不过期）
+    lease_expires_at = Column(DateTime, nullable=True)
+
+    # 列表筛选与排序用的组合索引（末尾带id，同值时按id分页无需额外排序）；已有数据库中由迁移 r0001 补建
+    __table_args__ = (
+        Index("ix_documents_assigned_to_status_id", "assigned_to", "status", "id"),
+        Index("ix_documents_status_id", "status", "id"),
+        Index("ix_documents_created_at_id", "created_at", "id"),
+        Index("ix_documents_updated_at_id", "updated_at", "id"),
+        # 收回过期租约、按id顺序领取可领取文档（部分索引，只含未分配且未完成的文档）；迁移 r0003 补建
+        Index("ix_documents_lease_expires_at", "lease_expires_at"),
+        Index("ix_documents_claimable", "id",
+              sqlite_where=text("assigned_to IS NULL AND status != 'completed'")),
+    )
 
     def __repr__(self):
         return f"<Document(id={self.id}, title='{self.title[:50]}...')>"
\ No newline at end of file
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, Float, LargeBinary, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from ..database import Base
+
+class DocumentFingerprint(Base):
+    __tablename__ = "document_fingerprints"
+
+    document_id = Column(Integer, ForeignKey("documents.id"), primary_key=True)
+
+    # 生成内容的MinHash签名（uint32数组的原始字节）
+    signature = Column(LargeBinary, nullable=False)
+
+    # 所属重复组的代表文档ID，为空表示不是重复文档
+    duplicate_of = Column(Integer, ForeignKey("documents.id"), nullable=True, index=True)
+    # 与代表文档（或最相似文档）的估计Jaccard相似度
+    similarity = Column(Float, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<DocumentFingerprint(document_id={self.document_id}, duplicate_of={self.duplicate_of})>"
+
+class DocumentLSHBucket(Base):
+    """LSH分桶索引：同一(band, bucket)中的文档即为候选近似重复"""
+    __tablename__ = "document_lsh_buckets"
+
+    band = Column(Integer, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_document_lsh_buckets_document_id", "document_id"),
+        {"sqlite_with_rowid": False},
+    )
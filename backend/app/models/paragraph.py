@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, LargeBinary, ForeignKey
+from ..database import Base
+
+class DocumentParagraphIndex(Base):
+    """正文段落索引：每段在正文中的起止偏移，用于按段落范围分页读取超长正文"""
+    __tablename__ = "document_paragraph_index"
+
+    document_id = Column(Integer, ForeignKey("documents.id"), primary_key=True)
+    field = Column(String(20), primary_key=True)  # source, generated
+
+    paragraph_count = Column(Integer, nullable=False)
+    # 偏移数组（uint32小端序，每段依次为起点、终点），分别按字符和UTF-8字节计
+    char_offsets = Column(LargeBinary, nullable=False)
+    byte_offsets = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        {"sqlite_with_rowid": False},
+    )
+
+    def __repr__(self):
+        return f"<DocumentParagraphIndex(document_id={self.document_id}, field='{self.field}', paragraphs={self.paragraph_count})>"
@@ -0,0 +1,98 @@
+"""
+全文检索索引（SQLite FTS5）
+
+documents_fts：rowid 即文档ID，索引标题和两段正文。无内容表（content=''），只保存倒排索引，
+不保存正文副本（正文在 documents 表中压缩存储或位于文件存储，无法作为外部内容表）；
+删除条目时须提供写入时的原值，检索结果的片段由应用从解压后的正文生成。
+annotation_comments_fts：每条评论一行，保存评论内容和选中的文本，
+rowid = 标注ID << 16 | 评论序号，按标注更新时可以用rowid范围整体删除。
+
+均使用 trigram 分词器：按三字滑动切分，不依赖中文分词词典。
+由迁移 r0004 创建并分批回填已有数据。
+是否可用按数据库中检索表的实际状态判断（结构检查后或首次使用时检测），不依赖本进程是否执行过迁移：
+SKIP_SCHEMA_CHECK=1 或多进程部署的工作进程同样使用已有的检索表。
+"""
+
+import json
+import threading
+from typing import Optional
+
+from sqlalchemy import text
+
+SEARCH_TABLE = "documents_fts"
+SEARCH_COLUMNS = ("title", "source_content", "generated_content")
+COMMENT_SEARCH_TABLE = "annotation_comments_fts"
+COMMENT_SEARCH_COLUMNS = ("text", "selection")
+# 评论rowid中评论序号所占的位数
+COMMENT_INDEX_BITS = 16
+
+# 检索表是否存在且当前SQLite可以读取（需支持FTS5 trigram分词器，3.34+）；None 表示尚未检测
+search_index_available: Optional[bool] = None
+_detect_lock = threading.Lock()
+
+
+def _fts_table_readable(connection, name: str, contentless: bool = False) -> bool:
+    sql = connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+    ).scalar()
+    if sql is None:
+        return False
+    if contentless and "content=''" not in sql.replace(" ", "").lower():
+        # 迁移 r0004 之前保存正文副本的旧表，迁移完成前不使用
+        return False
+    try:
+        connection.execute(text(f"SELECT rowid FROM {name} LIMIT 0"))
+    except Exception:
+        # 表存在但当前SQLite未编译FTS5
+        return False
+    return True
+
+
+def detect_search_index(connection) -> bool:
+    """按数据库中检索表的实际状态确定是否可用"""
+    global search_index_available
+    search_index_available = (
+        connection.dialect.name == "sqlite"
+        and _fts_table_readable(connection, SEARCH_TABLE, contentless=True)
+        and _fts_table_readable(connection, COMMENT_SEARCH_TABLE)
+    )
+    return search_index_available
+
+
+def is_search_index_available() -> bool:
+    if search_index_available is None:
+        from ..database import engine
+        with _detect_lock:
+            if search_index_available is None:
+                with engine.connect() as connection:
+                    detect_search_index(connection)
+    return search_index_available
+
+
+def comment_rowid(annotation_id: int, comment_index: int) -> int:
+    return (annotation_id << COMMENT_INDEX_BITS) | comment_index
+
+
+def parse_comments(comments_json):
+    """解析标注中的评论JSON，格式错误时返回空列表"""
+    try:
+        comments = json.loads(comments_json) if comments_json else []
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return comments if isinstance(comments, list) else []
+
+
+def comment_rows(annotation_id: int, comments_json) -> list:
+    """将一条标注的评论转为检索表的行"""
+    rows = []
+    # 超出rowid编码范围的评论不建索引
+    comments = parse_comments(comments_json)[:1 << COMMENT_INDEX_BITS]
+    for index, comment in enumerate(comments):
+        if not isinstance(comment, dict):
+            continue
+        rows.append({
+            "rowid": comment_rowid(annotation_id, index),
+            "text": str(comment.get("text") or ""),
+            "selection": str(comment.get("selection") or "")
+        })
+    return rows
@@ -0,0 +1,22 @@
+from sqlalchemy.types import TypeDecorator, Text
+from ..compression import compress_text, decompress_text
+
+class CompressedText(TypeDecorator):
+    """
+    透明压缩的长文本类型
+
+    写入时压缩为带编码标记的二进制，读取时自动解压。
+    列仍声明为TEXT，兼容已有数据库中未压缩的旧数据（读取时原样返回）。
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_text(value)
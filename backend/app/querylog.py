@@ -0,0 +1,167 @@
+"""
+SQL语句统计、慢查询日志与N+1检测
+
+metrics.instrument_engine() 注册的SQLAlchemy事件对每条语句调用 record_statement()：
+- 计入当前请求的 QueryStats（通过 contextvars 传递，MetricsMiddleware 在每个请求开始时设置）
+- 计入 track_queries() 中活动的统计（测试和基准脚本使用，统计期间进程内执行的全部语句）
+- 耗时超过 SLOW_QUERY_MS 的语句连同参数和路由写入 app.sql 日志
+
+语句按"形状"归并：驱动收到的语句已参数化，只需把展开后的 IN (?, ?, ...) 合并为一项。
+同一形状在一个请求中执行超过 N_PLUS_ONE_THRESHOLD 次即视为N+1（循环中逐行查询），记录警告。
+
+测试中可用 track_queries(max_queries=..., max_repeats=...) 断言查询预算，超出时抛出 QueryBudgetExceeded：
+
+    with track_queries(max_queries=10, max_repeats=2):
+        client.get("/api/documents/available")
+"""
+
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", "20"))
+# 日志中参数的最大长度（参数可能是整篇正文）
+MAX_LOGGED_PARAMS = 500
+
+logger = logging.getLogger("app.sql")
+
+_IN_LIST = re.compile(r"\(\?(?:, \?)+\)")
+
+
+def statement_shape(statement: str) -> str:
+    """归并只有参数个数不同的语句"""
+    if "?, ?" not in statement:
+        return statement
+    return _IN_LIST.sub("(?, ...)", statement)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    """一个请求（或一段 track_queries）内的语句统计"""
+    __slots__ = ("label", "scope", "queries", "seconds", "commits", "shapes")
+
+    def __init__(self, label: Optional[str] = None, scope: Optional[dict] = None):
+        self.label = label
+        # 请求的ASGI scope：路由匹配后才能得到路由模板，记录时再读取
+        self.scope = scope
+        self.queries = 0
+        self.seconds = 0.0
+        self.commits = 0
+        self.shapes: Dict[str, int] = {}
+
+    @property
+    def route(self) -> str:
+        if self.scope is not None:
+            route = self.scope.get("route")
+            return getattr(route, "path", None) or self.scope.get("path", "")
+        return self.label or ""
+
+    def record(self, statement: str, elapsed: float):
+        self.queries += 1
+        self.seconds += elapsed
+        shape = statement_shape(statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """执行次数超过 threshold 的语句形状，按次数从多到少"""
+        return sorted(
+            ((shape, count) for shape, count in self.shapes.items() if count > threshold),
+            key=lambda item: -item[1]
+        )
+
+    def summary(self, top: int = 5) -> str:
+        lines = [f"{self.route or '查询'}: {self.queries} 条语句, {self.seconds * 1000:.1f} ms, {self.commits} 次提交"]
+        for shape, count in sorted(self.shapes.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"  {count:>5} × {_shorten(shape, 200)}")
+        return "\n".join(lines)
+
+    def check(self, max_queries: Optional[int] = None, max_repeats: Optional[int] = None):
+        """超出查询预算时抛出 QueryBudgetExceeded"""
+        problems = []
+        if max_queries is not None and self.queries > max_queries:
+            problems.append(f"语句数 {self.queries} 超过上限 {max_queries}")
+        if max_repeats is not None:
+            for shape, count in self.repeated(max_repeats):
+                problems.append(f"语句重复执行 {count} 次（上限 {max_repeats}，疑似N+1）: {_shorten(shape, 200)}")
+        if problems:
+            raise QueryBudgetExceeded("\n".join(problems) + "\n" + self.summary())
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_trackers: List[QueryStats] = []
+_trackers_lock = threading.Lock()
+
+
+def _shorten(value: str, limit: int) -> str:
+    value = " ".join(value.split())
+    return value if len(value) <= limit else value[:limit] + "..."
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def begin_request(scope: dict):
+    """开始统计一个请求，返回 (stats, token)，结束时调用 end_request(token)"""
+    stats = QueryStats(scope=scope)
+    return stats, _current.set(stats)
+
+
+def end_request(stats: QueryStats, token):
+    _current.reset(token)
+    if N_PLUS_ONE_THRESHOLD > 0:
+        for shape, count in stats.repeated(N_PLUS_ONE_THRESHOLD):
+            logger.warning("疑似N+1: %s 中同一语句执行 %d 次: %s", stats.route, count, _shorten(shape, 500))
+
+
+def record_statement(statement: str, parameters, elapsed: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if _trackers:
+        with _trackers_lock:
+            for tracker in _trackers:
+                tracker.record(statement, elapsed)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "慢查询 %.1f ms [%s]: %s 参数: %s",
+            elapsed * 1000, stats.route if stats is not None else "-",
+            _shorten(statement, 2000), _shorten(repr(parameters), MAX_LOGGED_PARAMS)
+        )
+
+
+def record_commit():
+    stats = _current.get()
+    if stats is not None:
+        stats.commits += 1
+    if _trackers:
+        with _trackers_lock:
+            for tracker in _trackers:
+                tracker.commits += 1
+
+
+@contextmanager
+def track_queries(max_queries: Optional[int] = None, max_repeats: Optional[int] = None, label: str = ""):
+    """
+    统计代码块执行期间进程内的全部语句（TestClient 在另一线程中运行应用，请求内的语句同样计入）
+
+    max_queries: 语句总数上限；max_repeats: 同一语句形状的执行次数上限。
+    代码块正常结束后检查预算，超出时抛出 QueryBudgetExceeded
+    """
+    stats = QueryStats(label=label)
+    with _trackers_lock:
+        _trackers.append(stats)
+    try:
+        yield stats
+    finally:
+        with _trackers_lock:
+            _trackers.remove(stats)
+    stats.check(max_queries, max_repeats)
@@ -0,0 +1,41 @@
+"""
+快速JSON响应
+
+FastAPI 对 response_model 接口先按模型逐行校验，再经 jsonable_encoder 逐个字段转换，最后以标准库 json 编码；
+2000行的文档列表中这几步的CPU开销远大于查询本身。FastJSONResponse 直接编码已经是纯 dict/list 的内容：
+- 安装了 orjson 时用其编码，否则用标准库 json
+- 输出与 FastAPI 默认的 JSONResponse 逐字节相同（紧凑分隔符、非ASCII字符不转义、datetime 按 isoformat()）
+- 接口直接返回该响应，FastAPI 不再做 response_model 校验；接口仍可声明 response_model 用于文档
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any):
+    # 与 jsonable_encoder 一致：datetime/date 输出 isoformat()（orjson 自带的格式在时区等细节上不同）
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+                      default=_default).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Literal
 
 class DocumentBase(BaseModel):
     title: str
@@ -34,6 +34,9 @@ class DocumentList(BaseModel):
     # 标注状态
     annotation_status: Optional[str] = None  # "已标注", "未标注", "进行中"
 
+    # 近似重复：所属重复组的代表文档ID，为空表示非重复文档
+    duplicate_of: Optional[int] = None
+
     class Config:
         from_attributes = True
 
@@ -41,6 +44,25 @@ class DocumentList(BaseModel):
 class DocumentAssignment(BaseModel):
     document_id: int
     assigned_to: Optional[int] = None  # None表示取消分配
+    include_duplicates: bool = False  # 是否同时分配同一重复组的文档
 
 class Config:
-    from_attributes = True
\ No newline at end of file
+    from_attributes = True
+# 批量分配：按文档ID或筛选条件选择文档，按策略分给一组专家
+class BulkAssignmentFilter(BaseModel):
+    status: Optional[Literal["pending", "in_progress", "completed"]] = None
+    annotation_status: Optional[Literal["未标注", "进行中", "已标注"]] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    updated_from: Optional[datetime] = None
+    updated_to: Optional[datetime] = None
+
+class BulkAssignment(BaseModel):
+    document_ids: Optional[List[int]] = None  # 与filter二选一
+    filter: Optional[BulkAssignmentFilter] = None
+    expert_ids: Optional[List[int]] = None  # 为空表示全部启用的专家
+    # round_robin: 平均分配；least_loaded: 优先分给未完成文档少的专家；weighted: 按近期标注速度加权
+    strategy: Literal["round_robin", "least_loaded", "weighted"] = "round_robin"
+    reassign: bool = False  # 为False时跳过已分配的文档
+    throughput_days: int = Field(30, ge=1, le=365)  # weighted策略统计标注速度的天数
+    dry_run: bool = False  # 只预览分配结果，不写入
@@ -0,0 +1,324 @@
+"""
+标注一致性（专家间一致性）
+
+以已完成标注的整体评价（好=1/不好=0）构成 文档×专家 评价矩阵。专家数上千、标注上百万时
+稠密矩阵过大，矩阵以稀疏形式保存：按 key = 文档ID << 32 | 专家ID 排序的 int64 数组及对应评价。
+在此基础上用NumPy向量化计算：
+- Fleiss' kappa：只统计至少两人评价的文档，允许各文档评价人数不同
+- 两两专家的 Cohen's kappa：按每篇文档的评价人数分组，组内用 triu_indices 生成专家对，
+  累加各专家对的2x2列联表；计算量与共同评价的专家对总数成正比
+- 每位专家与多数意见的偏离率：与同一文档其他专家的多数意见比较（不含本人，平票不计）
+
+矩阵在进程内常驻：首次请求时从数据库加载，之后保存/删除标注时增量更新（见 services/annotation.py），
+每 AGREEMENT_REFRESH_SECONDS 秒全量重新加载一次，以包含其他进程写入的标注。
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models.user import User
+
+AGREEMENT_REFRESH_SECONDS = int(os.environ.get("AGREEMENT_REFRESH_SECONDS", "300"))
+ANNOTATOR_BITS = 32
+ANNOTATOR_MASK = (1 << ANNOTATOR_BITS) - 1
+# 增量变更中表示删除
+REMOVED = -1
+
+
+def _kappa(observed: np.ndarray, expected: np.ndarray) -> np.ndarray:
+    """kappa = (Po - Pe) / (1 - Pe)；Pe为1（所有评价相同）时无定义，返回nan"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(expected < 1, (observed - expected) / (1 - expected), np.nan)
+
+
+def _round(value, digits: int = 4):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+class AgreementMatrix:
+    def __init__(self, refresh_seconds: int = AGREEMENT_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.keys = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0, dtype=np.int8)
+        self.loaded_at: Optional[float] = None
+        self.version = 0
+        self._pending: Dict[int, int] = {}
+        self._results: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, document_id: int, annotator_id: int, evaluation: Optional[bool]):
+        """记录一条标注的变化；evaluation 为None表示删除或标注未完成"""
+        key = (document_id << ANNOTATOR_BITS) | annotator_id
+        with self._lock:
+            if self.loaded_at is None:
+                return
+            self._pending[key] = REMOVED if evaluation is None else int(bool(evaluation))
+            self.version += 1
+
+    def invalidate(self):
+        with self._lock:
+            self.loaded_at = None
+            self._pending.clear()
+            self._results.clear()
+
+    def _load(self, db: Session):
+        # 直接使用DBAPI游标取元组：np.array 转换SQLAlchemy的Row对象很慢（100万行约15秒，元组约0.2秒）
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.execute(
+                f"SELECT (document_id << {ANNOTATOR_BITS}) | annotator_id, evaluation "
+                "FROM annotations WHERE is_completed = 1"
+            )
+            data = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+        finally:
+            cursor.close()
+        # 同一专家对同一文档理论上只有一条标注，出现重复时保留最后一条
+        keys, first = np.unique(data[::-1, 0], return_index=True)
+        self.keys = keys
+        self.values = data[::-1, 1][first].astype(np.int8)
+        self.loaded_at = time.monotonic()
+        self._pending.clear()
+        self._results.clear()
+        self.version += 1
+
+    def _merge_pending(self):
+        """将增量变更合并进有序数组：更新原位修改，删除用掩码，新增按插入位置插入"""
+        pending_keys = np.fromiter(self._pending.keys(), dtype=np.int64, count=len(self._pending))
+        pending_values = np.fromiter(self._pending.values(), dtype=np.int8, count=len(self._pending))
+        self._pending.clear()
+
+        positions = np.searchsorted(self.keys, pending_keys)
+        clipped = np.minimum(positions, max(len(self.keys) - 1, 0))
+        found = (positions < len(self.keys)) & (self.keys[clipped] == pending_keys) if len(self.keys) else \
+            np.zeros(len(pending_keys), dtype=bool)
+
+        update = found & (pending_values != REMOVED)
+        self.values[positions[update]] = pending_values[update]
+
+        remove = found & (pending_values == REMOVED)
+        if remove.any():
+            keep = np.ones(len(self.keys), dtype=bool)
+            keep[positions[remove]] = False
+            self.keys, self.values = self.keys[keep], self.values[keep]
+
+        insert = ~found & (pending_values != REMOVED)
+        if insert.any():
+            order = np.argsort(pending_keys[insert])
+            new_keys, new_values = pending_keys[insert][order], pending_values[insert][order]
+            at = np.searchsorted(self.keys, new_keys)
+            self.keys = np.insert(self.keys, at, new_keys)
+            self.values = np.insert(self.values, at, new_values)
+
+    def snapshot(self, db: Session):
+        """返回当前矩阵（keys, values, version），必要时加载或合并增量"""
+        with self._lock:
+            expired = self.loaded_at is None or time.monotonic() - self.loaded_at > self.refresh_seconds
+            if expired:
+                self._load(db)
+            elif self._pending:
+                self._merge_pending()
+            return self.keys, self.values, self.version
+
+    def cached_result(self, version: int, params: tuple) -> Optional[dict]:
+        with self._lock:
+            return self._results.get((version,) + params)
+
+    def store_result(self, version: int, params: tuple, result: dict):
+        with self._lock:
+            # 只保留当前版本的结果
+            self._results = {key: value for key, value in self._results.items() if key[0] == version}
+            self._results[(version,) + params] = result
+
+
+agreement_matrix = AgreementMatrix()
+
+
+def record_annotation_change(document_id: int, annotator_id: int, evaluation: Optional[bool]):
+    agreement_matrix.record(document_id, annotator_id, evaluation)
+
+
+def fleiss_kappa(document_index: np.ndarray, values: np.ndarray) -> dict:
+    """评价人数可变的 Fleiss' kappa（二分类），只统计至少两人评价的文档"""
+    raters = np.bincount(document_index)
+    positives = np.bincount(document_index, weights=values)
+    multi = raters >= 2
+    raters, positives = raters[multi].astype(np.float64), positives[multi]
+    if not len(raters):
+        return {"kappa": None, "observed_agreement": None, "expected_agreement": None, "documents": 0}
+
+    negatives = raters - positives
+    # 每篇文档内一致的评价对所占比例
+    per_document = (positives * (positives - 1) + negatives * (negatives - 1)) / (raters * (raters - 1))
+    observed = per_document.mean()
+    p_positive = positives.sum() / raters.sum()
+    expected = p_positive ** 2 + (1 - p_positive) ** 2
+    return {
+        "kappa": _round(_kappa(np.float64(observed), np.float64(expected))),
+        "observed_agreement": _round(observed),
+        "expected_agreement": _round(expected),
+        "documents": int(multi.sum())
+    }
+
+
+def pairwise_tables(document_index: np.ndarray, annotator_index: np.ndarray, values: np.ndarray,
+                    annotator_count: int):
+    """
+    各专家对的2x2列联表
+
+    输入按（文档, 专家）排序。Returns: (pairs, tables)，pairs 为 (专家序号a, 专家序号b) 且 a < b，
+    tables[:, 2*va+vb] 为a评价va、b评价vb的文档数
+    """
+    if not len(document_index):
+        return np.empty((0, 2), dtype=np.int64), np.empty((0, 4), dtype=np.int64)
+
+    boundaries = np.flatnonzero(np.diff(document_index)) + 1
+    starts = np.concatenate(([0], boundaries))
+    sizes = np.diff(np.concatenate((starts, [len(document_index)])))
+
+    pair_keys, cells = [], []
+    for size in np.unique(sizes[sizes >= 2]):
+        rows = starts[sizes == size][:, None] + np.arange(size)
+        first, second = np.triu_indices(size, 1)
+        annotators, ratings = annotator_index[rows], values[rows]
+        pair_keys.append((annotators[:, first] * annotator_count + annotators[:, second]).ravel())
+        cells.append((ratings[:, first] * 2 + ratings[:, second]).ravel())
+    if not pair_keys:
+        return np.empty((0, 2), dtype=np.int64), np.empty((0, 4), dtype=np.int64)
+
+    unique_keys, inverse = np.unique(np.concatenate(pair_keys), return_inverse=True)
+    tables = np.bincount(inverse * 4 + np.concatenate(cells), minlength=len(unique_keys) * 4)
+    pairs = np.stack((unique_keys // annotator_count, unique_keys % annotator_count), axis=1)
+    return pairs, tables.reshape(-1, 4)
+
+
+def cohen_kappas(tables: np.ndarray):
+    """由2x2列联表计算 (共同评价数, 一致率, Cohen's kappa)"""
+    overlap = tables.sum(axis=1).astype(np.float64)
+    observed = (tables[:, 0] + tables[:, 3]) / overlap
+    a_positive = (tables[:, 2] + tables[:, 3]) / overlap
+    b_positive = (tables[:, 1] + tables[:, 3]) / overlap
+    expected = a_positive * b_positive + (1 - a_positive) * (1 - b_positive)
+    return overlap, observed, _kappa(observed, expected)
+
+
+def majority_deviation(document_index: np.ndarray, annotator_index: np.ndarray, values: np.ndarray,
+                       annotator_count: int):
+    """每位专家与同文档其他专家多数意见的 (比较次数, 偏离次数)"""
+    raters = np.bincount(document_index)[document_index] - 1
+    others_positive = np.bincount(document_index, weights=values)[document_index] - values
+    # 其他专家中好评与差评数量相等（含没有其他专家）时不计
+    decided = others_positive * 2 != raters
+    majority = (others_positive * 2 > raters).astype(values.dtype)
+    compared = np.bincount(annotator_index[decided], minlength=annotator_count)
+    deviated = np.bincount(annotator_index[decided], weights=(values[decided] != majority[decided]),
+                           minlength=annotator_count)
+    return compared, deviated.astype(np.int64)
+
+
+def compute_agreement(keys: np.ndarray, values: np.ndarray, min_overlap: int = 10) -> dict:
+    """由稀疏评价矩阵计算全部一致性指标（专家以ID表示）"""
+    document_ids = keys >> ANNOTATOR_BITS
+    annotator_ids, annotator_index = np.unique(keys & ANNOTATOR_MASK, return_inverse=True)
+    _, document_index = np.unique(document_ids, return_inverse=True)
+    values = values.astype(np.int64)
+    annotator_count = len(annotator_ids)
+
+    pairs, tables = pairwise_tables(document_index, annotator_index, values, annotator_count)
+    overlap, observed, kappas = cohen_kappas(tables)
+    reported = (overlap >= min_overlap) & ~np.isnan(kappas)
+
+    # 每位专家的平均两两kappa（按共同评价数加权）
+    weights = np.where(reported, overlap, 0)
+    weighted = np.where(reported, kappas * overlap, 0)
+    weight_sum = np.bincount(pairs[:, 0], weights, annotator_count) + np.bincount(pairs[:, 1], weights, annotator_count)
+    kappa_sum = np.bincount(pairs[:, 0], weighted, annotator_count) + np.bincount(pairs[:, 1], weighted, annotator_count)
+
+    compared, deviated = majority_deviation(document_index, annotator_index, values, annotator_count)
+
+    return {
+        "annotation_count": int(len(keys)),
+        "document_count": int(document_index.max() + 1) if len(keys) else 0,
+        "annotator_ids": annotator_ids,
+        "annotations_per_annotator": np.bincount(annotator_index, minlength=annotator_count),
+        "fleiss": fleiss_kappa(document_index, values),
+        "pairs": annotator_ids[pairs[reported]] if len(pairs) else np.empty((0, 2), dtype=np.int64),
+        "pair_overlap": overlap[reported],
+        "pair_agreement": observed[reported],
+        "pair_kappa": kappas[reported],
+        "mean_pair_kappa": kappa_sum / np.where(weight_sum > 0, weight_sum, 1),
+        "has_pair_kappa": weight_sum > 0,
+        "compared": compared,
+        "deviated": deviated
+    }
+
+
+def get_agreement_stats(db: Session, min_overlap: int = 10, pair_limit: int = 100,
+                        expert_id: Optional[int] = None) -> dict:
+    """
+    专家间一致性统计
+
+    pairs 按kappa从低到高（分歧最大的专家对在前）返回至多 pair_limit 对，只含共同评价不少于
+    min_overlap 篇的专家对；expert_id 不为空时只返回包含该专家的专家对
+    """
+    keys, values, version = agreement_matrix.snapshot(db)
+    result = agreement_matrix.cached_result(version, (min_overlap,))
+    if result is None:
+        result = compute_agreement(keys, values, min_overlap)
+        agreement_matrix.store_result(version, (min_overlap,), result)
+
+    names = {
+        user.id: user.full_name or user.username
+        for user in db.query(User.id, User.username, User.full_name).filter(
+            User.id.in_(result["annotator_ids"].tolist())
+        )
+    } if len(result["annotator_ids"]) else {}
+
+    selected = np.arange(len(result["pair_kappa"]))
+    if expert_id is not None:
+        selected = selected[(result["pairs"][:, 0] == expert_id) | (result["pairs"][:, 1] == expert_id)]
+    ordered = selected[np.argsort(result["pair_kappa"][selected], kind="stable")][:pair_limit]
+
+    pair_items = []
+    for index in ordered:
+        a, b = (int(x) for x in result["pairs"][index])
+        pair_items.append({
+            "annotator_a": a, "annotator_a_name": names.get(a),
+            "annotator_b": b, "annotator_b_name": names.get(b),
+            "overlap": int(result["pair_overlap"][index]),
+            "agreement": _round(result["pair_agreement"][index]),
+            "kappa": _round(result["pair_kappa"][index])
+        })
+
+    experts = []
+    for index, annotator_id in enumerate(result["annotator_ids"].tolist()):
+        compared = int(result["compared"][index])
+        deviated = int(result["deviated"][index])
+        experts.append({
+            "expert_id": annotator_id,
+            "expert_name": names.get(annotator_id),
+            "annotations": int(result["annotations_per_annotator"][index]),
+            "compared_with_majority": compared,
+            "deviations": deviated,
+            "deviation_rate": round(deviated / compared * 100, 2) if compared else None,
+            "mean_pair_kappa": _round(result["mean_pair_kappa"][index]) if result["has_pair_kappa"][index] else None
+        })
+
+    pair_kappa, pair_overlap = result["pair_kappa"], result["pair_overlap"]
+    return {
+        "annotation_count": result["annotation_count"],
+        "document_count": result["document_count"],
+        "annotator_count": len(result["annotator_ids"]),
+        "fleiss_kappa": result["fleiss"],
+        "pairwise": {
+            "min_overlap": min_overlap,
+            "pair_count": int(len(pair_kappa)),
+            "mean_kappa": _round(np.average(pair_kappa, weights=pair_overlap)) if len(pair_kappa) else None,
+            "pairs": pair_items
+        },
+        "experts": experts
+    }
@@ -1,9 +1,14 @@
 import json
-from typing import List, Optional
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from ..models.annotation import Annotation
 from ..models.document import Document
 from ..schemas.annotation import AnnotationCreate, AnnotationUpdate, CommentItem
+from .search import sync_comments_search_index, remove_comments_from_search_index
+from .lease import finish_lease
+from .agreement import record_annotation_change
+from ..events import publish, counter_delta
 
 def create_or_update_annotation(
     db: Session,
@@ -21,6 +26,10 @@ def create_or_update_annotation(
     ).first()
 
     comments_json = json.dumps([comment.dict() for comment in comments]) if comments else "[]"
+    # 推送计数增量用的原状态
+    was_completed = bool(annotation and annotation.is_completed)
+    was_positive = bool(annotation and annotation.evaluation)
+    is_new = annotation is None
 
     if annotation:
         # 更新现有标注
@@ -28,6 +37,7 @@ def create_or_update_annotation(
         annotation.comments = comments_json
         annotation.time_spent += time_spent
         annotation.is_completed = is_completed
+        sync_comments_search_index(db, annotation.id, comments_json)
         db.commit()
         db.refresh(annotation)
     else:
@@ -41,14 +51,150 @@ def create_or_update_annotation(
             is_completed=is_completed
         )
         db.add(annotation)
+        db.flush()
+        sync_comments_search_index(db, annotation.id, comments_json)
         db.commit()
         db.refresh(annotation)
 
+    # 完成标注后领取的文档不再被收回
+    if is_completed:
+        finish_lease(db, document_id, user_id)
+    # 一致性矩阵只统计已完成的标注
+    record_annotation_change(document_id, user_id, evaluation if is_completed else None)
+    publish("annotation", {
+        "document_id": document_id, "annotator_id": user_id,
+        "evaluation": evaluation, "is_completed": is_completed,
+        "counters": counter_delta(annotations={
+            "total": int(is_new),
+            "completed": int(is_completed) - int(was_completed),
+            "positive": int(evaluation) - int(was_positive)
+        })
+    })
+
     # 保存标注后，总是更新文档状态
     update_document_status(db, document_id)
 
     return annotation
 
+class AnnotationSave(NamedTuple):
+    """一次标注保存（字段同 create_or_update_annotation）"""
+    document_id: int
+    user_id: int
+    evaluation: bool
+    comments_json: str
+    time_spent: int
+    is_completed: bool
+
+def document_status_for(total: int, completed: int) -> str:
+    if total == 0:
+        return "pending"
+    if completed == total:
+        return "completed"
+    return "in_progress"
+
+class SavedAnnotations(NamedTuple):
+    """save_annotations 的结果：标注ID及提交后需推送的变化"""
+    annotation_ids: Dict[Tuple[int, int], int]
+    events: List[Tuple[AnnotationSave, Dict[str, int]]]
+    status_changes: List[Tuple[int, str, str]]
+
+def save_annotations(db: Session, saves: List[AnnotationSave]) -> SavedAnnotations:
+    """
+    在一个事务中保存多次标注（组提交）并提交；推送事件由调用方在提交后调用 publish_saved，
+    推送失败不会使已提交的保存被重试
+
+    同一标注的多次保存按顺序合并，结果与逐次调用 create_or_update_annotation 相同：评价、评论和完成状态
+    取最后一次，用时累加；其中任一次标记完成时结束领取租约。文档状态按合并后的标注一次更新。
+    """
+    merged: Dict[Tuple[int, int], AnnotationSave] = {}
+    completed_once = set()
+    for save in saves:
+        key = (save.document_id, save.user_id)
+        previous = merged.get(key)
+        if previous is not None:
+            save = save._replace(time_spent=previous.time_spent + save.time_spent)
+        merged[key] = save
+        if save.is_completed:
+            completed_once.add(key)
+
+    document_ids = {document_id for document_id, _ in merged}
+    user_ids = {user_id for _, user_id in merged}
+    existing = {
+        (annotation.document_id, annotation.annotator_id): annotation
+        for annotation in db.query(Annotation).filter(
+            Annotation.document_id.in_(document_ids),
+            Annotation.annotator_id.in_(user_ids)
+        )
+        if (annotation.document_id, annotation.annotator_id) in merged
+    }
+
+    annotations, events = {}, []
+    for key, save in merged.items():
+        annotation = existing.get(key)
+        # 推送计数增量用的原状态
+        was_completed = bool(annotation and annotation.is_completed)
+        was_positive = bool(annotation and annotation.evaluation)
+        if annotation:
+            annotation.evaluation = save.evaluation
+            annotation.comments = save.comments_json
+            annotation.time_spent += save.time_spent
+            annotation.is_completed = save.is_completed
+        else:
+            annotation = Annotation(
+                document_id=save.document_id,
+                annotator_id=save.user_id,
+                evaluation=save.evaluation,
+                comments=save.comments_json,
+                time_spent=save.time_spent,
+                is_completed=save.is_completed
+            )
+            db.add(annotation)
+        annotations[key] = annotation
+        events.append((save, {
+            "total": int(key not in existing),
+            "completed": int(save.is_completed) - int(was_completed),
+            "positive": int(save.evaluation) - int(was_positive)
+        }))
+    db.flush()
+    annotation_ids = {key: annotation.id for key, annotation in annotations.items()}
+
+    for key, save in merged.items():
+        sync_comments_search_index(db, annotation_ids[key], save.comments_json)
+    for document_id, user_id in completed_once:
+        finish_lease(db, document_id, user_id)
+
+    # 按合并后的标注更新文档状态
+    counts = db.query(
+        Annotation.document_id, func.count(Annotation.id),
+        func.sum(case((Annotation.is_completed == True, 1), else_=0))
+    ).filter(Annotation.document_id.in_(document_ids)).group_by(Annotation.document_id).all()
+    statuses = {document_id: document_status_for(total, completed or 0) for document_id, total, completed in counts}
+    status_changes = []
+    for document_id, previous_status in db.query(Document.id, Document.status).filter(Document.id.in_(document_ids)):
+        status = statuses.get(document_id, "pending")
+        if status != previous_status:
+            db.query(Document).filter(Document.id == document_id).update(
+                {Document.status: status}, synchronize_session=False)
+            status_changes.append((document_id, previous_status, status))
+
+    db.commit()
+    return SavedAnnotations(annotation_ids, events, status_changes)
+
+def publish_saved(saved: SavedAnnotations):
+    """记录一致性变化并推送事件（save_annotations 提交后调用）"""
+    for save, delta in saved.events:
+        record_annotation_change(save.document_id, save.user_id, save.evaluation if save.is_completed else None)
+        publish("annotation", {
+            "document_id": save.document_id, "annotator_id": save.user_id,
+            "evaluation": save.evaluation, "is_completed": save.is_completed,
+            "counters": counter_delta(annotations=delta)
+        })
+    for document_id, previous_status, status in saved.status_changes:
+        publish("document_status", {
+            "document_id": document_id, "status": status, "previous_status": previous_status,
+            "counters": counter_delta(documents={previous_status: -1, status: 1})
+        })
+
 def get_annotation(db: Session, document_id: int, user_id: int):
     return db.query(Annotation).filter(
         Annotation.document_id == document_id,
@@ -89,11 +235,22 @@ def delete_comment_from_annotation(
         annotation.comments = json.dumps(comments)
 
         # 如果没有评论了，更新完成状态
+        was_completed = bool(annotation.is_completed)
         if len(comments) == 0:
             annotation.is_completed = False
 
+        sync_comments_search_index(db, annotation.id, annotation.comments)
         db.commit()
         db.refresh(annotation)
+        record_annotation_change(document_id, user_id,
+                                 annotation.evaluation if annotation.is_completed else None)
+        publish("annotation", {
+            "document_id": document_id, "annotator_id": user_id,
+            "evaluation": annotation.evaluation, "is_completed": annotation.is_completed,
+            "counters": counter_delta(annotations={
+                "completed": int(annotation.is_completed) - int(was_completed)
+            })
+        })
 
         # 更新文档状态
         update_document_status(db, document_id)
@@ -108,8 +265,17 @@ def delete_user_annotation(db: Session, document_id: int, user_id: int):
     ).first()
 
     if annotation:
+        was_completed, was_positive = bool(annotation.is_completed), bool(annotation.evaluation)
+        remove_comments_from_search_index(db, annotation.id)
         db.delete(annotation)
         db.commit()
+        record_annotation_change(document_id, user_id, None)
+        publish("annotation_deleted", {
+            "document_id": document_id, "annotator_id": user_id,
+            "counters": counter_delta(annotations={
+                "total": -1, "completed": -int(was_completed), "positive": -int(was_positive)
+            })
+        })
 
         # 更新文档状态
         update_document_status(db, document_id)
@@ -129,14 +295,15 @@ def update_document_status(db: Session, document_id: int):
     # 更新文档状态
     document = db.query(Document).filter(Document.id == document_id).first()
     if document:
-        if total_annotations == 0:
-            document.status = "pending"
-        elif completed_annotations == total_annotations and total_annotations > 0:
-            document.status = "completed"
-        else:
-            document.status = "in_progress"
+        previous_status = document.status
+        document.status = document_status_for(total_annotations, completed_annotations)
 
         db.commit()
         db.refresh(document)
+        if document.status != previous_status:
+            publish("document_status", {
+                "document_id": document_id, "status": document.status, "previous_status": previous_status,
+                "counters": counter_delta(documents={previous_status: -1, document.status: 1})
+            })
 
     return document
\ No newline at end of file
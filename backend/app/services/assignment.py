@@ -0,0 +1,217 @@
+"""
+批量分配文档
+
+按文档ID列表或列表筛选条件选出文档，按策略计算每位专家分得的数量：
+- round_robin：平均分配
+- least_loaded：优先分给未完成文档（已分配且未完成）少的专家，使分配后的负载尽量均衡
+- weighted：按近期标注速度（完成篇数/标注小时）加权，没有记录的专家取其他专家的平均速度
+
+各专家分得的文档按ID交错排列（每人都拿到新旧文档），写入时先将(文档, 专家)对放入临时表，
+再用一条UPDATE完成全部分配，整个过程在一个事务中。dry_run 只返回预览。
+"""
+
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from ..models.annotation import Annotation
+from ..models.document import Document
+from ..models.user import User
+from .document import apply_list_filters
+from ..events import publish
+
+# IN 查询每批的文档ID数，低于SQLite的变量数上限
+ID_CHUNK_SIZE = 10000
+ASSIGNMENT_TABLE = "bulk_assignment"
+
+
+def select_documents(db: Session, document_ids: Optional[List[int]] = None,
+                     filters: Optional[dict] = None, reassign: bool = False) -> List[int]:
+    """按ID列表或筛选条件选出待分配的文档ID（按ID排序）；reassign为False时只选未分配的文档"""
+    if document_ids is not None:
+        selected = []
+        unique_ids = sorted(set(document_ids))
+        for start in range(0, len(unique_ids), ID_CHUNK_SIZE):
+            query = db.query(Document.id).filter(Document.id.in_(unique_ids[start:start + ID_CHUNK_SIZE]))
+            if not reassign:
+                query = query.filter(Document.assigned_to.is_(None))
+            selected.extend(row.id for row in query)
+        return sorted(selected)
+
+    query = apply_list_filters(db.query(Document.id), unassigned=not reassign, **(filters or {}))
+    return [row.id for row in query]
+
+
+def get_experts(db: Session, expert_ids: Optional[List[int]] = None) -> List[User]:
+    """获取参与分配的专家，为空时取全部启用的专家；含非专家或不存在的用户时抛出ValueError"""
+    query = db.query(User).filter(User.role == "expert")
+    if expert_ids is None:
+        return query.filter(User.is_active == True).order_by(User.id).all()
+
+    experts = query.filter(User.id.in_(expert_ids)).order_by(User.id).all()
+    missing = sorted(set(expert_ids) - {expert.id for expert in experts})
+    if missing:
+        raise ValueError(f"以下用户不存在或不是专家: {', '.join(map(str, missing))}")
+    return experts
+
+
+def get_open_loads(db: Session, expert_ids: List[int]) -> Dict[int, int]:
+    """每位专家已分配且未完成的文档数（一次分组查询）"""
+    rows = db.query(Document.assigned_to, func.count(Document.id)).filter(
+        Document.assigned_to.in_(expert_ids),
+        Document.status != "completed"
+    ).group_by(Document.assigned_to).all()
+    loads = {expert_id: 0 for expert_id in expert_ids}
+    loads.update({expert_id: count for expert_id, count in rows})
+    return loads
+
+
+def get_throughputs(db: Session, expert_ids: List[int], days: int = 30) -> Dict[int, float]:
+    """每位专家近 days 天的标注速度（完成篇数/标注小时）"""
+    since = datetime.utcnow() - timedelta(days=days)
+    rows = db.query(
+        Annotation.annotator_id, func.count(Annotation.id), func.sum(Annotation.time_spent)
+    ).filter(
+        Annotation.annotator_id.in_(expert_ids),
+        Annotation.is_completed == True,
+        Annotation.created_at >= since
+    ).group_by(Annotation.annotator_id).all()
+
+    measured = {
+        annotator_id: completed * 3600.0 / seconds
+        for annotator_id, completed, seconds in rows if seconds
+    }
+    default = sum(measured.values()) / len(measured) if measured else 1.0
+    return {expert_id: measured.get(expert_id, default) for expert_id in expert_ids}
+
+
+def round_robin_quotas(total: int, count: int) -> List[int]:
+    base, extra = divmod(total, count)
+    return [base + (1 if index < extra else 0) for index in range(count)]
+
+
+def least_loaded_quotas(total: int, loads: List[int]) -> List[int]:
+    """每次分给当前负载最小的专家（负载相同按顺序），返回各专家分得的数量"""
+    quotas = [0] * len(loads)
+    heap = [(load, index) for index, load in enumerate(loads)]
+    heapq.heapify(heap)
+    for _ in range(total):
+        load, index = heapq.heappop(heap)
+        quotas[index] += 1
+        heapq.heappush(heap, (load + 1, index))
+    return quotas
+
+
+def weighted_quotas(total: int, weights: List[float]) -> List[int]:
+    """按权重分配（最大余数法），数量之和等于total"""
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.sum() <= 0:
+        return round_robin_quotas(total, len(weights))
+    exact = total * weights / weights.sum()
+    quotas = np.floor(exact).astype(np.int64)
+    remainder = total - int(quotas.sum())
+    if remainder:
+        quotas[np.argsort(-(exact - quotas), kind="stable")[:remainder]] += 1
+    return quotas.tolist()
+
+
+def interleave(quotas: List[int]) -> np.ndarray:
+    """
+    返回长度为 sum(quotas) 的专家序号序列，每位专家的位置均匀分布
+    （第j份位于 (j+0.5)/quota 处），按ID排序的文档依次对应
+    """
+    positions = np.concatenate([
+        (np.arange(quota) + 0.5) / quota for quota in quotas if quota
+    ]) if any(quotas) else np.empty(0)
+    owners = np.repeat(np.arange(len(quotas)), quotas)
+    return owners[np.argsort(positions, kind="stable")]
+
+
+def _write_assignments(db: Session, document_ids: List[int], expert_ids: List[int], reassign: bool) -> int:
+    """用临时表一次UPDATE写入全部分配（不提交），返回实际分配的文档数"""
+    db.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {ASSIGNMENT_TABLE} "
+        "(document_id INTEGER PRIMARY KEY, expert_id INTEGER NOT NULL)"
+    ))
+    db.execute(text(f"DELETE FROM {ASSIGNMENT_TABLE}"))
+    db.execute(
+        text(f"INSERT INTO {ASSIGNMENT_TABLE} (document_id, expert_id) VALUES (:document_id, :expert_id)"),
+        [{"document_id": document_id, "expert_id": expert_id}
+         for document_id, expert_id in zip(document_ids, expert_ids)]
+    )
+    # reassign为False时只更新仍未分配的文档（选出后被他人领取的文档不覆盖）
+    unassigned_only = "" if reassign else " AND assigned_to IS NULL"
+    result = db.execute(text(
+        "UPDATE documents SET "
+        f"assigned_to = (SELECT expert_id FROM {ASSIGNMENT_TABLE} b WHERE b.document_id = documents.id), "
+        "lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP "
+        f"WHERE id IN (SELECT document_id FROM {ASSIGNMENT_TABLE}){unassigned_only}"
+    ))
+    db.execute(text(f"DROP TABLE {ASSIGNMENT_TABLE}"))
+    return result.rowcount
+
+
+def bulk_assign_documents(db: Session, document_ids: Optional[List[int]] = None,
+                          filters: Optional[dict] = None, expert_ids: Optional[List[int]] = None,
+                          strategy: str = "round_robin", reassign: bool = False,
+                          throughput_days: int = 30, dry_run: bool = False) -> dict:
+    """
+    批量分配文档
+
+    Returns:
+        分配汇总：文档数、跳过数、实际分配数及每位专家的分配前后负载
+    """
+    if document_ids is None and filters is None:
+        raise ValueError("需指定 document_ids 或 filter")
+    experts = get_experts(db, expert_ids)
+    if not experts:
+        raise ValueError("没有可分配的专家")
+
+    selected = select_documents(db, document_ids, filters, reassign)
+    ids = [expert.id for expert in experts]
+    loads = get_open_loads(db, ids)
+    throughputs = get_throughputs(db, ids, throughput_days) if strategy == "weighted" else {}
+
+    if strategy == "least_loaded":
+        quotas = least_loaded_quotas(len(selected), [loads[expert_id] for expert_id in ids])
+    elif strategy == "weighted":
+        quotas = weighted_quotas(len(selected), [throughputs[expert_id] for expert_id in ids])
+    else:
+        quotas = round_robin_quotas(len(selected), len(ids))
+
+    owners = [ids[index] for index in interleave(quotas)]
+    assigned = len(selected)
+    if not dry_run and selected:
+        assigned = _write_assignments(db, selected, owners, reassign)
+        db.commit()
+        # 批量分配只推送每位专家分得的数量，不逐篇列出
+        publish("documents_assigned", {
+            "count": assigned,
+            "experts": {str(expert_id): quota for expert_id, quota in zip(ids, quotas) if quota}
+        })
+
+    experts_summary = []
+    for expert, quota in zip(experts, quotas):
+        item = {
+            "expert_id": expert.id,
+            "expert_name": expert.full_name or expert.username,
+            "open_documents": loads[expert.id],
+            "assigned": quota,
+            "open_documents_after": loads[expert.id] + quota
+        }
+        if strategy == "weighted":
+            item["throughput_per_hour"] = round(throughputs[expert.id], 2)
+        experts_summary.append(item)
+
+    return {
+        "strategy": strategy,
+        "dry_run": dry_run,
+        "total_documents": len(selected),
+        "skipped": len(set(document_ids)) - len(selected) if document_ids is not None else 0,
+        "assigned": assigned,
+        "experts": experts_summary
+    }
@@ -0,0 +1,286 @@
+"""
+生成内容近似重复检测
+
+对 generated_content 的字符 shingle 计算 MinHash 签名，并按 LSH 分桶存入数据库：
+- 导入/创建文档时增量写入索引，同时与已有文档比对，标记所属重复组
+- 重复组以组内最早的文档为代表，其余文档的 duplicate_of 指向代表文档
+"""
+
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import or_, and_, insert
+from sqlalchemy.orm import Session
+
+from ..models.document import Document
+from ..models.fingerprint import DocumentFingerprint, DocumentLSHBucket
+
+# MinHash / LSH 参数：16个band × 8行，相似度约0.7以上的文档大概率落入同一桶
+NUM_PERM = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 5
+DUPLICATE_THRESHOLD = 0.8
+
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_SHINGLE_BASE = np.uint64(1000003)
+# 每次参与矩阵运算的shingle数，控制超长文档的临时内存
+_CHUNK_SIZE = 4096
+
+# 固定种子，保证不同进程、不同时间计算的签名一致
+# 采用 multiply-shift 哈希族：h(x) = ((a*x + b) mod 2^64) >> 32，a 为奇数
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(0, 1 << 62, size=NUM_PERM, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+_PERM_B = _rng.randint(0, 1 << 62, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """计算去除空白后的字符shingle哈希（去重后的uint64数组）"""
+    text = "".join(text.split()) if text else ""
+    if not text:
+        return np.empty(0, dtype=np.uint64)
+
+    codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    size = min(size, len(codepoints))
+    count = len(codepoints) - size + 1
+
+    # 多项式滚动哈希，uint64溢出即取模2^64
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        hashes = hashes * _SHINGLE_BASE + codepoints[offset:offset + count]
+    return np.unique(hashes)
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """计算文本的MinHash签名（长度为NUM_PERM的uint32数组）"""
+    shingles = shingle_hashes(text)
+    signature = np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    if shingles.size == 0:
+        return signature.astype(np.uint32)
+
+    # 原地运算，避免为每个中间结果分配 NUM_PERM × n 的临时数组
+    buffer = np.empty((NUM_PERM, min(shingles.size, _CHUNK_SIZE)), dtype=np.uint64)
+    for start in range(0, shingles.size, _CHUNK_SIZE):
+        chunk = shingles[start:start + _CHUNK_SIZE]
+        permuted = buffer[:, :chunk.size]
+        np.multiply(_PERM_A[:, None], chunk[None, :], out=permuted)
+        permuted += _PERM_B[:, None]
+        permuted >>= np.uint64(32)
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+
+    return signature.astype(np.uint32)
+
+
+def band_keys(signature: np.ndarray) -> List[int]:
+    """将签名切分为band并哈希为63位整数（可直接存入SQLite INTEGER）"""
+    keys = []
+    for band in signature.reshape(LSH_BANDS, LSH_ROWS):
+        digest = hashlib.blake2b(band.tobytes(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big") >> 1)
+    return keys
+
+
+def estimate_similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """估计一个签名与一组签名（二维数组）的Jaccard相似度"""
+    return (others == signature[None, :]).mean(axis=1)
+
+
+def _load_signatures(fingerprints: List[DocumentFingerprint]) -> np.ndarray:
+    return np.vstack([np.frombuffer(fp.signature, dtype=np.uint32) for fp in fingerprints])
+
+
+def _find_candidates(db: Session, keys: List[int], exclude_id: Optional[int] = None) -> List[DocumentFingerprint]:
+    """查询与给定band哈希落入同一桶的候选文档指纹"""
+    conditions = [
+        and_(DocumentLSHBucket.band == band, DocumentLSHBucket.bucket == bucket)
+        for band, bucket in enumerate(keys)
+    ]
+    query = db.query(DocumentLSHBucket.document_id).filter(or_(*conditions))
+    if exclude_id is not None:
+        query = query.filter(DocumentLSHBucket.document_id != exclude_id)
+    candidate_ids = [row.document_id for row in query.distinct()]
+    if not candidate_ids:
+        return []
+
+    return db.query(DocumentFingerprint).filter(
+        DocumentFingerprint.document_id.in_(candidate_ids)
+    ).all()
+
+
+def _rank_candidates(signature: np.ndarray, candidates: List[DocumentFingerprint]) -> List[Tuple[DocumentFingerprint, float]]:
+    """按估计相似度从高到低排序候选文档，相同相似度时ID小的优先"""
+    if not candidates:
+        return []
+    similarities = estimate_similarity(signature, _load_signatures(candidates))
+    ranked = sorted(
+        zip(candidates, similarities.tolist()),
+        key=lambda item: (-item[1], item[0].document_id)
+    )
+    return ranked
+
+
+def index_document(db: Session, document_id: int, text: str) -> DocumentFingerprint:
+    """
+    将文档加入近似重复索引，并标记其所属重复组
+
+    调用方负责提交事务（便于批量导入时与文档写入放在同一事务中）
+    """
+    signature = minhash_signature(text)
+    keys = band_keys(signature)
+
+    duplicate_of = None
+    similarity = None
+    ranked = _rank_candidates(signature, _find_candidates(db, keys, exclude_id=document_id))
+    if ranked and ranked[0][1] >= DUPLICATE_THRESHOLD:
+        best, similarity = ranked[0]
+        duplicate_of = best.duplicate_of or best.document_id
+
+    fingerprint = db.query(DocumentFingerprint).filter(
+        DocumentFingerprint.document_id == document_id
+    ).first()
+    if fingerprint:
+        fingerprint.signature = signature.tobytes()
+        fingerprint.duplicate_of = duplicate_of
+        fingerprint.similarity = similarity
+        db.query(DocumentLSHBucket).filter(
+            DocumentLSHBucket.document_id == document_id
+        ).delete(synchronize_session=False)
+    else:
+        fingerprint = DocumentFingerprint(
+            document_id=document_id,
+            signature=signature.tobytes(),
+            duplicate_of=duplicate_of,
+            similarity=similarity
+        )
+        db.add(fingerprint)
+
+    db.flush()
+    db.execute(insert(DocumentLSHBucket), [
+        {"band": band, "bucket": bucket, "document_id": document_id}
+        for band, bucket in enumerate(keys)
+    ])
+    return fingerprint
+
+
+def remove_document_from_index(db: Session, document_id: int):
+    """从索引中移除文档；若其为重复组代表，则由组内最早的文档接替（不提交）"""
+    members = db.query(DocumentFingerprint).filter(
+        DocumentFingerprint.duplicate_of == document_id
+    ).order_by(DocumentFingerprint.document_id).all()
+    if members:
+        new_root = members[0]
+        new_root.duplicate_of = None
+        new_root.similarity = None
+        for member in members[1:]:
+            member.duplicate_of = new_root.document_id
+
+    db.query(DocumentLSHBucket).filter(
+        DocumentLSHBucket.document_id == document_id
+    ).delete(synchronize_session=False)
+    db.query(DocumentFingerprint).filter(
+        DocumentFingerprint.document_id == document_id
+    ).delete(synchronize_session=False)
+    db.flush()
+
+
+def find_similar_documents(db: Session, document_id: int, threshold: float = DUPLICATE_THRESHOLD):
+    """查询与指定文档近似重复的文档（按相似度降序）"""
+    fingerprint = db.query(DocumentFingerprint).filter(
+        DocumentFingerprint.document_id == document_id
+    ).first()
+    if not fingerprint:
+        return None
+
+    signature = np.frombuffer(fingerprint.signature, dtype=np.uint32)
+    ranked = _rank_candidates(signature, _find_candidates(db, band_keys(signature), exclude_id=document_id))
+    return [
+        {"document_id": candidate.document_id, "similarity": round(similarity, 4)}
+        for candidate, similarity in ranked
+        if similarity >= threshold
+    ]
+
+
+def get_duplicate_map(db: Session, document_ids: List[int]) -> Dict[int, int]:
+    """批量查询文档所属重复组的代表文档ID"""
+    if not document_ids:
+        return {}
+    rows = db.query(
+        DocumentFingerprint.document_id, DocumentFingerprint.duplicate_of
+    ).filter(
+        DocumentFingerprint.document_id.in_(document_ids),
+        DocumentFingerprint.duplicate_of.isnot(None)
+    ).all()
+    return {row.document_id: row.duplicate_of for row in rows}
+
+
+def get_duplicate_group_ids(db: Session, document_id: int) -> List[int]:
+    """获取文档所在重复组的全部文档ID（包括代表文档）"""
+    fingerprint = db.query(DocumentFingerprint).filter(
+        DocumentFingerprint.document_id == document_id
+    ).first()
+    root_id = fingerprint.duplicate_of if fingerprint and fingerprint.duplicate_of else document_id
+    member_ids = [
+        row.document_id for row in db.query(DocumentFingerprint.document_id).filter(
+            DocumentFingerprint.duplicate_of == root_id
+        ).order_by(DocumentFingerprint.document_id)
+    ]
+    return [root_id] + member_ids
+
+
+def get_duplicate_groups(db: Session, skip: int = 0, limit: int = 100):
+    """分页列出重复组：代表文档及其近似重复文档"""
+    root_ids = [
+        row.duplicate_of for row in db.query(DocumentFingerprint.duplicate_of).filter(
+            DocumentFingerprint.duplicate_of.isnot(None)
+        ).distinct().order_by(DocumentFingerprint.duplicate_of).offset(skip).limit(limit)
+    ]
+    if not root_ids:
+        return []
+
+    members = db.query(
+        DocumentFingerprint.document_id,
+        DocumentFingerprint.duplicate_of,
+        DocumentFingerprint.similarity,
+        Document.title
+    ).join(
+        Document, Document.id == DocumentFingerprint.document_id
+    ).filter(
+        DocumentFingerprint.duplicate_of.in_(root_ids)
+    ).order_by(DocumentFingerprint.document_id).all()
+    titles = dict(db.query(Document.id, Document.title).filter(Document.id.in_(root_ids)).all())
+
+    groups = {
+        root_id: {"document_id": root_id, "title": titles.get(root_id), "duplicates": []}
+        for root_id in root_ids
+    }
+    for member in members:
+        groups[member.duplicate_of]["duplicates"].append({
+            "document_id": member.document_id,
+            "title": member.title,
+            "similarity": member.similarity
+        })
+    return list(groups.values())
+
+
+def rebuild_duplicate_index(db: Session, batch_size: int = 500) -> int:
+    """按文档ID顺序重建整个近似重复索引，返回处理的文档数"""
+    db.query(DocumentLSHBucket).delete(synchronize_session=False)
+    db.query(DocumentFingerprint).delete(synchronize_session=False)
+    db.commit()
+
+    processed = 0
+    last_id = 0
+    while True:
+        rows = db.query(Document.id, Document.generated_content).filter(
+            Document.id > last_id
+        ).order_by(Document.id).limit(batch_size).all()
+        if not rows:
+            break
+        for row in rows:
+            index_document(db, row.id, row.generated_content)
+        db.commit()
+        processed += len(rows)
+        last_id = rows[-1].id
+
+    return processed
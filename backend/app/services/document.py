@@ -1,8 +1,20 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+import os
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import func, cast, case, exists, and_, LargeBinary
+from sqlalchemy.orm import Session, undefer_group
+from ..blob_store import parse_digest, read_blob_range
+from ..cache import LRUCache
+from ..compression import BLOB_REF_SIZE
 from ..models.document import Document
 from ..models.annotation import Annotation
-from ..schemas.document import DocumentCreate, DocumentList
+from ..schemas.document import DocumentCreate
+from .dedup import index_document, get_duplicate_map, get_duplicate_group_ids
+from .search import add_to_search_index
+from .paragraphs import index_paragraphs, build_paragraph_index, load_offsets
+from ..models.paragraph import DocumentParagraphIndex
+from ..events import publish, counter_delta
 
 def create_document(db: Session, document: DocumentCreate):
     # 计算字数
@@ -18,68 +30,301 @@ def create_document(db: Session, document: DocumentCreate):
         word_count_generated=word_count_generated
     )
     db.add(db_document)
+    db.flush()
+
+    # 写入近似重复索引、段落索引和全文检索索引
+    index_document(db, db_document.id, db_document.generated_content)
+    index_paragraphs(db, db_document.id, db_document.source_content, db_document.generated_content)
+    add_to_search_index(db, db_document.id, db_document.title,
+                        db_document.source_content, db_document.generated_content)
+
     db.commit()
     db.refresh(db_document)
+    publish("documents_created", {
+        "document_ids": [db_document.id],
+        "counters": counter_delta(documents={db_document.status: 1})
+    })
     return db_document
 
-def get_documents(db: Session, skip: int = 0, limit: int = 2000, user_id: int = None, user_role: str = None):
+# 列表可用的排序字段
+SORT_COLUMNS = {
+    "id": Document.id,
+    "title": Document.title,
+    "status": Document.status,
+    "created_at": Document.created_at,
+    "updated_at": Document.updated_at,
+    "word_count_source": Document.word_count_source,
+    "word_count_generated": Document.word_count_generated,
+}
+ANNOTATION_STATUSES = ("未标注", "进行中", "已标注")
+
+def _annotation_status_condition(annotation_status: str, annotator_id: int = None):
+    """
+    标注状态筛选条件（EXISTS子查询，按文档逐条走 annotations.document_id 索引）
+    - 未标注：没有标注
+    - 进行中：存在未完成的标注
+    - 已标注：有标注且全部完成
+    annotator_id 不为空时只看该专家的标注
+    """
+    conditions = [Annotation.document_id == Document.id]
+    if annotator_id is not None:
+        conditions.append(Annotation.annotator_id == annotator_id)
+    has_any = exists().where(*conditions)
+    has_incomplete = exists().where(*conditions, Annotation.is_completed == False)
+
+    if annotation_status == "未标注":
+        return ~has_any
+    if annotation_status == "进行中":
+        return has_incomplete
+    return and_(has_any, ~has_incomplete)
+
+def apply_list_filters(query, status: str = None, assigned_to: int = None, unassigned: bool = False,
+                        annotation_status: str = None, annotator_id: int = None,
+                        created_from: datetime = None, created_to: datetime = None,
+                        updated_from: datetime = None, updated_to: datetime = None,
+                        sort: str = "id", order: str = "asc"):
+    """在SQL中应用列表筛选和排序（排序相同时按ID排序，保证分页稳定）"""
+    if status:
+        query = query.filter(Document.status == status)
+    if unassigned:
+        query = query.filter(Document.assigned_to.is_(None))
+    elif assigned_to is not None:
+        query = query.filter(Document.assigned_to == assigned_to)
+    if annotation_status:
+        query = query.filter(_annotation_status_condition(annotation_status, annotator_id))
+    if created_from:
+        query = query.filter(Document.created_at >= created_from)
+    if created_to:
+        query = query.filter(Document.created_at <= created_to)
+    if updated_from:
+        query = query.filter(Document.updated_at >= updated_from)
+    if updated_to:
+        query = query.filter(Document.updated_at <= updated_to)
+
+    column = SORT_COLUMNS[sort]
+    if order == "desc":
+        return query.order_by(column.desc(), Document.id.desc())
+    return query.order_by(column.asc(), Document.id.asc())
+
+def get_annotation_status_map(db: Session, document_ids: List[int], annotator_id: int = None) -> Dict[int, str]:
+    """一次聚合查询得到一批文档的标注状态（替代逐个文档计数）"""
+    if not document_ids:
+        return {}
+    query = db.query(
+        Annotation.document_id,
+        func.count(Annotation.id),
+        func.sum(case((Annotation.is_completed == True, 1), else_=0))
+    ).filter(Annotation.document_id.in_(document_ids))
+    if annotator_id is not None:
+        query = query.filter(Annotation.annotator_id == annotator_id)
+
+    status_map = {}
+    for document_id, annotation_count, completed_count in query.group_by(Annotation.document_id).all():
+        status_map[document_id] = "已标注" if completed_count == annotation_count else "进行中"
+    return status_map
+
+# 列表返回的列，顺序同 DocumentList 的字段
+LIST_COLUMNS = (
+    Document.id, Document.title, Document.status, Document.word_count_source,
+    Document.word_count_generated, Document.created_at, Document.assigned_to
+)
+
+def _to_document_list(db: Session, rows: list, annotator_id: int = None) -> List[dict]:
+    """
+    由查询结果元组直接构造列表行（字段和顺序同 DocumentList），不创建ORM实体和pydantic模型；
+    接口以 FastJSONResponse 直接编码，输出与经 response_model 序列化相同
+    """
+    ids = [row[0] for row in rows]
+    # 批量查询标注状态和近似重复标记
+    status_map = get_annotation_status_map(db, ids, annotator_id)
+    duplicate_map = get_duplicate_map(db, ids)
+
+    return [
+        {
+            "id": document_id,
+            "title": title,
+            "status": status,
+            "word_count_source": word_count_source,
+            "word_count_generated": word_count_generated,
+            "created_at": created_at.isoformat(),
+            "assigned_to": assigned_to,
+            "annotation_status": status_map.get(document_id, "未标注"),
+            "duplicate_of": duplicate_map.get(document_id)
+        }
+        for document_id, title, status, word_count_source, word_count_generated, created_at, assigned_to in rows
+    ]
+
+def get_documents(db: Session, skip: int = 0, limit: int = 2000, user_id: int = None, user_role: str = None,
+                  **filters):
     """
     根据用户权限获取文档列表
     - 管理员：可以看到所有文档
     - 专家：只能看到分配给自己的文档和未分配的文档
+
+    filters 为筛选和排序参数（status、assigned_to、unassigned、annotation_status、
+    created_from/created_to、updated_from/updated_to、sort、order），均在SQL中执行；
+    返回 DocumentList 字段的 dict 列表
     """
-    if user_role == "admin":
-        # 管理员看到所有文档
-        documents = db.query(Document).offset(skip).limit(limit).all()
-    else:
+    query = db.query(*LIST_COLUMNS)
+    if user_role != "admin":
         # 专家只能看到分配给自己的文档和未分配的文档
-        documents = db.query(Document).filter(
+        query = query.filter(
             (Document.assigned_to.is_(None)) | (Document.assigned_to == user_id)
-        ).offset(skip).limit(limit).all()
-
-    # 为每个文档添加标注状态信息
-    result = []
-    for doc in documents:
-        # 检查该文档的标注情况
-        annotation_count = db.query(Annotation).filter(Annotation.document_id == doc.id).count()
-        completed_count = db.query(Annotation).filter(
-            Annotation.document_id == doc.id,
-            Annotation.is_completed == True
-        ).count()
-
-        # 确定标注状态
-        if annotation_count == 0:
-            annotation_status = "未标注"
-        elif completed_count == annotation_count:
-            annotation_status = "已标注"
-        else:
-            annotation_status = "进行中"
-
-        # 创建DocumentList对象
-        doc_list = DocumentList(
-            id=doc.id,
-            title=doc.title,
-            status=doc.status,
-            word_count_source=doc.word_count_source,
-            word_count_generated=doc.word_count_generated,
-            created_at=doc.created_at.isoformat(),
-            assigned_to=doc.assigned_to,
-            annotation_status=annotation_status
         )
-        result.append(doc_list)
 
-    return result
+    rows = apply_list_filters(query, **filters).offset(skip).limit(limit).all()
+    return _to_document_list(db, rows)
+
+def get_document(db: Session, document_id: int, with_content: bool = False):
+    """获取文档；with_content为True时同时加载原始素材和生成内容"""
+    query = db.query(Document)
+    if with_content:
+        query = query.options(undefer_group("content"))
+    return query.filter(Document.id == document_id).first()
+
+CONTENT_FIELDS = ("source", "generated")
+
+def get_content_refs(db: Session, document_id: int) -> Dict[str, Optional[str]]:
+    """
+    查询正文的文件存储引用 {"source": sha256或None, "generated": ...}
+
+    只读取列值的长度和开头的引用部分，不加载、不解压正文；
+    存在数据库中的正文对应None。
+    """
+    columns = []
+    for field in CONTENT_FIELDS:
+        raw = cast(getattr(Document, f"{field}_content"), LargeBinary)
+        columns.append(func.length(raw))
+        columns.append(func.substr(raw, 1, BLOB_REF_SIZE))
+
+    row = db.query(*columns).filter(Document.id == document_id).first()
+    if row is None:
+        return {field: None for field in CONTENT_FIELDS}
+
+    refs = {}
+    for index, field in enumerate(CONTENT_FIELDS):
+        length, head = row[index * 2], row[index * 2 + 1]
+        refs[field] = parse_digest(head) if length == len(head or b"") else None
+    return refs
 
-def get_document(db: Session, document_id: int):
-    return db.query(Document).filter(Document.id == document_id).first()
+# 文档正文缓存，容量按估算的内存占用限制（DOCUMENT_CACHE_MB，默认64MB）
+document_cache = LRUCache(int(os.environ.get("DOCUMENT_CACHE_MB", "64")) * 1024 * 1024)
 
-def check_document_permission(db: Session, document_id: int, user_id: int, user_role: str):
+def get_document_contents(db: Session, document: Document, content: str = "inline") -> dict:
+    """
+    获取文档的正文部分，按 (id, content) 缓存，并以 (created_at, updated_at) 校验版本
+
+    content=inline 返回正文全文，content=url 返回正文下载地址及文件存储的SHA-256。
+    正文创建后不再修改，命中缓存时不加载、不解压正文列。
+    """
+    def load():
+        if content == "inline":
+            return {
+                "source_content": document.source_content,
+                "generated_content": document.generated_content
+            }
+        refs = get_content_refs(db, document.id)
+        fields = {}
+        for field in CONTENT_FIELDS:
+            fields[f"{field}_content_url"] = f"/api/documents/{document.id}/content/{field}"
+            if refs[field]:
+                fields[f"{field}_content_sha256"] = refs[field]
+        return fields
+
+    key = (document.id, content)
+    version = (document.created_at, document.updated_at)
+    cached = document_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    fields = load()
+    document_cache.set(key, (version, fields))
+    return fields
+
+def invalidate_document_cache(document_id: int):
+    """文档被删除或替换时清除缓存（SQLite可能复用被删除的ID）"""
+    for content in ("inline", "url"):
+        document_cache.pop((document_id, content))
+
+def document_etag(document: Document, annotations: List[Annotation], *extra) -> str:
+    """
+    根据文档元数据与标注生成强ETag
+
+    updated_at 只精确到秒，因此同时计入标注的全部字段，
+    同一秒内的多次保存也会得到不同的ETag。
+    """
+    state = (
+        document.id, document.title, document.status, document.assigned_to,
+        document.word_count_source, document.word_count_generated,
+        document.created_at, document.updated_at,
+        [(annotation.id, annotation.annotator_id, annotation.evaluation, annotation.comments,
+          annotation.time_spent, annotation.is_completed, annotation.created_at, annotation.updated_at)
+         for annotation in annotations],
+        extra
+    )
+    return '"%s"' % hashlib.blake2b(repr(state).encode("utf-8"), digest_size=16).hexdigest()
+
+def get_paragraph_index(db: Session, document: Document, field: str) -> DocumentParagraphIndex:
+    """获取正文的段落索引；早于段落索引导入的文档在首次访问时补建"""
+    index = db.get(DocumentParagraphIndex, (document.id, field))
+    if index is not None:
+        return index
+
+    text = get_document_contents(db, document)[f"{field}_content"]
+    index = db.merge(build_paragraph_index(document.id, field, text))
+    try:
+        db.commit()
+    except Exception:
+        # 并发请求已补建同一索引
+        db.rollback()
+        index = db.get(DocumentParagraphIndex, (document.id, field))
+    return index
+
+def get_paragraphs(db: Session, document: Document, field: str, start: int, count: int) -> dict:
+    """
+    读取正文第 start 段起的 count 段
+
+    正文位于文件存储时只通过mmap读取这些段落所在的字节范围，与正文总长度无关；
+    位于数据库时从文档缓存中的全文切片。
+    """
+    index = get_paragraph_index(db, document, field)
+    char_offsets, byte_offsets = load_offsets(index, start, count)
+
+    paragraphs = []
+    if len(char_offsets):
+        digest = get_content_refs(db, document.id)[field]
+        if digest:
+            base = int(byte_offsets[0, 0])
+            chunk = read_blob_range(digest, base, int(byte_offsets[-1, 1]) - 1)
+            texts = [str(chunk[begin - base:end - base], "utf-8") for begin, end in byte_offsets.tolist()]
+        else:
+            text = get_document_contents(db, document)[f"{field}_content"]
+            texts = [text[begin:end] for begin, end in char_offsets.tolist()]
+
+        for offset, (paragraph_text, (char_start, char_end)) in enumerate(zip(texts, char_offsets.tolist())):
+            paragraphs.append({
+                "index": start + offset,
+                "text": paragraph_text,
+                "char_start": char_start,
+                "char_end": char_end
+            })
+
+    return {
+        "document_id": document.id,
+        "field": field,
+        "total": index.paragraph_count,
+        "start": start,
+        "paragraphs": paragraphs
+    }
+
+def check_document_permission(db: Session, document_id: int, user_id: int, user_role: str,
+                              with_content: bool = False):
     """
     检查用户是否有权限访问文档
     - 管理员：可以访问所有文档
     - 专家：只能访问分配给自己的文档和未分配的文档
     """
-    document = get_document(db, document_id)
+    document = get_document(db, document_id, with_content=with_content)
     if not document:
         return False, None
 
@@ -90,44 +335,34 @@ def check_document_permission(db: Session, document_id: int, user_id: int, user_
     else:
         return False, document
 
-def assign_document(db: Session, document_id: int, assigned_to: int):
-    """分配文档给指定用户"""
+def assign_document(db: Session, document_id: int, assigned_to: int, include_duplicates: bool = False):
+    """分配文档给指定用户；include_duplicates为True时整组近似重复文档一并分配"""
     document = get_document(db, document_id)
     if not document:
         return None
 
+    # 管理员分配为长期分配，清除领取租约
     document.assigned_to = assigned_to
+    document.lease_expires_at = None
+    group_ids = []
+    if include_duplicates:
+        group_ids = get_duplicate_group_ids(db, document_id)
+        db.query(Document).filter(Document.id.in_(group_ids)).update(
+            {Document.assigned_to: assigned_to, Document.lease_expires_at: None}, synchronize_session=False
+        )
     db.commit()
     db.refresh(document)
+    publish("documents_assigned", {
+        "document_ids": group_ids if include_duplicates else [document_id],
+        "assigned_to": assigned_to
+    })
     return document
 
-def get_user_documents(db: Session, user_id: int, skip: int = 0, limit: int = 1000):
-    """获取分配给指定用户的所有文档"""
-    documents = db.query(Document).filter(Document.assigned_to == user_id).offset(skip).limit(limit).all()
-
-    result = []
-    for doc in documents:
-        # 检查该用户的标注情况
-        annotation = db.query(Annotation).filter(
-            Annotation.document_id == doc.id,
-            Annotation.annotator_id == user_id
-        ).first()
-
-        annotation_status = "已标注" if annotation and annotation.is_completed else "进行中" if annotation else "未标注"
-
-        doc_list = DocumentList(
-            id=doc.id,
-            title=doc.title,
-            status=doc.status,
-            word_count_source=doc.word_count_source,
-            word_count_generated=doc.word_count_generated,
-            created_at=doc.created_at.isoformat(),
-            assigned_to=doc.assigned_to,
-            annotation_status=annotation_status
-        )
-        result.append(doc_list)
-
-    return result
+def get_user_documents(db: Session, user_id: int, skip: int = 0, limit: int = 1000, **filters):
+    """获取分配给指定用户的文档（标注状态按该用户自己的标注计算）"""
+    query = db.query(*LIST_COLUMNS).filter(Document.assigned_to == user_id)
+    rows = apply_list_filters(query, annotator_id=user_id, **filters).offset(skip).limit(limit).all()
+    return _to_document_list(db, rows, annotator_id=user_id)
 
 def get_document_with_annotation(db: Session, document_id: int, user_id: int):
     document = get_document(db, document_id)
@@ -0,0 +1,205 @@
+"""
+文档导入数据源适配器
+
+将不同形式的数据源统一为逐个产出的文档字典（title / source_content / generated_content，
+可选 status / assigned_to），供导入脚本的验证与写入流程使用：
+- JSON 文件：单个文档对象或文档数组
+- 目录：每个子目录包含一对 source.txt / generated.txt（可选 meta.json）
+- .tar / .tar.gz / .tgz 等归档：与目录结构相同，流式读取，不解压到磁盘
+- .zip 归档：与目录结构相同，按成员直接读取，不解压到磁盘
+"""
+
+import json
+import mmap
+import os
+import posixpath
+import tarfile
+import zipfile
+from typing import Any, Callable, Dict, Iterator, Optional
+
+SOURCE_FILENAME = "source.txt"
+GENERATED_FILENAME = "generated.txt"
+META_FILENAME = "meta.json"
+ENTRY_FILENAMES = {SOURCE_FILENAME, GENERATED_FILENAME, META_FILENAME}
+
+# 超过该大小的文件通过mmap读取，避免额外的用户态缓冲拷贝
+MMAP_THRESHOLD = 1 << 20
+# 流式读取归档时的缓冲区大小
+READ_BUFFER_SIZE = 1 << 20
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+class DocumentSourceError(Exception):
+    """数据源无法识别或读取"""
+
+
+def _decode(data) -> str:
+    """按UTF-8解码（兼容BOM），data可以是bytes或mmap等缓冲区对象"""
+    return str(data, "utf-8-sig")
+
+
+def read_text_file(path: str) -> str:
+    """读取文本文件，大文件使用mmap直接解码"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size < MMAP_THRESHOLD:
+            return _decode(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _decode(mm)
+
+
+def _build_entry(title: str, parts: Dict[str, str]) -> Dict[str, Any]:
+    """由一个条目（目录）中已解码的文件内容构造文档字典"""
+    meta = {}
+    if META_FILENAME in parts:
+        meta = json.loads(parts[META_FILENAME])
+        if not isinstance(meta, dict):
+            raise DocumentSourceError(f"{title}/{META_FILENAME} 必须是JSON对象")
+
+    doc_data = dict(meta)
+    doc_data.setdefault("title", title)
+    doc_data["source_content"] = parts[SOURCE_FILENAME]
+    doc_data["generated_content"] = parts[GENERATED_FILENAME]
+    return doc_data
+
+
+def _load_entry(title: str, load_parts: Callable[[], Dict[str, str]]) -> Optional[Dict[str, Any]]:
+    """读取并构造一个条目；文件不是UTF-8或 meta.json 无效时打印警告并返回None（跳过该条目，继续导入）"""
+    try:
+        return _build_entry(title, load_parts())
+    except (ValueError, DocumentSourceError) as e:
+        # UnicodeDecodeError 与 json.JSONDecodeError 均为 ValueError
+        print(f"警告: 条目 {title} 无法读取（{e}），已跳过")
+        return None
+
+
+def _is_complete(parts: Dict[str, Any]) -> bool:
+    return SOURCE_FILENAME in parts and GENERATED_FILENAME in parts
+
+
+def _entry_title(dirname: str, fallback: str) -> str:
+    return posixpath.basename(dirname.rstrip("/")) or fallback
+
+
+def _archive_stem(path: str) -> str:
+    name = os.path.basename(path)
+    for suffix in TAR_SUFFIXES + (".zip",):
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def iter_json_file(path: str) -> Iterator[Dict[str, Any]]:
+    """读取JSON文件：支持单个文档对象或文档数组"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        yield data
+    elif isinstance(data, list):
+        yield from data
+    else:
+        raise DocumentSourceError("JSON文件根元素必须是对象或数组")
+
+
+def iter_directory(path: str) -> Iterator[Dict[str, Any]]:
+    """遍历目录，每个同时包含 source.txt 和 generated.txt 的子目录产出一个文档"""
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        names = ENTRY_FILENAMES.intersection(filenames)
+        if not _is_complete(names):
+            continue
+
+        entry = _load_entry(os.path.basename(os.path.normpath(dirpath)),
+                            lambda: {name: read_text_file(os.path.join(dirpath, name)) for name in names})
+        if entry is not None:
+            yield entry
+
+
+def iter_tar(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    流式读取tar归档（支持gz/bz2/xz压缩），不解压到磁盘
+
+    成员按归档顺序读取，读到其他目录的成员时，之前已凑齐的条目即产出并释放，
+    内存占用取决于单个条目大小而非归档大小。
+    """
+    fallback_title = _archive_stem(path)
+    pending: Dict[str, Dict[str, bytes]] = {}
+
+    def load(dirname: str, parts: Dict[str, bytes]) -> Optional[Dict[str, Any]]:
+        return _load_entry(_entry_title(dirname, fallback_title),
+                           lambda: {filename: _decode(data) for filename, data in parts.items()})
+    current_dir: Optional[str] = None
+
+    with open(path, "rb", buffering=READ_BUFFER_SIZE) as raw:
+        with tarfile.open(fileobj=raw, mode="r|*") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                dirname, filename = posixpath.split(member.name)
+                if filename not in ENTRY_FILENAMES:
+                    continue
+
+                if dirname != current_dir:
+                    for done_dir in [d for d in pending if _is_complete(pending[d])]:
+                        entry = load(done_dir, pending.pop(done_dir))
+                        if entry is not None:
+                            yield entry
+                    current_dir = dirname
+
+                # 流式模式下必须在读取下一个成员之前读完当前成员；条目凑齐后才解码
+                pending.setdefault(dirname, {})[filename] = tar.extractfile(member).read()
+
+    for dirname, parts in pending.items():
+        if _is_complete(parts):
+            entry = load(dirname, parts)
+            if entry is not None:
+                yield entry
+        else:
+            print(f"警告: 归档条目 {dirname or '/'} 缺少 {SOURCE_FILENAME} 或 {GENERATED_FILENAME}，已跳过")
+
+
+def iter_zip(path: str) -> Iterator[Dict[str, Any]]:
+    """读取zip归档，不解压到磁盘，成员通过带大缓冲区的文件对象读取"""
+    fallback_title = _archive_stem(path)
+
+    with open(path, "rb", buffering=READ_BUFFER_SIZE) as f:
+        with zipfile.ZipFile(f) as zf:
+            # 中央目录中已有全部成员信息，先按目录分组（保持归档内顺序）
+            entries: Dict[str, Dict[str, zipfile.ZipInfo]] = {}
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                dirname, filename = posixpath.split(info.filename)
+                if filename in ENTRY_FILENAMES:
+                    entries.setdefault(dirname, {})[filename] = info
+
+            for dirname, infos in entries.items():
+                if not _is_complete(infos):
+                    print(f"警告: 归档条目 {dirname or '/'} 缺少 {SOURCE_FILENAME} 或 {GENERATED_FILENAME}，已跳过")
+                    continue
+                entry = _load_entry(_entry_title(dirname, fallback_title),
+                                    lambda: {filename: _decode(zf.read(info)) for filename, info in infos.items()})
+                if entry is not None:
+                    yield entry
+
+
+def iter_documents(path: str) -> Iterator[Dict[str, Any]]:
+    """根据路径类型选择数据源适配器"""
+    lower = path.lower()
+    if os.path.isdir(path):
+        return iter_directory(path)
+    if not os.path.exists(path):
+        raise DocumentSourceError(f"找不到数据源 {path}")
+    if lower.endswith(".zip"):
+        return iter_zip(path)
+    if lower.endswith(TAR_SUFFIXES):
+        return iter_tar(path)
+    if lower.endswith(".json"):
+        return iter_json_file(path)
+    if tarfile.is_tarfile(path):
+        return iter_tar(path)
+    if zipfile.is_zipfile(path):
+        return iter_zip(path)
+    return iter_json_file(path)
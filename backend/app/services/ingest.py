@@ -0,0 +1,208 @@
+"""
+文档批量写入流程
+
+导入脚本（import_documents.py）与批量导入接口（POST /api/documents/bulk）共用：
+- 验证文档字段
+- 按批预取已存在的标题与目标专家，避免逐条查询
+- 整批写入同一事务，并同步写入近似重复索引
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..events import publish, counter_delta
+from ..models.document import Document
+from ..models.user import User
+from .dedup import index_document, remove_document_from_index
+from .document import invalidate_document_cache
+from .paragraphs import index_paragraphs, remove_paragraph_index
+from .search import add_to_search_index, remove_from_search_index
+
+VALID_STATUSES = ['pending', 'in_progress', 'completed']
+REQUIRED_FIELDS = ['title', 'source_content', 'generated_content']
+DEFAULT_BATCH_SIZE = 500
+
+
+def count_words(text: str) -> int:
+    """统计中文字符数（简单统计）"""
+    if not text:
+        return 0
+    # 对于中文，按字符数统计；对于英文，按单词数统计
+    chinese_chars = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
+    english_words = len([w for w in text.replace('\n', ' ').split(' ') if w.strip()])
+    return chinese_chars + english_words
+
+
+def validate_document_data(doc_data: Any) -> List[str]:
+    """验证单个文档数据的完整性和格式，返回错误列表（为空表示通过）"""
+    if not isinstance(doc_data, dict):
+        return ["文档必须是JSON对象"]
+
+    errors = []
+
+    # 检查必需字段
+    for field in REQUIRED_FIELDS:
+        if not doc_data.get(field):
+            errors.append(f"缺少必需字段: {field}")
+        elif not isinstance(doc_data[field], str):
+            errors.append(f"字段 {field} 必须是字符串类型")
+
+    # 检查字段长度限制
+    title = doc_data.get('title', '')
+    if isinstance(title, str) and len(title) > 500:
+        errors.append("标题长度超过500个字符限制")
+
+    # 检查status值
+    status = doc_data.get('status', 'pending')
+    if status not in VALID_STATUSES:
+        errors.append(f"无效的status值: {status}，有效值为: {', '.join(VALID_STATUSES)}")
+
+    assigned_to = doc_data.get('assigned_to')
+    if assigned_to is not None and (isinstance(assigned_to, bool) or not isinstance(assigned_to, int)):
+        errors.append("字段 assigned_to 必须是整数")
+
+    return errors
+
+
+def build_document(doc_data: Dict[str, Any], assigned_to: Optional[int]) -> Document:
+    """由已验证的文档数据构造文档对象"""
+    return Document(
+        title=doc_data['title'],
+        source_content=doc_data['source_content'],
+        generated_content=doc_data['generated_content'],
+        status=doc_data.get('status', 'pending'),
+        assigned_to=assigned_to,
+        word_count_source=count_words(doc_data['source_content']),
+        word_count_generated=count_words(doc_data['generated_content'])
+    )
+
+
+def _resolve_assignees(db: Session, valid_items: List[Tuple[int, Dict[str, Any]]]) -> Dict[int, str]:
+    """批量查询文档中引用的用户，返回 {用户ID: 角色}"""
+    user_ids = {doc_data['assigned_to'] for _, doc_data in valid_items if doc_data.get('assigned_to') is not None}
+    if not user_ids:
+        return {}
+    return dict(db.query(User.id, User.role).filter(User.id.in_(user_ids)).all())
+
+
+def _write_batch(db: Session, valid_items: List[Tuple[int, Dict[str, Any]]],
+                 overwrite: bool, status_delta: Counter) -> List[Dict[str, Any]]:
+    """在当前事务中写入一批已验证的文档（不提交），status_delta 累加各状态文档数的变化"""
+    results = []
+
+    titles = {doc_data['title'] for _, doc_data in valid_items}
+    existing = {
+        title: doc_id for doc_id, title in
+        db.query(Document.id, Document.title).filter(Document.title.in_(titles)).all()
+    }
+    user_roles = _resolve_assignees(db, valid_items)
+
+    for key, doc_data in valid_items:
+        title = doc_data['title']
+        result = {"key": key, "title": title}
+
+        replaced_id = existing.get(title)
+        if replaced_id is not None:
+            if not overwrite:
+                result.update(status="skipped", reason="已存在相同标题的文档")
+                results.append(result)
+                continue
+            remove_document_from_index(db, replaced_id)
+            remove_paragraph_index(db, replaced_id)
+            remove_from_search_index(db, replaced_id)
+            replaced = db.get(Document, replaced_id)
+            status_delta[replaced.status] -= 1
+            db.delete(replaced)
+            invalidate_document_cache(replaced_id)
+            result["replaced"] = replaced_id
+
+        warnings = []
+        assigned_to = doc_data.get('assigned_to')
+        if assigned_to is not None:
+            role = user_roles.get(assigned_to)
+            if role is None:
+                warnings.append(f"用户ID {assigned_to} 不存在，文档将不被分配")
+                assigned_to = None
+            elif role != 'expert':
+                warnings.append(f"用户ID {assigned_to} 不是专家角色，文档将不被分配")
+                assigned_to = None
+
+        db_document = build_document(doc_data, assigned_to)
+        db.add(db_document)
+        db.flush()
+        status_delta[db_document.status] += 1
+
+        # 同一批次内标题重复时，后出现的文档按已存在处理
+        existing[title] = db_document.id
+
+        fingerprint = index_document(db, db_document.id, db_document.generated_content)
+        index_paragraphs(db, db_document.id, doc_data['source_content'], doc_data['generated_content'])
+        add_to_search_index(db, db_document.id, title, doc_data['source_content'], doc_data['generated_content'])
+        result.update(status="created", document_id=db_document.id)
+        if fingerprint.duplicate_of:
+            result.update(duplicate_of=fingerprint.duplicate_of, similarity=round(fingerprint.similarity, 4))
+        if warnings:
+            result["warnings"] = warnings
+        results.append(result)
+
+    return results
+
+
+def publish_imported(results: List[Dict[str, Any]], status_delta: Counter):
+    """推送导入事件（提交后调用）"""
+    created = sum(1 for result in results if result["status"] == "created")
+    if created:
+        publish("documents_created", {"count": created, "counters": counter_delta(documents=status_delta)})
+
+
+def ingest_batch(db: Session, batch: List[Tuple[int, Any]], overwrite: bool = False,
+                 commit: bool = True, status_delta: Optional[Counter] = None) -> List[Dict[str, Any]]:
+    """
+    验证并写入一批文档
+
+    Args:
+        db: 数据库会话
+        batch: (编号, 文档数据) 列表，编号用于在结果中定位（如行号、序号）
+        overwrite: 是否覆盖已存在的文档（根据标题判断）
+        commit: 是否在写入后提交；为False时由调用方控制事务（如整体原子导入）
+        status_delta: commit为False时由调用方传入，累加文档状态计数的变化，提交后调用 publish_imported
+
+    Returns:
+        按输入顺序排列的结果列表，status 为 created / skipped / invalid / error
+    """
+    results = {}
+    valid_items = []
+    for key, doc_data in batch:
+        errors = validate_document_data(doc_data)
+        if errors:
+            title = doc_data.get('title') if isinstance(doc_data, dict) else None
+            results[key] = {"key": key, "title": title, "status": "invalid", "errors": errors}
+        else:
+            valid_items.append((key, doc_data))
+
+    if valid_items:
+        delta = Counter()
+        try:
+            batch_results = _write_batch(db, valid_items, overwrite, delta)
+            for result in batch_results:
+                results[result["key"]] = result
+            if commit:
+                db.commit()
+                publish_imported(batch_results, delta)
+            elif status_delta is not None:
+                status_delta.update(delta)
+        except Exception as e:
+            db.rollback()
+            if not commit:
+                raise
+            if len(valid_items) == 1:
+                key, doc_data = valid_items[0]
+                results[key] = {"key": key, "title": doc_data['title'], "status": "error", "errors": [str(e)]}
+            else:
+                # 整批失败时逐条重试，定位出错的文档
+                for item in valid_items:
+                    results[item[0]] = ingest_batch(db, [item], overwrite)[0]
+
+    return [results[key] for key, _ in batch]
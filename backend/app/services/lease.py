@@ -0,0 +1,172 @@
+"""
+文档领取队列
+
+专家通过 POST /api/documents/next 领取下一篇未分配的文档，领取即获得租约：
+- 领取使用单条条件UPDATE（WHERE assigned_to IS NULL），并发领取时同一文档只会分给一人
+- 租约期间可续期或主动释放；标注完成后租约转为长期分配
+- 到期未完成的文档在下次有人领取时收回（重新变为未分配）
+- 专家已持有未完成的租约时再次领取，返回该文档而不是新领一篇
+
+管理员分配和手动认领（POST /claim/{id}）不带租约，不会被收回。
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.orm import Session
+
+from ..models.document import Document
+from ..events import publish
+
+LEASE_SECONDS = int(os.environ.get("DOCUMENT_LEASE_SECONDS", "1800"))
+# 条件UPDATE未命中（候选文档被其他连接抢先领取）时的重试次数
+CLAIM_RETRIES = 5
+
+# 与部分索引 ix_documents_claimable 的条件一致，查询才能使用该索引
+CLAIMABLE_CONDITION = "assigned_to IS NULL AND status != 'completed'"
+# 未执行 ANALYZE 时SQLite倾向于使用 (assigned_to, status, id) 索引再对全部未分配文档排序，
+# 指定部分索引后按id顺序取第一条即可（10万篇文档、2.5万篇未分配时 2.2 ms -> 0.005 ms）
+SQLITE_CLAIMABLE_FROM = "documents INDEXED BY ix_documents_claimable"
+
+_HAS_EXPIRED_SQL = text(
+    "SELECT 1 FROM documents WHERE lease_expires_at IS NOT NULL AND lease_expires_at < :now LIMIT 1"
+).bindparams(bindparam("now", type_=DateTime()))
+
+_RECLAIM_SQL = text(
+    "UPDATE documents SET assigned_to = NULL, lease_expires_at = NULL "
+    "WHERE lease_expires_at IS NOT NULL AND lease_expires_at < :now"
+).bindparams(bindparam("now", type_=DateTime()))
+
+_CLAIM_NEXT_SQL = (
+    "UPDATE documents SET assigned_to = :user_id, lease_expires_at = :expires "
+    "WHERE id = (SELECT id FROM {source} WHERE " + CLAIMABLE_CONDITION + " ORDER BY id LIMIT 1) "
+    "AND assigned_to IS NULL RETURNING id"
+)
+
+_CANDIDATES_SQL = "SELECT id FROM {source} WHERE " + CLAIMABLE_CONDITION + " ORDER BY id LIMIT :limit"
+
+_CLAIM_ONE_SQL = text(
+    "UPDATE documents SET assigned_to = :user_id, lease_expires_at = :expires "
+    "WHERE id = :document_id AND assigned_to IS NULL"
+).bindparams(bindparam("expires", type_=DateTime()))
+
+
+def _expires_at(lease_seconds: int) -> datetime:
+    return datetime.utcnow() + timedelta(seconds=lease_seconds)
+
+
+def reclaim_expired_leases(db: Session) -> int:
+    """收回已过期的租约，返回收回的文档数"""
+    now = datetime.utcnow()
+    # 先用只读查询判断，没有过期租约时不开启写事务，避免每次领取都争用写锁
+    if db.execute(_HAS_EXPIRED_SQL, {"now": now}).first() is None:
+        db.rollback()
+        return 0
+    result = db.execute(_RECLAIM_SQL, {"now": now})
+    db.commit()
+    publish("leases_reclaimed", {"count": result.rowcount})
+    return result.rowcount
+
+
+def get_active_lease(db: Session, user_id: int) -> Optional[Document]:
+    """专家当前持有的未完成租约文档"""
+    return db.query(Document).filter(
+        Document.assigned_to == user_id,
+        Document.lease_expires_at.isnot(None),
+        Document.status != "completed"
+    ).order_by(Document.id).first()
+
+
+def _claimable_sql(db: Session, sql: str):
+    source = SQLITE_CLAIMABLE_FROM if db.get_bind().dialect.name == "sqlite" else "documents"
+    return text(sql.format(source=source))
+
+
+def _claim_next_id(db: Session, user_id: int, expires: datetime) -> Optional[int]:
+    params = {"user_id": user_id, "expires": expires}
+    if db.get_bind().dialect.update_returning:
+        # 选取与更新在同一条语句中完成；外层条件保证被抢先领取时不会覆盖
+        statement = _claimable_sql(db, _CLAIM_NEXT_SQL).bindparams(bindparam("expires", type_=DateTime()))
+        return db.execute(statement, params).scalar()
+
+    # 不支持 UPDATE ... RETURNING 时逐个尝试候选文档
+    candidates = [row[0] for row in db.execute(_claimable_sql(db, _CANDIDATES_SQL), {"limit": CLAIM_RETRIES})]
+    for document_id in candidates:
+        if db.execute(_CLAIM_ONE_SQL, dict(params, document_id=document_id)).rowcount == 1:
+            return document_id
+    return None
+
+
+def lease_next_document(db: Session, user_id: int, lease_seconds: int = LEASE_SECONDS) -> Optional[Document]:
+    """
+    为专家领取下一篇文档（按id顺序），返回带租约的文档；没有可领取的文档时返回None
+    """
+    reclaim_expired_leases(db)
+
+    document = get_active_lease(db, user_id)
+    if document:
+        document.lease_expires_at = _expires_at(lease_seconds)
+        db.commit()
+        db.refresh(document)
+        return document
+
+    for _ in range(CLAIM_RETRIES):
+        document_id = _claim_next_id(db, user_id, _expires_at(lease_seconds))
+        db.commit()
+        if document_id is not None:
+            publish("documents_assigned", {"document_ids": [document_id], "assigned_to": user_id, "lease": True})
+            return db.query(Document).filter(Document.id == document_id).first()
+        # 未命中：没有可领取的文档，或候选文档刚被其他连接领取
+        if db.execute(_claimable_sql(db, _CANDIDATES_SQL), {"limit": 1}).first() is None:
+            return None
+    return None
+
+
+def renew_lease(db: Session, document_id: int, user_id: int,
+                lease_seconds: int = LEASE_SECONDS) -> Optional[Document]:
+    """续期专家持有的租约（尚未被收回的过期租约也可续期），未持有时返回None"""
+    updated = db.query(Document).filter(
+        Document.id == document_id,
+        Document.assigned_to == user_id,
+        Document.lease_expires_at.isnot(None)
+    ).update({Document.lease_expires_at: _expires_at(lease_seconds)}, synchronize_session=False)
+    db.commit()
+    if not updated:
+        return None
+    return db.query(Document).filter(Document.id == document_id).first()
+
+
+def release_lease(db: Session, document_id: int, user_id: int) -> bool:
+    """专家主动释放租约，文档重新变为未分配"""
+    updated = db.query(Document).filter(
+        Document.id == document_id,
+        Document.assigned_to == user_id,
+        Document.lease_expires_at.isnot(None)
+    ).update({Document.assigned_to: None, Document.lease_expires_at: None}, synchronize_session=False)
+    db.commit()
+    if updated:
+        publish("documents_assigned", {"document_ids": [document_id], "assigned_to": None})
+    return updated > 0
+
+
+def finish_lease(db: Session, document_id: int, user_id: int):
+    """标注完成后租约转为长期分配，不再被收回（不提交）"""
+    db.query(Document).filter(
+        Document.id == document_id,
+        Document.assigned_to == user_id,
+        Document.lease_expires_at.isnot(None)
+    ).update({Document.lease_expires_at: None}, synchronize_session=False)
+
+
+def claim_unassigned_document(db: Session, document_id: int, user_id: int) -> bool:
+    """手动认领指定文档（不带租约），文档已被分配时返回False"""
+    updated = db.query(Document).filter(
+        Document.id == document_id,
+        Document.assigned_to.is_(None)
+    ).update({Document.assigned_to: user_id, Document.lease_expires_at: None}, synchronize_session=False)
+    db.commit()
+    if updated:
+        publish("documents_assigned", {"document_ids": [document_id], "assigned_to": user_id})
+    return updated > 0
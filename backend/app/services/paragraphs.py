@@ -0,0 +1,77 @@
+"""
+正文段落索引
+
+文档写入时计算每个段落（非空行）在正文中的起止偏移，按字符和UTF-8字节各存一份，
+客户端可按段落范围分页获取超长正文，首屏只需读取前几段。
+换行符是ASCII字符，因此对str和UTF-8字节分别切分得到的段落一一对应，两次切分都在C中完成。
+"""
+
+import re
+from typing import Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models.paragraph import DocumentParagraphIndex
+
+PARAGRAPH_PATTERN = re.compile(r"[^\r\n]+")
+PARAGRAPH_BYTES_PATTERN = re.compile(rb"[^\r\n]+")
+OFFSET_DTYPE = np.dtype("<u4")
+
+
+def split_paragraphs(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    切分段落，返回 (字符偏移, 字节偏移)，形状均为 (段落数, 2)，每行为 [起点, 终点)
+
+    只含空白字符的行不算段落。
+    """
+    char_spans = []
+    byte_spans = []
+    for match, byte_match in zip(PARAGRAPH_PATTERN.finditer(text),
+                                 PARAGRAPH_BYTES_PATTERN.finditer(text.encode("utf-8"))):
+        if match.group().isspace():
+            continue
+        char_spans.append(match.span())
+        byte_spans.append(byte_match.span())
+
+    return (np.array(char_spans, dtype=OFFSET_DTYPE).reshape(-1, 2),
+            np.array(byte_spans, dtype=OFFSET_DTYPE).reshape(-1, 2))
+
+
+def build_paragraph_index(document_id: int, field: str, text: str) -> DocumentParagraphIndex:
+    char_offsets, byte_offsets = split_paragraphs(text)
+    return DocumentParagraphIndex(
+        document_id=document_id,
+        field=field,
+        paragraph_count=len(char_offsets),
+        char_offsets=char_offsets.tobytes(),
+        byte_offsets=byte_offsets.tobytes()
+    )
+
+
+def index_paragraphs(db: Session, document_id: int, source_content: str, generated_content: str):
+    """为新文档的两段正文建立段落索引（不提交）"""
+    db.add_all([
+        build_paragraph_index(document_id, "source", source_content),
+        build_paragraph_index(document_id, "generated", generated_content)
+    ])
+
+
+def remove_paragraph_index(db: Session, document_id: int):
+    """删除文档的段落索引（不提交）"""
+    db.query(DocumentParagraphIndex).filter(
+        DocumentParagraphIndex.document_id == document_id
+    ).delete(synchronize_session=False)
+
+
+def load_offsets(index: DocumentParagraphIndex, start: int, count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """读取第 start 段起 count 段的 (字符偏移, 字节偏移)，只解析所需部分"""
+    item_size = OFFSET_DTYPE.itemsize * 2
+    begin = start * item_size
+    end = min(start + count, index.paragraph_count) * item_size
+    if begin >= end:
+        empty = np.empty((0, 2), dtype=OFFSET_DTYPE)
+        return empty, empty
+    chars = np.frombuffer(index.char_offsets[begin:end], dtype=OFFSET_DTYPE).reshape(-1, 2)
+    byte_spans = np.frombuffer(index.byte_offsets[begin:end], dtype=OFFSET_DTYPE).reshape(-1, 2)
+    return chars, byte_spans
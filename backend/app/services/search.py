@@ -0,0 +1,430 @@
+"""
+全文检索
+
+基于FTS5 trigram表（见 models/search.py）：
+- 写入文档、保存或删除标注时同步更新检索表，覆盖导入时先删除旧文档的条目
+- 不少于3个字符的检索词走FTS5索引，按bm25排序
+- 少于3个字符的检索词无法用trigram索引：评论检索退化为对检索表的LIKE扫描；
+  文档检索表不保存正文，对候选文档解压后逐篇过滤（只检索标题时按标题LIKE）
+- 文档片段从解压后的正文生成（无内容表不支持 snippet()），评论片段由 snippet() 生成
+- 分页使用游标（上一页最后一条的得分和rowid），翻页代价与页码无关
+"""
+
+import base64
+import json
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..compression import decompress_text
+from ..models.search import (
+    SEARCH_TABLE, COMMENT_SEARCH_TABLE, COMMENT_INDEX_BITS,
+    is_search_index_available, comment_rowid, comment_rows
+)
+
+SEARCH_FIELDS = {
+    "all": ("title", "source_content", "generated_content"),
+    "title": ("title",),
+    "source": ("source_content",),
+    "generated": ("generated_content",),
+}
+COMMENT_SEARCH_FIELDS = {
+    "all": ("text", "selection"),
+    "text": ("text",),
+    "selection": ("selection",),
+}
+# bm25列权重，顺序与检索表的列一致
+BM25_WEIGHTS = (10.0, 1.0, 1.0)
+COMMENT_BM25_WEIGHTS = (2.0, 1.0)
+MIN_TRIGRAM_LENGTH = 3
+SNIPPET_TOKENS = 32
+SNIPPET_CONTEXT = 24
+# 含短检索词的文档检索每批解压过滤的候选数
+SEARCH_SCAN_BATCH = 200
+
+
+def add_to_search_index(db: Session, document_id: int, title: str,
+                        source_content: str, generated_content: str):
+    """将文档写入全文检索表（不提交）"""
+    if not is_search_index_available():
+        return
+    db.execute(text(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, source_content, generated_content) "
+        "VALUES (:id, :title, :source, :generated)"
+    ), {"id": document_id, "title": title, "source": source_content, "generated": generated_content})
+
+
+def remove_from_search_index(db: Session, document_id: int):
+    """
+    从全文检索表中删除文档（不提交）
+
+    无内容表须以写入时的原值执行 'delete' 命令，因此在删除文档行之前调用；
+    对不存在的条目执行 'delete' 会损坏索引，先确认条目存在。
+    """
+    if not is_search_index_available():
+        return
+    indexed = db.execute(text(f"SELECT 1 FROM {SEARCH_TABLE} WHERE rowid = :id"), {"id": document_id}).first()
+    row = db.execute(text(
+        "SELECT title, source_content, generated_content FROM documents WHERE id = :id"
+    ), {"id": document_id}).first()
+    if indexed is None or row is None:
+        return
+    db.execute(text(
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, title, source_content, generated_content) "
+        "VALUES ('delete', :id, :title, :source, :generated)"
+    ), {"id": document_id, "title": row.title,
+        "source": decompress_text(row.source_content), "generated": decompress_text(row.generated_content)})
+
+
+def remove_comments_from_search_index(db: Session, annotation_id: int):
+    """删除一条标注的全部评论（不提交）"""
+    if not is_search_index_available():
+        return
+    db.execute(text(
+        f"DELETE FROM {COMMENT_SEARCH_TABLE} WHERE rowid BETWEEN :first AND :last"
+    ), {"first": comment_rowid(annotation_id, 0),
+        "last": comment_rowid(annotation_id, (1 << COMMENT_INDEX_BITS) - 1)})
+
+
+def sync_comments_search_index(db: Session, annotation_id: int, comments_json: str):
+    """按标注当前的评论重建其检索条目（不提交）"""
+    if not is_search_index_available():
+        return
+    remove_comments_from_search_index(db, annotation_id)
+    rows = comment_rows(annotation_id, comments_json)
+    if rows:
+        db.execute(text(
+            f"INSERT INTO {COMMENT_SEARCH_TABLE} (rowid, text, selection) "
+            "VALUES (:rowid, :text, :selection)"
+        ), rows)
+
+
+def encode_cursor(score: Optional[float], rowid: int) -> str:
+    raw = json.dumps([score, rowid]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[float], int]:
+    """解析游标，格式错误时抛出ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, rowid = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return (float(score) if score is not None else None), int(rowid)
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+
+def _quote_term(term: str) -> str:
+    """将检索词转为FTS5短语，避免其中的运算符被解析"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _like_snippet(table: str, columns: Tuple[str, ...]) -> str:
+    """LIKE检索无法使用snippet()，截取第一个检索词所在位置前后的文本"""
+    cases = []
+    for column in columns:
+        cases.append(
+            f"WHEN instr({table}.{column}, :term0) > 0 THEN "
+            f"substr({table}.{column}, max(instr({table}.{column}, :term0) - {SNIPPET_CONTEXT}, 1), "
+            f"{SNIPPET_CONTEXT * 2 + 8})"
+        )
+    return "CASE " + " ".join(cases) + f" ELSE substr({table}.{columns[0]}, 1, {SNIPPET_CONTEXT * 2 + 8}) END"
+
+
+def _search_page(db: Session, table: str, columns: Tuple[str, ...], all_columns: Tuple[str, ...],
+                 weights: Tuple[float, ...], terms: List[str], match_all: bool,
+                 select: str, joins: str, conditions: List[str], params: Dict[str, Any],
+                 limit: int, cursor: Optional[str], build_item: Callable) -> Dict[str, Any]:
+    """
+    在保存内容的FTS5表上执行一页检索（评论检索表）
+
+    match_all 为True时检索词之间为AND，否则为OR。FTS5的MATCH不能与其他条件组成OR，
+    因此OR检索中含短检索词时全部改用LIKE，不再按相关度排序。
+    """
+    long_terms = [term for term in terms if len(term) >= MIN_TRIGRAM_LENGTH]
+    short_terms = [term for term in terms if len(term) < MIN_TRIGRAM_LENGTH]
+    if not match_all and short_terms:
+        long_terms, short_terms = [], terms
+
+    params = dict(params, limit=limit + 1)
+    conditions = list(conditions)
+
+    ranked = bool(long_terms)
+    if ranked:
+        match = (" AND " if match_all else " OR ").join(_quote_term(term) for term in long_terms)
+        if columns != all_columns:
+            match = "{" + " ".join(columns) + "} : (" + match + ")"
+        params["match"] = match
+        conditions.append(f"{table} MATCH :match")
+        score_expr = f"bm25({table}, {', '.join(str(w) for w in weights)})"
+        snippet_expr = f"snippet({table}, -1, '<mark>', '</mark>', '…', {SNIPPET_TOKENS})"
+    else:
+        score_expr = "NULL"
+        snippet_expr = _like_snippet(table, columns)
+        params["term0"] = short_terms[0]
+
+    like_conditions = []
+    for index, term in enumerate(short_terms):
+        params[f"like{index}"] = _like_pattern(term)
+        like_conditions.append("(" + " OR ".join(
+            f"{table}.{column} LIKE :like{index} ESCAPE '\\'" for column in columns
+        ) + ")")
+    if like_conditions:
+        conditions.append("(" + (" AND " if match_all else " OR ").join(like_conditions) + ")")
+
+    if cursor:
+        last_score, last_rowid = decode_cursor(cursor)
+        params["last_rowid"] = last_rowid
+        if ranked:
+            params["last_score"] = last_score
+            conditions.append(
+                f"({score_expr} > :last_score OR ({score_expr} = :last_score AND {table}.rowid > :last_rowid))"
+            )
+        else:
+            conditions.append(f"{table}.rowid > :last_rowid")
+
+    order_by = f"score, {table}.rowid" if ranked else f"{table}.rowid"
+    rows = db.execute(text(
+        f"SELECT {table}.rowid AS search_rowid, {select}, {score_expr} AS score, {snippet_expr} AS snippet "
+        f"FROM {table} {joins} "
+        f"WHERE {' AND '.join(conditions)} "
+        f"ORDER BY {order_by} LIMIT :limit"
+    ), params).all()
+
+    return _build_page(rows, limit, build_item)
+
+
+def _build_page(rows, limit: int, build_item: Callable) -> Dict[str, Any]:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].score, rows[-1].search_rowid) if has_more else None
+    return {"items": [build_item(row) for row in rows], "next_cursor": next_cursor}
+
+
+def _parse_datetime(value) -> Optional[str]:
+    """text() 查询得到的是SQLite中存储的字符串（"YYYY-MM-DD HH:MM:SS"），转为与列表接口相同的 isoformat()"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.isoformat()
+
+
+def _document_item(row, snippet: str) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "title": row.title,
+        "status": row.status,
+        "assigned_to": row.assigned_to,
+        "created_at": _parse_datetime(row.created_at),
+        "score": row.score,
+        "snippet": snippet
+    }
+
+
+def _terms_pattern(terms: List[str]) -> Pattern:
+    """匹配任一检索词（与trigram分词器一样不区分大小写），较长的检索词优先"""
+    ordered = sorted(set(terms), key=len, reverse=True)
+    return re.compile("|".join(re.escape(term) for term in ordered), re.IGNORECASE)
+
+
+def build_snippet(texts: Sequence[str], pattern: Pattern) -> str:
+    """截取第一处命中前后的文本作为片段，命中的检索词以 <mark> 标出"""
+    for value in texts:
+        match = pattern.search(value)
+        if match:
+            break
+    else:
+        value = texts[0]
+        end = min(SNIPPET_CONTEXT * 2, len(value))
+        return value[:end] + ("…" if end < len(value) else "")
+
+    start = max(match.start() - SNIPPET_CONTEXT, 0)
+    end = min(match.end() + SNIPPET_CONTEXT, len(value))
+    marked = pattern.sub(lambda m: f"<mark>{m.group(0)}</mark>", value[start:end])
+    return ("…" if start > 0 else "") + marked + ("…" if end < len(value) else "")
+
+
+def _load_texts(db: Session, rows, columns: Tuple[str, ...]) -> Dict[int, List[str]]:
+    """加载候选文档中被检索各列的文本（正文解压后），按文档ID返回"""
+    content_columns = [column for column in columns if column != "title"]
+    contents = {}
+    if content_columns and rows:
+        contents = {
+            content_row.id: content_row for content_row in db.execute(text(
+                f"SELECT id, {', '.join(content_columns)} FROM documents WHERE id IN "
+                f"({', '.join(str(int(row.id)) for row in rows)})"
+            ))
+        }
+    return {
+        row.id: [row.title if column == "title" else decompress_text(getattr(contents[row.id], column))
+                 for column in columns]
+        for row in rows
+    }
+
+
+def search_documents(db: Session, query: str, field: str = "all", limit: int = 20,
+                     cursor: Optional[str] = None, user_id: int = None,
+                     user_role: str = None) -> Dict[str, Any]:
+    """
+    全文检索文档（多个检索词之间为AND关系）
+
+    长检索词在FTS5索引中匹配并按bm25排序；短检索词无法使用索引，对候选文档解压正文后逐篇过滤，
+    只有短检索词时按文档id顺序扫描。
+
+    Returns:
+        {"items": [...], "next_cursor": 下一页游标或None}
+    """
+    terms = query.split()
+    if not is_search_index_available():
+        return _search_titles(db, terms, limit, cursor, user_id, user_role)
+
+    columns = SEARCH_FIELDS[field]
+    long_terms = [term for term in terms if len(term) >= MIN_TRIGRAM_LENGTH]
+    short_terms = [term for term in terms if len(term) < MIN_TRIGRAM_LENGTH]
+
+    conditions = []
+    params: Dict[str, Any] = {}
+    if user_role != "admin":
+        conditions.append("(documents.assigned_to IS NULL OR documents.assigned_to = :user_id)")
+        params["user_id"] = user_id
+    if columns == ("title",):
+        # 标题未压缩，短检索词直接按LIKE过滤
+        for index, term in enumerate(short_terms):
+            params[f"like{index}"] = _like_pattern(term)
+            conditions.append(f"documents.title LIKE :like{index} ESCAPE '\\'")
+        short_terms = []
+
+    ranked = bool(long_terms)
+    if ranked:
+        match = " AND ".join(_quote_term(term) for term in long_terms)
+        if columns != SEARCH_FIELDS["all"]:
+            match = "{" + " ".join(columns) + "} : (" + match + ")"
+        params["match"] = match
+        conditions.append(f"{SEARCH_TABLE} MATCH :match")
+        score_expr = f"bm25({SEARCH_TABLE}, {', '.join(str(w) for w in BM25_WEIGHTS)})"
+        source = f"{SEARCH_TABLE} JOIN documents ON documents.id = {SEARCH_TABLE}.rowid"
+        order_by = "score, documents.id"
+    else:
+        score_expr = "NULL"
+        source = "documents"
+        order_by = "documents.id"
+
+    if cursor:
+        last_score, last_id = decode_cursor(cursor)
+        params["last_id"] = last_id
+        if ranked:
+            params["last_score"] = last_score
+            conditions.append(
+                f"({score_expr} > :last_score OR ({score_expr} = :last_score AND documents.id > :last_id))"
+            )
+        else:
+            conditions.append("documents.id > :last_id")
+
+    short_patterns = [re.compile(re.escape(term), re.IGNORECASE) for term in short_terms]
+    sql = (
+        "SELECT documents.id, documents.title, documents.status, documents.assigned_to, documents.created_at, "
+        f"{score_expr} AS score FROM {source} WHERE {' AND '.join(conditions) or '1'} ORDER BY {order_by}"
+    )
+    if not short_patterns:
+        params["limit"] = limit + 1
+        sql += " LIMIT :limit"
+
+    # 候选只含元数据，按顺序逐批读取；需要过滤时按批加载并解压正文，凑够一页即停止
+    matched = []
+    result = db.execute(text(sql), params)
+    try:
+        for rows in result.partitions(SEARCH_SCAN_BATCH):
+            texts = _load_texts(db, rows, columns) if short_patterns else {}
+            for row in rows:
+                if short_patterns and not all(
+                    any(pattern.search(value) for value in texts[row.id]) for pattern in short_patterns
+                ):
+                    continue
+                matched.append(row)
+                if len(matched) > limit:
+                    break
+            if len(matched) > limit:
+                break
+    finally:
+        result.close()
+
+    has_more = len(matched) > limit
+    matched = matched[:limit]
+    texts = _load_texts(db, matched, columns)
+    pattern = _terms_pattern(terms)
+    items = [_document_item(row, build_snippet(texts[row.id], pattern)) for row in matched]
+    next_cursor = encode_cursor(matched[-1].score, matched[-1].id) if has_more else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _search_titles(db: Session, terms: List[str], limit: int, cursor: Optional[str],
+                   user_id: int, user_role: str) -> Dict[str, Any]:
+    """不支持FTS5时只按标题LIKE检索"""
+    params: Dict[str, Any] = {"limit": limit + 1}
+    conditions = []
+    for index, term in enumerate(terms):
+        params[f"like{index}"] = _like_pattern(term)
+        conditions.append(f"title LIKE :like{index} ESCAPE '\\'")
+    if user_role != "admin":
+        conditions.append("(assigned_to IS NULL OR assigned_to = :user_id)")
+        params["user_id"] = user_id
+    if cursor:
+        params["last_id"] = decode_cursor(cursor)[1]
+        conditions.append("id > :last_id")
+
+    rows = db.execute(text(
+        "SELECT id AS search_rowid, id, title, status, assigned_to, created_at, NULL AS score, title AS snippet "
+        f"FROM documents WHERE {' AND '.join(conditions)} ORDER BY id LIMIT :limit"
+    ), params).all()
+    return _build_page(rows, limit, lambda row: _document_item(row, row.snippet))
+
+
+def _comment_item(row) -> Dict[str, Any]:
+    return {
+        "annotation_id": row.annotation_id,
+        "comment_index": row.search_rowid & ((1 << COMMENT_INDEX_BITS) - 1),
+        "document_id": row.document_id,
+        "document_title": row.document_title,
+        "annotator_id": row.annotator_id,
+        "annotator_name": row.full_name or row.username,
+        "evaluation": bool(row.evaluation),
+        "is_completed": bool(row.is_completed),
+        "text": row.text,
+        "selection": row.selection,
+        "score": row.score,
+        "snippet": row.snippet
+    }
+
+
+def search_comments(db: Session, query: str, field: str = "all", match_all: bool = False,
+                    limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    全文检索标注评论（评论内容和选中的文本），附带所属文档和标注专家
+
+    Returns:
+        {"items": [...], "next_cursor": 下一页游标或None}
+    """
+    if not is_search_index_available():
+        raise ValueError("当前数据库不支持全文检索")
+
+    return _search_page(
+        db, COMMENT_SEARCH_TABLE, COMMENT_SEARCH_FIELDS[field], COMMENT_SEARCH_FIELDS["all"],
+        COMMENT_BM25_WEIGHTS, query.split(), match_all,
+        select=(f"{COMMENT_SEARCH_TABLE}.text, {COMMENT_SEARCH_TABLE}.selection, "
+                "annotations.id AS annotation_id, annotations.document_id, annotations.annotator_id, "
+                "annotations.evaluation, annotations.is_completed, documents.title AS document_title, "
+                "users.username, users.full_name"),
+        joins=(f"JOIN annotations ON annotations.id = ({COMMENT_SEARCH_TABLE}.rowid >> {COMMENT_INDEX_BITS}) "
+               "JOIN documents ON documents.id = annotations.document_id "
+               "JOIN users ON users.id = annotations.annotator_id"),
+        conditions=[], params={}, limit=limit, cursor=cursor, build_item=_comment_item
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import func
+from sqlalchemy import func, case, text
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from ..models.document import Document
@@ -29,6 +29,23 @@ def get_annotation_stats(db: Session):
         "completion_rate": round(completion_rate, 2)
     }
 
+def get_progress_counters(db: Session):
+    """
+    推送接口的初始快照：各状态文档数和标注计数
+
+    与 /api/stats/stream 推送的增量事件中 counters 的结构相同，客户端将增量逐项累加
+    """
+    documents = dict(db.query(Document.status, func.count(Document.id)).group_by(Document.status).all())
+    total, completed, positive = db.query(
+        func.count(Annotation.id),
+        func.sum(case((Annotation.is_completed == True, 1), else_=0)),
+        func.sum(case((Annotation.evaluation == True, 1), else_=0))
+    ).one()
+    return {
+        "documents": documents,
+        "annotations": {"total": total, "completed": completed or 0, "positive": positive or 0}
+    }
+
 def get_user_stats(db: Session, user_id: int):
     # 用户完成的标注数
     user_annotations = db.query(Annotation).filter(
@@ -58,15 +75,28 @@ def get_user_stats(db: Session, user_id: int):
     }
 
 def get_all_user_stats(db: Session):
+    # 一次分组查询得到所有专家的汇总（替代逐个专家调用 get_user_stats）
+    totals = {
+        annotator_id: (completed or 0, positive or 0, total, time_spent or 0)
+        for annotator_id, completed, positive, total, time_spent in db.query(
+            Annotation.annotator_id,
+            func.sum(case((Annotation.is_completed == True, 1), else_=0)),
+            func.sum(case((Annotation.evaluation == True, 1), else_=0)),
+            func.count(Annotation.id),
+            func.sum(Annotation.time_spent)
+        ).group_by(Annotation.annotator_id).all()
+    }
     users = db.query(User).filter(User.role == "expert").all()
     result = []
     for user in users:
-        stats = get_user_stats(db, user.id)
+        completed, positive, total, time_spent = totals.get(user.id, (0, 0, 0, 0))
         result.append({
             "user_id": user.id,
             "username": user.username,
             "full_name": user.full_name,
-            **stats
+            "completed_annotations": completed,
+            "positive_rate": round((positive / total * 100) if total > 0 else 0, 2),
+            "total_time_minutes": round(time_spent / 60, 2)
         })
     return result
 
@@ -76,11 +106,11 @@ def get_temporal_stats(db: Session, days: int = 30):
     start_date = end_date - timedelta(days=days)
 
     try:
-        # 每日标注量统计 - 修复兼容性问题
+        # 每日标注量统计
         daily_annotations = db.query(
             func.date(Annotation.created_at).label('date'),
             func.count(Annotation.id).label('count'),
-            func.sum(func.cast(Annotation.evaluation, int)).label('positive_count')
+            func.sum(case((Annotation.evaluation == True, 1), else_=0)).label('positive_count')
         ).filter(
             Annotation.created_at >= start_date,
             Annotation.created_at <= end_date
@@ -107,7 +137,7 @@ def get_user_activity_distribution(db: Session):
             User.id,
             User.username,
             func.count(Annotation.id).label('annotation_count'),
-            func.sum(func.cast(Annotation.evaluation, int)).label('positive_count'),
+            func.sum(case((Annotation.evaluation == True, 1), else_=0)).label('positive_count'),
             func.sum(Annotation.time_spent).label('total_time'),
             func.avg(Annotation.time_spent).label('avg_time')
         ).join(
@@ -171,12 +201,12 @@ def get_approval_rate_analysis(db: Session):
     positive_evaluations = db.query(Annotation).filter(Annotation.evaluation == True).count()
     overall_rate = round((positive_evaluations / total_evaluations * 100), 2) if total_evaluations > 0 else 0
 
-    # 按用户分析好评率 - 修复兼容性问题
+    # 按用户分析好评率
     try:
         user_approval_rates = db.query(
             User.id,
             User.username,
-            func.sum(func.cast(Annotation.evaluation, int)).label('positive_count'),
+            func.sum(case((Annotation.evaluation == True, 1), else_=0)).label('positive_count'),
             func.count(Annotation.id).label('count')
         ).join(
             Annotation, User.id == Annotation.annotator_id
@@ -207,4 +237,178 @@ def get_approval_rate_analysis(db: Session):
             "total_evaluations": total_evaluations,
             "positive_evaluations": positive_evaluations,
             "user_approval_rates": []
-        }
\ No newline at end of file
+        }
+
+# 统计页一次请求的各项统计，键名与对应的单项接口一致（连字符换成下划线）
+DASHBOARD_SECTIONS = (
+    "overview", "my_stats", "all_users", "temporal",
+    "user_activity", "document_completion", "approval_analysis"
+)
+# 仅管理员可查看的统计项
+ADMIN_DASHBOARD_SECTIONS = {"all_users", "user_activity"}
+# 汇总要读取索引外的多列，顺序扫描整表比按标注者索引逐行回表快（100万条标注约快一倍）
+SQLITE_ANNOTATIONS_SCAN = "annotations NOT INDEXED"
+
+def _begin_read_snapshot(db: Session):
+    """
+    开启只读事务，使随后的各次查询读取同一快照
+
+    SQLite驱动只在写语句前自动开启事务，逐条执行的SELECT各自读取最新数据，这里显式BEGIN
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    connection = db.connection().connection.driver_connection
+    if not connection.in_transaction:
+        connection.execute("BEGIN")
+
+def _rate(part, total):
+    return round(part / total * 100, 2) if total else 0
+
+def get_dashboard(db: Session, user_id: int, sections=DASHBOARD_SECTIONS, days: int = 30):
+    """
+    统计页所需的各项统计，在同一只读事务中计算
+
+    结果与 /overview、/my-stats、/all-users、/temporal、/user-activity、/document-completion、
+    /approval-analysis 各接口一致，但标注表最多扫描两次：
+    - 按（标注者, 日期）分组一次，得到各用户汇总、好评率和每日标注量（日期只对 days 天内的标注计算）
+    - 需要文档完成情况时按文档分组一次
+    """
+    sections = [section for section in DASHBOARD_SECTIONS if section in set(sections)]
+    need_annotators = any(section != "document_completion" for section in sections)
+    need_temporal = "temporal" in sections
+    need_documents = bool({"overview", "document_completion"} & set(sections))
+
+    _begin_read_snapshot(db)
+    try:
+        # 按标注者（及近 days 天内的日期）分组的计数，其余日期归入 NULL
+        annotators = {}
+        daily = {}
+        if need_annotators:
+            group = "annotator_id"
+            params = {}
+            if need_temporal:
+                end_date = datetime.utcnow()
+                start_date = end_date - timedelta(days=days)
+                group += ", CASE WHEN created_at BETWEEN :start_date AND :end_date THEN date(created_at) END"
+                # 与 DateTime 列在SQLite中的存储格式一致
+                params = {"start_date": start_date.isoformat(" "), "end_date": end_date.isoformat(" ")}
+            source = SQLITE_ANNOTATIONS_SCAN if db.get_bind().dialect.name == "sqlite" else "annotations"
+            rows = db.execute(text(
+                f"SELECT {group}, COUNT(*), SUM(CASE WHEN is_completed = 1 THEN 1 ELSE 0 END), "
+                "SUM(CASE WHEN evaluation = 1 THEN 1 ELSE 0 END), SUM(time_spent), COUNT(time_spent) "
+                f"FROM {source} GROUP BY {group}"
+            ), params)
+            for row in rows:
+                annotator_id, day = row[0], row[1] if need_temporal else None
+                count, completed, positive, time_total, timed = row[-5:]
+                totals = annotators.setdefault(annotator_id, [0, 0, 0, 0, 0])
+                for index, value in enumerate((count, completed, positive, time_total or 0, timed)):
+                    totals[index] += value
+                if day is not None:
+                    daily_totals = daily.setdefault(day, [0, 0])
+                    daily_totals[0] += count
+                    daily_totals[1] += positive
+
+        # 每篇文档的标注数、标注人数及是否有已完成的标注
+        documents = []
+        total_documents = completed_documents = 0
+        if "document_completion" in sections:
+            documents = db.query(
+                Document.id,
+                func.count(Annotation.id),
+                func.count(func.distinct(Annotation.annotator_id)),
+                func.max(case((Annotation.is_completed == True, 1), else_=0))
+            ).outerjoin(Annotation).group_by(Document.id).all()
+            total_documents = len(documents)
+            completed_documents = sum(1 for row in documents if row[3])
+        elif need_documents:
+            total_documents = db.query(Document).count()
+            completed_documents = db.query(Document.id).join(Annotation).filter(
+                Annotation.is_completed == True
+            ).distinct().count()
+
+        experts = []
+        if {"all_users", "user_activity", "approval_analysis"} & set(sections):
+            experts = db.query(User.id, User.username, User.full_name).filter(
+                User.role == "expert"
+            ).order_by(User.id).all()
+    finally:
+        # 结束只读事务
+        db.rollback()
+
+    total_annotations = sum(totals[0] for totals in annotators.values())
+    positive_annotations = sum(totals[2] for totals in annotators.values())
+
+    result = {}
+    for section in sections:
+        if section == "overview":
+            result[section] = {
+                "total_documents": total_documents,
+                "annotated_documents": completed_documents,
+                "positive_rate": _rate(positive_annotations, total_annotations),
+                "completion_rate": _rate(completed_documents, total_documents)
+            }
+        elif section == "my_stats":
+            count, completed, positive, time_total, _ = annotators.get(user_id, [0, 0, 0, 0, 0])
+            result[section] = {
+                "completed_annotations": completed,
+                "positive_rate": _rate(positive, count),
+                "total_time_minutes": round(time_total / 60, 2)
+            }
+        elif section == "all_users":
+            result[section] = []
+            for expert in experts:
+                count, completed, positive, time_total, _ = annotators.get(expert.id, [0, 0, 0, 0, 0])
+                result[section].append({
+                    "user_id": expert.id,
+                    "username": expert.username,
+                    "full_name": expert.full_name,
+                    "completed_annotations": completed,
+                    "positive_rate": _rate(positive, count),
+                    "total_time_minutes": round(time_total / 60, 2)
+                })
+        elif section == "temporal":
+            result[section] = [
+                {"date": str(date), "annotations": count, "approval_rate": _rate(positive, count)}
+                for date, (count, positive) in sorted(daily.items())
+            ]
+        elif section == "user_activity":
+            result[section] = [
+                {
+                    "user_id": expert.id,
+                    "username": expert.username,
+                    "annotation_count": annotators[expert.id][0],
+                    "approval_rate": _rate(annotators[expert.id][2], annotators[expert.id][0]),
+                    "total_time_minutes": round(annotators[expert.id][3] / 60, 2),
+                    "avg_time_minutes": round(annotators[expert.id][3] / annotators[expert.id][4] / 60, 2)
+                    if annotators[expert.id][4] else 0
+                }
+                for expert in experts if expert.id in annotators
+            ]
+        elif section == "document_completion":
+            result[section] = {
+                "total_documents": total_documents,
+                "completed_documents": completed_documents,
+                "completion_rate": _rate(completed_documents, total_documents),
+                "documents_per_annotator": [
+                    {"document_id": document_id, "annotations_count": count, "annotators_count": annotator_count}
+                    for document_id, count, annotator_count, _ in documents
+                ]
+            }
+        elif section == "approval_analysis":
+            # evaluation 非空，参与评价的标注即全部标注
+            result[section] = {
+                "overall_approval_rate": _rate(positive_annotations, total_annotations),
+                "total_evaluations": total_annotations,
+                "positive_evaluations": positive_annotations,
+                "user_approval_rates": [
+                    {
+                        "user_id": expert.id,
+                        "username": expert.username,
+                        "approval_rate": _rate(annotators[expert.id][2], annotators[expert.id][0]),
+                        "evaluation_count": annotators[expert.id][0]
+                    }
+                    for expert in experts if expert.id in annotators
+                ]
+            }
+    return result
@@ -0,0 +1,152 @@
+"""
+标注保存的组提交队列
+
+逐次保存时每次自动保存各自提交一个事务（各付一次fsync），突发时在SQLite写锁上排队。
+开启 GROUP_COMMIT（默认）后，保存接口把保存放入队列并等待结果：
+- 专用写线程取出队列中的保存，在 GROUP_COMMIT_WINDOW_MS（默认2）毫秒内继续收集，最多 GROUP_COMMIT_MAX_BATCH 条
+- 一批保存（同一标注的多次保存先合并）在一个事务中写入并提交（services.annotation.save_annotations），
+  提交后才完成各调用方的 Future，返回成功即已落盘，持久性与逐次提交相同
+- 整批在提交前失败时逐个标注单独重试，只有出错的保存收到异常；save_annotations 返回后不再重试
+  （重试会再次累加用时），推送事件出错只记录日志
+- 写入前调用方已取消（客户端断开，asyncio.wrap_future 取消 Future）的保存不写入；写入开始后 Future 不能再取消
+- 写线程不会因某一批出错而退出，线程意外结束时重新启动，队列中的保存保留
+- 保存接口在等待期间不占用事件循环线程
+
+每批的保存数见 /metrics 的 annotation_write_batch_size。
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import metrics
+from ..database import SessionLocal
+from .annotation import AnnotationSave, publish_saved, save_annotations
+
+logger = logging.getLogger(__name__)
+
+GROUP_COMMIT = os.environ.get("GROUP_COMMIT", "1") == "1"
+GROUP_COMMIT_WINDOW_MS = float(os.environ.get("GROUP_COMMIT_WINDOW_MS", "2"))
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get("GROUP_COMMIT_MAX_BATCH", "500"))
+
+# 队列中的标记：处理完之前的保存后退出
+_STOP = object()
+
+
+class AnnotationWriteQueue:
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal,
+                 window: float = GROUP_COMMIT_WINDOW_MS / 1000, max_batch: int = GROUP_COMMIT_MAX_BATCH):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.saves = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # fork 出的子进程中没有写线程，需重新启动
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                if self._pid is not None and self._pid != os.getpid():
+                    # 队列中是父进程的保存，其锁也可能处于 fork 时的状态
+                    self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name="annotation-writer", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def submit(self, save: AnnotationSave) -> Future:
+        """放入队列，提交后 Future 的结果为标注ID"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((save, future))
+        return future
+
+    def stop(self, timeout: float = 10.0):
+        """写入队列中剩余的保存后停止写线程（lifespan 结束时调用）"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.window
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("标注保存批次处理失败")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("标注保存失败"))
+            if stopping:
+                return
+
+    def _write(self, batch: List[Tuple[AnnotationSave, Future]]):
+        # 标记为执行中，此后 Future 不能再取消；已取消的保存不写入
+        batch = [(save, future) for save, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        metrics.annotation_write_batch.observe(len(batch))
+        self.batches += 1
+        self.saves += len(batch)
+        try:
+            self._commit(batch)
+        except Exception:
+            # 整批失败时逐个标注重试，避免一条错误的保存连累同批的其他保存
+            groups: Dict[Tuple[int, int], list] = {}
+            for save, future in batch:
+                groups.setdefault((save.document_id, save.user_id), []).append((save, future))
+            for group in groups.values():
+                try:
+                    self._commit(group)
+                except Exception as e:
+                    for _, future in group:
+                        future.set_exception(e)
+
+    def _commit(self, batch: List[Tuple[AnnotationSave, Future]]):
+        """写入并提交一批保存，只有提交前出错时抛出异常"""
+        db = self.session_factory()
+        try:
+            saved = save_annotations(db, [save for save, _ in batch])
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        # 已提交：此后的错误不能向上抛出，否则整批会被重试、用时再次累加（执行中的 Future 不会被取消）
+        for save, future in batch:
+            future.set_result(saved.annotation_ids[(save.document_id, save.user_id)])
+        try:
+            publish_saved(saved)
+        except Exception:
+            logger.exception("标注保存已提交，推送事件失败")
+
+
+annotation_write_queue = AnnotationWriteQueue()
@@ -0,0 +1,190 @@
+"""
+启动初始化与预热
+
+main.py 的 lifespan 在开始服务前调用 initialize()，不再在导入时访问数据库：
+- 结构检查：create_all 与未执行的迁移。SKIP_SCHEMA_CHECK=1 时跳过（如多进程部署中由部署脚本或
+  第一个进程执行过迁移，其余进程无需重复检查）；全文检索表是否可用仍按数据库中的实际状态检测
+- 预热：WARMUP 指定的项目（逗号分隔，all 表示全部），默认在后台线程中执行，不推迟开始服务；
+  WARMUP_BLOCKING=1 时预热完成后才开始服务
+  - auth：导入并初始化密码哈希（bcrypt后端首次使用时需自检）与JWT，读取用户表
+  - stats：加载标注一致性矩阵，读取进度计数（同时把标注表读入SQLite页缓存）
+  - documents：将最近有标注活动的 WARMUP_DOCUMENTS 篇文档的正文载入文档缓存
+
+各阶段耗时记录在 StartupReport 中，启动时打印，并通过 /metrics 的 startup_phase_seconds 输出。
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from . import metrics
+
+SKIP_SCHEMA_CHECK = os.environ.get("SKIP_SCHEMA_CHECK", "0") == "1"
+WARMUP = os.environ.get("WARMUP", "")
+WARMUP_BLOCKING = os.environ.get("WARMUP_BLOCKING", "0") == "1"
+WARMUP_DOCUMENTS = int(os.environ.get("WARMUP_DOCUMENTS", "200"))
+WARMUP_TARGETS = ("auth", "stats", "documents")
+
+
+class StartupReport:
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.phases[name] = seconds
+        metrics.startup_phases.set(name, value=seconds)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def format(self) -> str:
+        with self._lock:
+            items = list(self.phases.items())
+        return "启动耗时: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in items)
+
+
+report = StartupReport()
+# 服务停止时通知后台预热尽快结束
+_stopping = threading.Event()
+
+
+def parse_warmup(value: str) -> List[str]:
+    targets = [target.strip() for target in value.split(",") if target.strip()]
+    if "all" in targets:
+        return list(WARMUP_TARGETS)
+    unknown = set(targets) - set(WARMUP_TARGETS)
+    if unknown:
+        raise ValueError(f"未知的预热项目: {', '.join(sorted(unknown))}，可选: {', '.join(WARMUP_TARGETS)}")
+    return targets
+
+
+@contextmanager
+def _schema_lock():
+    """多个工作进程同时启动时，建表和迁移依次执行（后执行的进程看到已完成的结构，不再重复）"""
+    from .database import FILE_DATABASE, DATABASE_FILE
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if not FILE_DATABASE or fcntl is None:
+        yield
+        return
+    with open(os.path.abspath(DATABASE_FILE) + ".schema-lock", "a+b") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def check_schema(log: Callable[[str], None] = print):
+    from .database import Base, engine
+    from .migrations import upgrade
+    from . import models  # noqa: F401  注册全部表
+    from .models.search import detect_search_index
+
+    with report.phase("schema_check"), _schema_lock():
+        Base.metadata.create_all(bind=engine)
+        upgrade(engine, log=log)
+        # 检索表由迁移创建，迁移后重新检测
+        with engine.connect() as connection:
+            detect_search_index(connection)
+
+
+def _warm_auth(db):
+    from .services.auth import create_access_token, get_password_context, get_user_from_token
+    from .models import User
+    # 加载并自检 bcrypt 后端（不做实际哈希，每次校验密码本身的耗时由 bcrypt 轮数决定）
+    get_password_context().handler().get_backend()
+    # 导入 jose 并读取用户表
+    user = db.query(User).order_by(User.id).first()
+    if user is not None:
+        get_user_from_token(db, create_access_token({"sub": user.username}))
+
+
+def _warm_stats(db):
+    from .services.agreement import agreement_matrix
+    from .services.stats import get_progress_counters
+    agreement_matrix.snapshot(db)
+    db.rollback()
+    get_progress_counters(db)
+
+
+def _warm_documents(db, limit: int):
+    from sqlalchemy import text
+    from .services.document import get_document, get_document_contents
+
+    # 最近创建的标注所在的文档（走 annotations.created_at 索引）
+    rows = db.execute(text(
+        "SELECT document_id FROM annotations ORDER BY created_at DESC LIMIT :limit"
+    ), {"limit": limit * 4}).all()
+    document_ids = list(dict.fromkeys(row[0] for row in rows))[:limit]
+    for document_id in document_ids:
+        if _stopping.is_set():
+            break
+        document = get_document(db, document_id, with_content=True)
+        if document is not None:
+            get_document_contents(db, document)
+
+
+def warm_up(targets: List[str], log: Callable[[str], None] = print):
+    from .database import SessionLocal
+
+    for target in targets:
+        if _stopping.is_set():
+            return
+        db = SessionLocal()
+        try:
+            with report.phase(f"warmup_{target}"):
+                if target == "auth":
+                    _warm_auth(db)
+                elif target == "stats":
+                    _warm_stats(db)
+                elif target == "documents":
+                    _warm_documents(db, WARMUP_DOCUMENTS)
+        except Exception as e:
+            # 预热失败不影响服务
+            log(f"预热 {target} 失败: {e}")
+        finally:
+            db.close()
+    log(report.format())
+
+
+def initialize(skip_schema_check: bool = SKIP_SCHEMA_CHECK, warmup: str = WARMUP,
+               blocking: bool = WARMUP_BLOCKING, log: Callable[[str], None] = print) -> Optional[threading.Thread]:
+    """启动初始化；预热在后台执行时返回其线程"""
+    from .models.search import is_search_index_available
+
+    targets = parse_warmup(warmup)
+    if not skip_schema_check:
+        check_schema(log)
+    # 检索表是否可用按数据库实际状态判断（跳过结构检查时同样可用），在开始服务前检测
+    is_search_index_available()
+    if not targets:
+        log(report.format())
+        return None
+    if blocking:
+        warm_up(targets, log)
+        return None
+    log(report.format())
+    _stopping.clear()
+    thread = threading.Thread(target=warm_up, args=(targets, log), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def shutdown(thread: Optional[threading.Thread], timeout: float = 5.0):
+    """服务停止时等待后台预热结束，避免进程退出时线程仍在执行SQLite或bcrypt调用"""
+    if thread is None:
+        return
+    _stopping.set()
+    thread.join(timeout)
@@ -0,0 +1,173 @@
+"""
+SQLite单写者协调
+
+SQLite同一时间只允许一个写事务。多个工作进程（WORKERS > 1）同时写入时，SQLite自身的忙等待以
+递增的间隔轮询，排队不公平，高峰时个别写入会一直抢不到锁，超过 busy_timeout 后报 database is locked。
+
+这里在开始写事务之前先取得写锁，把所有进程的写入排成一队：
+- 进程内：threading.Lock，同一进程的线程按到达顺序等待，只有一个线程参与跨进程争用
+- 跨进程：数据库文件旁的锁文件（<数据库>.write-lock）上的 flock，非阻塞尝试并以短间隔有界重试
+- 等待超过 WRITE_LOCK_TIMEOUT（默认30秒）时抛出 sqlite3.OperationalError("database is locked ...")，
+  与原先的错误一致，计入 db_errors_total{kind="locked"}
+- 同一线程已通过另一个连接持有写锁时立即抛出同样的错误：该线程不会在等待期间提交前一个事务，
+  等待只能以超时结束（改为可重入也无济于事，第二个连接随后会在SQLite自身的锁上等到超时）
+
+写锁挂在DB-API连接上（database.py 中以 factory 参数使用 CoordinatedConnection）：sqlite3 在第一条
+INSERT/UPDATE/DELETE/REPLACE 前隐式开始事务，此时取得写锁，提交或回滚后释放；只读语句不取锁，
+WAL 模式下读不受写入影响。不支持 flock 的平台只做进程内协调。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from . import metrics
+
+WRITE_LOCK_TIMEOUT = float(os.environ.get("WRITE_LOCK_TIMEOUT", "30"))
+# 开始写事务的语句（CREATE/DROP/ALTER 在自动提交模式下执行，同样需要写锁）
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+_RETRY_MIN = 0.0005
+_RETRY_MAX = 0.01
+
+
+def is_write(sql: str) -> bool:
+    return sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS)
+
+
+class WriteLock:
+    def __init__(self, path: str, timeout: float = WRITE_LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # 持有写锁的线程（事务可能在其他线程中提交或回滚，因此不用 RLock）
+        self._owner = None
+        self._file = None
+        self._pid = None
+
+    def _fileno(self) -> int:
+        # fork 出的子进程与父进程共享打开的文件，flock 不再互斥，需重新打开
+        if self._file is None or self._pid != os.getpid():
+            self._file = open(self.path, "a+b")
+            self._pid = os.getpid()
+        return self._file.fileno()
+
+    def _timeout_error(self) -> sqlite3.OperationalError:
+        return sqlite3.OperationalError(f"database is locked (waited {self.timeout:g}s for the write lock)")
+
+    def acquire(self):
+        if self._owner == threading.get_ident():
+            raise sqlite3.OperationalError(
+                "database is locked (the write lock is held by another connection of the same thread)"
+            )
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        if not self._lock.acquire(timeout=self.timeout):
+            raise self._timeout_error()
+        if fcntl is not None:
+            try:
+                fd = self._fileno()
+                delay = _RETRY_MIN
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            raise self._timeout_error()
+                        time.sleep(min(delay, remaining))
+                        delay = min(delay * 2, _RETRY_MAX)
+            except BaseException:
+                self._lock.release()
+                raise
+        self._owner = threading.get_ident()
+        metrics.db_write_lock_wait.observe(time.perf_counter() - start)
+
+    def release(self):
+        self._owner = None
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._lock.release()
+
+
+# 数据库文件路径 -> WriteLock，同一数据库的所有连接共用
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def get_write_lock(database: str) -> WriteLock:
+    path = os.path.abspath(database) + ".write-lock"
+    with _locks_guard:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = WriteLock(path)
+        return lock
+
+
+class CoordinatedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        self.connection._before_statement(sql)
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection._after_statement()
+
+    def executemany(self, sql, seq_of_parameters):
+        self.connection._before_statement(sql)
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection._after_statement()
+
+
+class CoordinatedConnection(sqlite3.Connection):
+    """写事务期间持有写锁的 sqlite3 连接"""
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self._write_lock = get_write_lock(database)
+        self._holding = False
+
+    def cursor(self, factory=CoordinatedCursor):
+        return super().cursor(factory)
+
+    def _before_statement(self, sql: str):
+        if not self._holding and not self.in_transaction and is_write(sql):
+            self._write_lock.acquire()
+            self._holding = True
+
+    def _after_statement(self):
+        # 自动提交执行的语句，或执行失败、事务已回滚
+        if self._holding and not self.in_transaction:
+            self._release()
+
+    def _release(self):
+        self._holding = False
+        self._write_lock.release()
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            if self._holding and not self.in_transaction:
+                self._release()
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            if self._holding:
+                self._release()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            if self._holding:
+                self._release()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+文档领取并发基准测试
+
+在临时数据库中生成文档和专家，多个线程模拟专家同时领取文档，统计吞吐量、延迟、
+重复领取（同一文档被多人认为领取成功）和数据库锁错误：
+- lease：POST /api/documents/next 的领取方式（条件UPDATE）
+- naive：原 /claim/{id} 的方式，先读取 assigned_to 判断为空再写入
+
+用法:
+    python backend/benchmarks/claim_benchmark.py --documents 5000 --experts 32
+    python backend/benchmarks/claim_benchmark.py --mode naive
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+# 基准测试使用临时数据库，须在导入 app 之前设置
+_tmp_dir = tempfile.mkdtemp(prefix="claim_benchmark_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'benchmark.db')}"
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from app.database import SessionLocal, engine, Base
+from app.models import Document, User
+from app.migrations import upgrade
+from app.services.document import get_document, assign_document
+from app.services.lease import lease_next_document
+
+
+def seed(documents: int, experts: int):
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), [
+            {"username": f"expert{i}", "hashed_password": "-", "role": "expert"}
+            for i in range(experts)
+        ])
+        db.execute(insert(Document), [
+            {"title": f"文档{i}", "source_content": "原文", "generated_content": "生成内容", "status": "pending"}
+            for i in range(documents)
+        ])
+        db.commit()
+        return [user.id for user in db.query(User).order_by(User.id)]
+    finally:
+        db.close()
+
+
+def claim_with_lease(db, user_id):
+    document = lease_next_document(db, user_id)
+    if document is None:
+        return None
+    # 模拟完成标注，下一次领取新文档
+    document.status = "completed"
+    document.lease_expires_at = None
+    db.commit()
+    return document.id
+
+
+def claim_naive(db, user_id):
+    while True:
+        row = db.query(Document.id).filter(Document.assigned_to.is_(None)).order_by(Document.id).first()
+        if row is None:
+            return None
+        document = get_document(db, row.id)
+        if document.assigned_to is not None:
+            db.rollback()
+            continue
+        assign_document(db, row.id, user_id)
+        return row.id
+
+
+def run(mode: str, user_ids, results, latencies, errors):
+    claim = claim_with_lease if mode == "lease" else claim_naive
+
+    def worker(user_id):
+        db = SessionLocal()
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    document_id = claim(db, user_id)
+                except OperationalError:
+                    db.rollback()
+                    errors[user_id] += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+                if document_id is None:
+                    return
+                results.append((document_id, user_id))
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=worker, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文档领取并发基准测试")
+    parser.add_argument("--documents", "-d", type=int, default=2000, help="文档数（默认2000）")
+    parser.add_argument("--experts", "-e", type=int, default=32, help="并发专家数（默认32）")
+    parser.add_argument("--mode", "-m", choices=["lease", "naive"], default="lease",
+                        help="lease: 条件UPDATE领取；naive: 先读后写（原认领接口）")
+    args = parser.parse_args()
+
+    user_ids = seed(args.documents, args.experts)
+    results, latencies = [], []
+    errors = Counter()
+
+    start = time.perf_counter()
+    run(args.mode, user_ids, results, latencies, errors)
+    elapsed = time.perf_counter() - start
+
+    claims = Counter(document_id for document_id, _ in results)
+    duplicated = sum(1 for count in claims.values() if count > 1)
+
+    print(f"模式: {args.mode}  文档: {args.documents}  并发专家: {args.experts}")
+    print(f"成功领取: {len(results)} 次，覆盖文档 {len(claims)} 篇，耗时 {elapsed:.2f}s，"
+          f"吞吐 {len(results) / elapsed:.0f} 次/秒")
+    print(f"延迟: p50 {percentile(latencies, 50) * 1000:.1f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} ms  max {max(latencies) * 1000:.1f} ms")
+    print(f"重复领取的文档: {duplicated}  数据库锁错误: {sum(errors.values())}")
+    shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+合成语料生成器
+
+按指定规模生成专家、文档和标注，用于在本地复现生产规模的数据量：
+- 正文由地方志风格的句子拼成，长度服从对数正态分布（多数几千字，少数长达十万字），按段落换行
+- 标注的评论为0-4条，包含意见和从生成内容中选取的原文片段，时间分布在最近 days 天内
+- 文档的分配、状态与其标注情况一致；同时写入段落索引和全文检索表（可用 --no-search-index 跳过）
+- 不建立近似重复索引（MinHash），生成的文档都视为非重复
+
+所有专家的密码均为 expert123，管理员为 admin / admin123，负载测试可以直接登录。
+相同的参数和 --seed 生成相同的数据。
+
+用法:
+    python backend/benchmarks/corpus.py --preset production --database ./corpus.db
+    python backend/benchmarks/corpus.py --documents 20000 --experts 100 --annotations 80000 --database ./corpus.db
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PRESETS = {
+    "small": {"documents": 5000, "experts": 50, "annotations": 20000},
+    "medium": {"documents": 50000, "experts": 200, "annotations": 200000},
+    "production": {"documents": 500000, "experts": 1000, "annotations": 2000000},
+}
+BATCH_SIZE = 2000
+EXPERT_PASSWORD = "expert123"
+ADMIN_PASSWORD = "admin123"
+
+PLACES = ["北京市", "上海市", "浦东新区", "杭州市", "苏州市", "成都市", "西安市", "长沙市", "青岛市", "大理州",
+          "海淀区", "余杭区", "昆山市", "绵阳市", "咸阳市", "岳阳市", "即墨区", "洱源县"]
+TOPICS = ["地区生产总值", "一般公共预算收入", "常住人口", "城镇化率", "粮食产量", "社会消费品零售总额",
+          "固定资产投资", "进出口总额", "居民人均可支配收入", "研发经费支出", "森林覆盖率", "在校学生人数",
+          "公路通车里程", "接待游客人次", "规模以上工业增加值", "卫生技术人员"]
+SUBJECTS = ["全县", "全市", "全区", "本地", "当年", "辖区内", "城乡居民", "各乡镇"]
+VERBS = ["达到", "增长至", "比上年增长", "同比下降", "累计完成", "首次突破", "稳定在", "较上年末增加"]
+CLAUSES = ["坚持稳中求进工作总基调", "统筹推进疫情防控和经济社会发展", "深入实施乡村振兴战略",
+           "持续优化营商环境", "加快建设现代化产业体系", "扎实推进生态文明建设", "不断完善公共服务体系",
+           "大力推进交通基础设施建设", "积极发展文化旅游产业", "着力保障和改善民生"]
+COMMENTS = ["数据与原始素材不一致，请核对", "年份有误", "表述过于口语化，不符合志书体例", "该段内容原文中没有，属于编造",
+            "单位应为亿元", "建议补充资料来源", "行政区划名称使用了旧称", "同一数据前后表述矛盾",
+            "增长率计算有误", "该句重复", "人名、地名需与原文一致", "缺少时间限定，表述不严谨",
+            "评价性语言过多，志书应述而不论", "排比句式不符合志书文风"]
+
+
+def _sentence_pool(rng: random.Random, size: int = 4000) -> Tuple[List[str], np.ndarray]:
+    """生成句子池，返回 (句子, 每句的汉字数)"""
+    sentences = []
+    for _ in range(size):
+        year = rng.randint(1985, 2023)
+        value = round(rng.uniform(0.5, 9999), 1)
+        kind = rng.random()
+        if kind < 0.4:
+            sentence = (f"{year}年，{rng.choice(PLACES)}{rng.choice(CLAUSES)}，"
+                        f"{rng.choice(TOPICS)}{rng.choice(VERBS)}{value}亿元。")
+        elif kind < 0.7:
+            sentence = (f"{rng.choice(SUBJECTS)}{rng.choice(TOPICS)}{rng.choice(VERBS)}{value}%，"
+                        f"{rng.choice(TOPICS)}{rng.choice(VERBS)}{round(value / 3, 1)}万人。")
+        else:
+            sentence = (f"{rng.choice(SUBJECTS)}{rng.choice(CLAUSES)}，{rng.choice(CLAUSES)}，"
+                        f"{rng.choice(PLACES)}{rng.choice(TOPICS)}位居全省前列。")
+        sentences.append(sentence)
+    counts = np.array([sum(1 for c in s if '一' <= c <= '鿿') for s in sentences])
+    return sentences, counts
+
+
+class TextGenerator:
+    """由句子池拼出指定长度的正文，同时得到与 ingest.count_words 相同的字数"""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.sentences, self.chinese_counts = _sentence_pool(self.rng)
+        self.mean_length = sum(len(s) for s in self.sentences) / len(self.sentences)
+
+    def lengths(self, count: int, median: int, sigma: float = 0.8, maximum: int = 100000) -> np.ndarray:
+        """对数正态分布的正文长度（字符数）"""
+        return np.clip(self.np_rng.lognormal(np.log(median), sigma, count), 200, maximum).astype(int)
+
+    def text(self, length: int) -> Tuple[str, int]:
+        indices = self.np_rng.integers(0, len(self.sentences), max(1, int(length / self.mean_length)))
+        paragraphs = []
+        start = 0
+        while start < len(indices):
+            end = start + self.rng.randint(3, 8)
+            paragraphs.append("".join(self.sentences[i] for i in indices[start:end]))
+            start = end
+        # 句子中没有空格，每段计为一个英文"单词"
+        return "\n".join(paragraphs), int(self.chinese_counts[indices].sum()) + len(paragraphs)
+
+    def comments(self, generated: str) -> str:
+        items = []
+        for _ in range(self.rng.choices((0, 1, 2, 3, 4), weights=(40, 30, 15, 10, 5))[0]):
+            start = self.rng.randrange(max(1, len(generated) - 40))
+            items.append({
+                "text": self.rng.choice(COMMENTS),
+                "selection": generated[start:start + self.rng.randint(8, 40)].replace("\n", "")
+            })
+        return json.dumps(items, ensure_ascii=False)
+
+
+def _annotators_per_document(rng: np.random.Generator, documents: int, experts: int, annotations: int) -> np.ndarray:
+    """每篇文档的标注人数（泊松分布，总数调整为 annotations）"""
+    annotations = min(annotations, documents * experts)
+    counts = np.minimum(rng.poisson(annotations / max(documents, 1), documents), experts)
+    difference = annotations - int(counts.sum())
+    while difference:
+        index = rng.integers(0, documents)
+        step = 1 if difference > 0 else -1
+        if 0 <= counts[index] + step <= experts:
+            counts[index] += step
+            difference -= step
+    return counts
+
+
+def generate_corpus(documents: int, experts: int, annotations: int, days: int = 180, seed: int = 0,
+                    assigned_ratio: float = 0.6, median_length: int = 3000, search_index: bool = True,
+                    log=print) -> Dict[str, int]:
+    """
+    向 DATABASE_URL 指定的空数据库写入合成语料，返回各表写入的行数
+
+    须在导入 app 之前设置 DATABASE_URL
+    """
+    from sqlalchemy import insert, text
+
+    from app.database import Base, engine, SessionLocal
+    from app.migrations import upgrade
+    from app.models import Annotation, Document, DocumentParagraphIndex, User
+    from app.models.search import COMMENT_SEARCH_TABLE, SEARCH_TABLE, comment_rows, is_search_index_available
+    from app.services.auth import get_password_hash
+    from app.services.paragraphs import split_paragraphs
+
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+    search_index = search_index and is_search_index_available()
+
+    generator = TextGenerator(seed)
+    rng = generator.rng
+    np_rng = generator.np_rng
+    now = datetime.utcnow()
+    started = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        # 生成期间数据库可以随时重建，关闭同步写盘
+        db.execute(text("PRAGMA synchronous = OFF"))
+        if db.query(Document.id).first() is not None:
+            raise RuntimeError("数据库中已有文档，请指定新的数据库文件")
+
+        expert_hash = get_password_hash(EXPERT_PASSWORD)
+        db.execute(insert(User), [
+            {"id": 1, "username": "admin", "full_name": "管理员", "hashed_password": get_password_hash(ADMIN_PASSWORD),
+             "role": "admin", "created_at": now - timedelta(days=days + 30)}
+        ] + [
+            {"id": i + 2, "username": f"expert{i + 1}", "full_name": f"专家{i + 1}", "email": f"expert{i + 1}@example.com",
+             "hashed_password": expert_hash, "role": "expert", "created_at": now - timedelta(days=days + 30)}
+            for i in range(experts)
+        ])
+        db.commit()
+        expert_ids = list(range(2, experts + 2))
+
+        annotator_counts = _annotators_per_document(np_rng, documents, experts, annotations)
+        counts = {"users": experts + 1, "documents": 0, "annotations": 0, "paragraph_indexes": 0}
+        annotation_id = 0
+        for batch_start in range(0, documents, BATCH_SIZE):
+            batch_end = min(batch_start + BATCH_SIZE, documents)
+            source_lengths = generator.lengths(batch_end - batch_start, median_length)
+            document_rows, paragraph_rows, search_rows = [], [], []
+            annotation_rows, comment_search_rows = [], []
+
+            for offset, document_id in enumerate(range(batch_start + 1, batch_end + 1)):
+                source, source_words = generator.text(source_lengths[offset])
+                generated, generated_words = generator.text(int(source_lengths[offset] * rng.uniform(1.1, 1.8)))
+                created_at = now - timedelta(seconds=rng.randint(days * 86400, (days + 30) * 86400))
+
+                annotators = rng.sample(expert_ids, int(annotator_counts[document_id - 1]))
+                completed = 0
+                for annotator_id in annotators:
+                    annotation_id += 1
+                    is_completed = rng.random() < 0.85
+                    completed += is_completed
+                    comments = generator.comments(generated)
+                    annotated_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+                    annotation_rows.append({
+                        "id": annotation_id, "document_id": document_id, "annotator_id": annotator_id,
+                        "evaluation": rng.random() < 0.7, "comments": comments,
+                        "time_spent": int(np_rng.gamma(2.0, 150)), "is_completed": is_completed,
+                        "created_at": annotated_at,
+                        "updated_at": annotated_at + timedelta(seconds=rng.randint(0, 3600))
+                    })
+                    if search_index:
+                        comment_search_rows.extend(comment_rows(annotation_id, comments))
+
+                # 已有标注的文档分配给其中一位标注者，其余按比例分配或留待领取
+                if annotators:
+                    assigned_to = annotators[0]
+                    status = "completed" if completed == len(annotators) else "in_progress"
+                else:
+                    assigned_to = rng.choice(expert_ids) if rng.random() < assigned_ratio else None
+                    status = "pending"
+
+                document_rows.append({
+                    "id": document_id, "title": f"{rng.choice(PLACES)}志·{rng.choice(TOPICS)}篇（{document_id}）",
+                    "source_content": source, "generated_content": generated, "status": status,
+                    "word_count_source": source_words, "word_count_generated": generated_words,
+                    "assigned_to": assigned_to, "created_at": created_at, "updated_at": created_at
+                })
+                for field, content in (("source", source), ("generated", generated)):
+                    char_offsets, byte_offsets = split_paragraphs(content)
+                    paragraph_rows.append({
+                        "document_id": document_id, "field": field, "paragraph_count": len(char_offsets),
+                        "char_offsets": char_offsets.tobytes(), "byte_offsets": byte_offsets.tobytes()
+                    })
+                if search_index:
+                    search_rows.append({"id": document_id, "title": document_rows[-1]["title"],
+                                        "source": source, "generated": generated})
+
+            db.execute(insert(Document), document_rows)
+            db.execute(insert(DocumentParagraphIndex), paragraph_rows)
+            if annotation_rows:
+                db.execute(insert(Annotation), annotation_rows)
+            if search_rows:
+                db.execute(text(
+                    f"INSERT INTO {SEARCH_TABLE} (rowid, title, source_content, generated_content) "
+                    "VALUES (:id, :title, :source, :generated)"
+                ), search_rows)
+            if comment_search_rows:
+                db.execute(text(
+                    f"INSERT INTO {COMMENT_SEARCH_TABLE} (rowid, text, selection) VALUES (:rowid, :text, :selection)"
+                ), comment_search_rows)
+            db.commit()
+
+            counts["documents"] += len(document_rows)
+            counts["annotations"] += len(annotation_rows)
+            counts["paragraph_indexes"] += len(paragraph_rows)
+            elapsed = time.perf_counter() - started
+            log(f"  文档 {counts['documents']}/{documents}  标注 {counts['annotations']}  "
+                f"{elapsed:.0f}s ({counts['documents'] / elapsed:.0f} 篇/秒)")
+        db.execute(text("ANALYZE"))
+    finally:
+        db.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成语料")
+    parser.add_argument("--database", required=True, help="输出的SQLite数据库文件（须不存在或为空库）")
+    parser.add_argument("--preset", choices=sorted(PRESETS), help="预设规模，可被 --documents 等参数覆盖")
+    parser.add_argument("--documents", "-d", type=int, help="文档数（默认5000）")
+    parser.add_argument("--experts", "-e", type=int, help="专家数（默认50）")
+    parser.add_argument("--annotations", "-a", type=int, help="标注数（默认20000）")
+    parser.add_argument("--days", type=int, default=180, help="标注时间分布的天数（默认180）")
+    parser.add_argument("--median-length", type=int, default=3000, help="原始素材长度的中位数（字符，默认3000）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（默认0）")
+    parser.add_argument("--no-search-index", action="store_true", help="不写入全文检索表")
+    args = parser.parse_args()
+
+    sizes = dict(PRESETS[args.preset or "small"])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.database)}"
+    print(f"生成语料: {sizes}")
+    started = time.perf_counter()
+    counts = generate_corpus(days=args.days, seed=args.seed, median_length=args.median_length,
+                             search_index=not args.no_search_index, **sizes)
+    print(f"完成: {counts}，用时 {time.perf_counter() - started:.0f}s，"
+          f"文件大小 {os.path.getsize(args.database) / 1024 / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+统计页接口基准测试
+
+在临时数据库中生成文档、专家和标注，比较统计页逐项请求 overview、all-users、temporal、
+user-activity、document-completion、approval-analysis 六个接口的总耗时与一次请求
+/api/stats/dashboard 的耗时，并核对两者结果一致。
+
+用法:
+    python backend/benchmarks/dashboard_benchmark.py --annotations 1000000 --experts 2000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# 基准测试使用临时数据库，须在导入 app 之前设置
+_tmp_dir = tempfile.mkdtemp(prefix="dashboard_benchmark_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'benchmark.db')}"
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+from app.models import Annotation, Document, User
+from app.services.auth import get_current_user
+from main import app
+
+SEPARATE_ENDPOINTS = {
+    "overview": "overview",
+    "all_users": "all-users",
+    "temporal": "temporal",
+    "user_activity": "user-activity",
+    "document_completion": "document-completion",
+    "approval_analysis": "approval-analysis",
+}
+BATCH_SIZE = 50000
+
+
+def seed(documents: int, experts: int, annotations: int, days: int) -> User:
+    rng = random.Random(0)
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), [{"username": "admin", "hashed_password": "-", "role": "admin"}] + [
+            {"username": f"expert{i}", "hashed_password": "-", "role": "expert"}
+            for i in range(experts)
+        ])
+        db.execute(insert(Document), [
+            {"title": f"文档{i}", "source_content": "原文", "generated_content": "生成内容", "status": "pending"}
+            for i in range(documents)
+        ])
+        now = datetime.utcnow()
+        pairs = set()
+        while len(pairs) < min(annotations, documents * experts):
+            pairs.add((rng.randint(1, documents), rng.randint(2, experts + 1)))
+        rows = [
+            {
+                "document_id": document_id,
+                "annotator_id": annotator_id,
+                "evaluation": rng.random() < 0.7,
+                "time_spent": rng.randint(30, 900),
+                "is_completed": rng.random() < 0.9,
+                "created_at": now - timedelta(seconds=rng.randint(0, days * 86400))
+            }
+            for document_id, annotator_id in pairs
+        ]
+        for start in range(0, len(rows), BATCH_SIZE):
+            db.execute(insert(Annotation), rows[start:start + BATCH_SIZE])
+        db.commit()
+        admin = db.query(User).filter(User.role == "admin").one()
+        db.expunge(admin)
+        return admin
+    finally:
+        db.close()
+
+
+def timed_get(client: TestClient, path: str):
+    start = time.perf_counter()
+    response = client.get(path)
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return response.json(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计页接口基准测试")
+    parser.add_argument("--documents", "-d", type=int, default=100000, help="文档数（默认100000）")
+    parser.add_argument("--experts", "-e", type=int, default=500, help="专家数（默认500）")
+    parser.add_argument("--annotations", "-a", type=int, default=400000, help="标注数（默认400000）")
+    parser.add_argument("--days", type=int, default=90, help="标注时间分布的天数（默认90）")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="重复次数，取最小值（默认3）")
+    args = parser.parse_args()
+
+    try:
+        with TestClient(app) as client:
+            admin = seed(args.documents, args.experts, args.annotations, args.days)
+            # 跳过登录，直接以管理员身份请求
+            app.dependency_overrides[get_current_user] = lambda: admin
+
+            separate_times, dashboard_times = [], []
+            consistent = True
+            for _ in range(args.repeat):
+                results, elapsed = {}, 0.0
+                for section, path in SEPARATE_ENDPOINTS.items():
+                    results[section], seconds = timed_get(client, f"/api/stats/{path}")
+                    elapsed += seconds
+                separate_times.append(elapsed)
+
+                dashboard, seconds = timed_get(client, "/api/stats/dashboard?sections=" + ",".join(SEPARATE_ENDPOINTS))
+                dashboard_times.append(seconds)
+                # temporal 的时间窗口随请求时刻移动，窗口边界附近的标注可能不同，不参与核对
+                consistent &= all(
+                    results[section] == dashboard[section] for section in SEPARATE_ENDPOINTS if section != "temporal"
+                )
+
+            print(f"文档: {args.documents}  专家: {args.experts}  标注: {args.annotations}")
+            print(f"六个接口合计: {min(separate_times) * 1000:.0f} ms")
+            print(f"dashboard:    {min(dashboard_times) * 1000:.0f} ms  "
+                  f"({min(separate_times) / min(dashboard_times):.1f}x)")
+            print(f"结果一致: {'是' if consistent else '否'}")
+    finally:
+        app.dependency_overrides.clear()
+        shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
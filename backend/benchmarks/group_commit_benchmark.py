@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+标注保存组提交基准测试
+
+--writers 个并发写入者（默认200，各自对应一名专家和一篇文档）同时通过 POST /api/annotations/{id} 自动保存，
+每个写入者保存 --saves 次，两次之间随机间隔 0~--think 秒。比较逐次提交（GROUP_COMMIT=0）与组提交
+（GROUP_COMMIT=1，见 app/services/write_queue.py），统计吞吐量、p50/p95/p99 延迟、错误数和每次保存的提交数。
+每种配置在单独的子进程中运行（配置在导入 app 时读取），在进程内通过 httpx.ASGITransport 请求。
+
+用法:
+    python backend/benchmarks/group_commit_benchmark.py --database ./corpus.db --writers 200 --saves 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+VARIANTS = {"direct": {"GROUP_COMMIT": "0"}, "group": {"GROUP_COMMIT": "1"}}
+COMMITS_PATTERN = re.compile(r"^db_commits_total (\S+)", re.MULTILINE)
+
+
+async def run_writers(args) -> dict:
+    """子进程中运行"""
+    import logging
+    import httpx
+    from app.database import SessionLocal
+    from app.models import Document, User
+    from app.services.auth import create_access_token
+    from main import app
+
+    logging.getLogger("app.sql").setLevel(logging.ERROR)
+    db = SessionLocal()
+    try:
+        experts = [username for username, in db.query(User.username).filter(User.role == "expert").order_by(User.id)]
+        document_ids = [document_id for document_id, in db.query(Document.id).order_by(Document.id)]
+    finally:
+        db.close()
+    rng = random.Random(args.seed)
+    targets = rng.sample(document_ids, args.writers)
+    tokens = {username: create_access_token({"sub": username}) for username in experts}
+
+    latencies, errors = [], 0
+
+    async def writer(index: int, client: httpx.AsyncClient):
+        nonlocal errors
+        writer_rng = random.Random(args.seed + index)
+        headers = {"Authorization": f"Bearer {tokens[experts[index % len(experts)]]}"}
+        for i in range(args.saves):
+            body = {
+                "evaluation": writer_rng.random() < 0.7,
+                "comments": [{"text": f"第{i}次保存的评论", "selection": "选中的文本"}],
+                "time_spent": writer_rng.randint(1, 30),
+                "is_completed": i == args.saves - 1,
+            }
+            begin = time.perf_counter()
+            try:
+                response = await client.post(f"/api/annotations/{targets[index]}", json=body, headers=headers)
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - begin)
+                else:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            await asyncio.sleep(writer_rng.uniform(0, args.think))
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+            before = float(COMMITS_PATTERN.search((await client.get("/metrics")).text).group(1))
+            start = time.perf_counter()
+            await asyncio.gather(*(writer(index, client) for index in range(args.writers)))
+            elapsed = time.perf_counter() - start
+            after = float(COMMITS_PATTERN.search((await client.get("/metrics")).text).group(1))
+
+    values = np.array(latencies) * 1000
+    result = {
+        "saves": len(latencies), "errors": errors, "seconds": round(elapsed, 2),
+        "saves_per_second": round(len(latencies) / elapsed, 1),
+        "commits_per_save": round((after - before) / max(len(latencies), 1), 3),
+    }
+    if len(values):
+        result.update({f"p{q}_ms": round(float(np.percentile(values, q)), 1) for q in (50, 95, 99)})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标注保存组提交基准测试")
+    parser.add_argument("--database", help="语料数据库，测试在其副本上进行；省略时临时生成小规模语料")
+    parser.add_argument("--writers", "-w", type=int, default=200, help="并发写入者数（默认200）")
+    parser.add_argument("--saves", "-n", type=int, default=20, help="每个写入者的保存次数（默认20）")
+    parser.add_argument("--think", type=float, default=0.05, help="两次保存之间的最大间隔秒数（默认0.05）")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="测试的配置（默认 direct,group）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（默认0）")
+    parser.add_argument("--output", "-o", help="结果JSON文件")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_writers(args))))
+        return
+
+    tmp_dir = tempfile.mkdtemp(prefix="group_commit_")
+    try:
+        source = args.database
+        if not source:
+            from corpus import PRESETS, generate_corpus
+            source = os.path.join(tmp_dir, "corpus.db")
+            os.environ["DATABASE_URL"] = f"sqlite:///{source}"
+            print(f"生成语料 (small): {PRESETS['small']}")
+            generate_corpus(**PRESETS["small"], log=lambda message: None)
+
+        print(f"{args.writers} 个并发写入者，每个保存 {args.saves} 次")
+        results = {}
+        for name in [name.strip() for name in args.variants.split(",") if name.strip()]:
+            database = os.path.join(tmp_dir, f"{name}.db")
+            with sqlite3.connect(source) as src, sqlite3.connect(database) as target:
+                src.backup(target)
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", name, "--writers", str(args.writers),
+                 "--saves", str(args.saves), "--think", str(args.think), "--seed", str(args.seed)],
+                cwd=BACKEND_DIR, env={**os.environ, **VARIANTS[name], "DATABASE_URL": f"sqlite:///{database}"},
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = results[name] = json.loads(output.strip().splitlines()[-1])
+            print(f"{name:<8} {result['saves']:>6} 次保存  {result['saves_per_second']:>7.1f} 次/秒  错误 {result['errors']}  "
+                  f"每次保存提交 {result['commits_per_save']:.3f} 次  p50 {result.get('p50_ms', 0):>7.1f}  "
+                  f"p95 {result.get('p95_ms', 0):>7.1f}  p99 {result.get('p99_ms', 0):>7.1f} ms")
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "variants": results}, f, ensure_ascii=False, indent=2)
+            print(f"结果已写入 {args.output}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+并发负载测试
+
+模拟多名专家同时标注：每个并发会话登录后反复执行"查看已分配文档 -> 打开文档 -> 多次自动保存 -> 提交完成"，
+统计吞吐量、各接口的 p50/p95/p99 延迟、错误数和 database is locked 错误数（取自 /metrics 的 db_errors_total）。
+--concurrency 可给出多个并发数依次测试，找出自动保存 p99 超过 --p99-target-ms 之前能支撑的并发数。
+
+运行方式：
+- 默认在进程内通过 httpx.ASGITransport 驱动 app（与 uvicorn 单进程相同，共用一个事件循环）
+- --uvicorn 在子进程中启动 uvicorn（--workers 指定工作进程数），经本机TCP请求
+- --url 请求已运行的服务（专家账号为 expert1..N，密码 --password）
+
+前两种方式使用语料副本（--database，或临时生成小规模语料，见 benchmarks/corpus.py）。
+
+用法:
+    python backend/benchmarks/load_test.py --concurrency 10,50,100,200 --saves 10
+    python backend/benchmarks/load_test.py --database ./corpus.db --uvicorn --concurrency 200 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 添加项目根目录到Python路径
+sys.path.append(BACKEND_DIR)
+
+from corpus import PRESETS, generate_corpus, EXPERT_PASSWORD
+
+LOCKED_PATTERN = re.compile(r'^db_errors_total\{kind="locked"\} (\d+)', re.MULTILINE)
+AUTOSAVE_ROUTE = "POST /api/annotations/{id}"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str,
+                      **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.errors[route][type(e).__name__] += 1
+            return None
+        self.latencies[route].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[route][str(response.status_code)] += 1
+            return None
+        return response
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(set(self.latencies) | set(self.errors)):
+            values = np.array(self.latencies[route] or [0.0]) * 1000
+            routes[route] = {
+                "requests": len(self.latencies[route]),
+                "errors": dict(self.errors[route]),
+                "throughput_rps": round(len(self.latencies[route]) / elapsed, 2),
+                "p50_ms": round(float(np.percentile(values, 50)), 2),
+                "p95_ms": round(float(np.percentile(values, 95)), 2),
+                "p99_ms": round(float(np.percentile(values, 99)), 2),
+                "max_ms": round(float(values.max()), 2),
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": total,
+            "errors": sum(sum(counter.values()) for counter in self.errors.values()),
+            "throughput_rps": round(total / elapsed, 2),
+            "routes": routes,
+        }
+
+
+async def expert_session(client: httpx.AsyncClient, recorder: Recorder, username: str, password: str,
+                         args, rng: random.Random):
+    """一名专家的标注会话"""
+    # 错开开始时间，避免所有会话同时登录
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+    response = await recorder.request(client, "POST /api/auth/login", "POST", "/api/auth/login",
+                                      data={"username": username, "password": password})
+    if response is None:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for _ in range(args.rounds):
+        response = await recorder.request(client, "GET /api/documents/my/assigned", "GET",
+                                          "/api/documents/my/assigned?limit=200", headers=headers)
+        documents = [doc["id"] for doc in response.json() if doc["status"] != "completed"] if response else []
+        if documents:
+            document_id = rng.choice(documents)
+        else:
+            response = await recorder.request(client, "POST /api/documents/next", "POST", "/api/documents/next",
+                                              headers=headers)
+            if response is None:
+                return
+            document_id = response.json()["document_id"]
+
+        if await recorder.request(client, "GET /api/documents/{id}", "GET", f"/api/documents/{document_id}",
+                                  headers=headers) is None:
+            continue
+        for index in range(args.saves + 1):
+            await asyncio.sleep(args.think * rng.uniform(0.5, 1.5))
+            comments = [{"text": f"第{i + 1}条意见", "selection": "选中的文本"} for i in range(rng.randint(0, 3))]
+            await recorder.request(client, AUTOSAVE_ROUTE, "POST", f"/api/annotations/{document_id}", headers=headers,
+                                   json={"evaluation": rng.random() < 0.7, "comments": comments,
+                                         "time_spent": 5, "is_completed": index == args.saves})
+
+
+async def locked_errors(client: httpx.AsyncClient) -> int:
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return 0
+    match = LOCKED_PATTERN.search(response.text)
+    return int(match.group(1)) if match else 0
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, args, seed: int) -> dict:
+    recorder = Recorder()
+    locked_before = await locked_errors(client)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        expert_session(client, recorder, f"expert{index % args.experts + 1}", args.password, args,
+                       random.Random(seed * 100003 + index))
+        for index in range(concurrency)
+    ))
+    result = recorder.summary(time.perf_counter() - started)
+    result["concurrency"] = concurrency
+    result["database_locked"] = await locked_errors(client) - locked_before
+    return result
+
+
+def print_level(result: dict):
+    print(f"\n并发 {result['concurrency']}: {result['requests']} 个请求，用时 {result['elapsed_s']}s，"
+          f"{result['throughput_rps']} 请求/秒，错误 {result['errors']}，database is locked {result['database_locked']}")
+    for route, stats in result["routes"].items():
+        errors = ", ".join(f"{kind}×{count}" for kind, count in stats["errors"].items())
+        print(f"  {route:<34} {stats['requests']:>6} 次  p50 {stats['p50_ms']:>8.1f}  p95 {stats['p95_ms']:>8.1f}  "
+              f"p99 {stats['p99_ms']:>8.1f} ms" + (f"  错误 {errors}" if errors else ""))
+
+
+async def run(base_url: Optional[str], app, args) -> List[dict]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(args.timeout)
+    if app is not None:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=timeout)
+    else:
+        client = httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits)
+
+    results = []
+    async with client:
+        for level_index, concurrency in enumerate(args.concurrency):
+            result = await run_level(client, concurrency, args, args.seed + level_index)
+            print_level(result)
+            results.append(result)
+    return results
+
+
+async def run_in_process(args) -> List[dict]:
+    from main import app
+    # ASGITransport 不发送 lifespan 事件，这里手动进入
+    async with app.router.lifespan_context(app):
+        return await run(None, app, args)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(database_url: str, workers: int = 1) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--workers", str(workers)],
+        cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": database_url}
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn 启动失败")
+        try:
+            if httpx.get(f"{base_url}/api", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("等待 uvicorn 启动超时")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发负载测试")
+    parser.add_argument("--concurrency", "-c", default="50",
+                        help="并发会话数，多个以逗号分隔依次测试（默认50）")
+    parser.add_argument("--rounds", type=int, default=2, help="每个会话标注的文档数（默认2）")
+    parser.add_argument("--saves", type=int, default=10, help="每篇文档提交前的自动保存次数（默认10）")
+    parser.add_argument("--think", type=float, default=0.2, help="两次自动保存之间的平均间隔秒数（默认0.2）")
+    parser.add_argument("--ramp", type=float, default=2.0, help="会话在该秒数内陆续开始（默认2）")
+    parser.add_argument("--timeout", type=float, default=60.0, help="请求超时秒数（默认60）")
+    parser.add_argument("--experts", type=int, help="使用的专家账号数（默认等于最大并发数，不超过语料中的专家数）")
+    parser.add_argument("--password", default=EXPERT_PASSWORD, help="专家密码（默认为合成语料的密码）")
+    parser.add_argument("--database", help="语料数据库，测试在其副本上进行；省略时临时生成小规模语料")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small", help="临时生成语料的规模（默认small）")
+    parser.add_argument("--uvicorn", action="store_true", help="在子进程中启动 uvicorn 并通过TCP请求")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="--uvicorn 的工作进程数（默认1；大于1时 locked 错误数只取自应答 /metrics 的进程）")
+    parser.add_argument("--url", help="请求已运行的服务（如 http://127.0.0.1:8001），不使用语料副本")
+    parser.add_argument("--p99-target-ms", type=float, default=200.0, help="自动保存 p99 的目标（默认200ms）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（默认0）")
+    parser.add_argument("--output", "-o", help="结果JSON文件")
+    args = parser.parse_args()
+    args.concurrency = [int(value) for value in args.concurrency.split(",")]
+
+    tmp_dir = tempfile.mkdtemp(prefix="load_test_")
+    database = os.path.join(tmp_dir, "load.db")
+    database_url = f"sqlite:///{database}"
+    process = None
+    try:
+        experts = args.experts or max(args.concurrency)
+        if not args.url:
+            # 须在导入 app 之前设置
+            os.environ["DATABASE_URL"] = database_url
+            if args.database:
+                with sqlite3.connect(args.database) as source, sqlite3.connect(database) as target:
+                    source.backup(target)
+            else:
+                print(f"生成语料 ({args.preset}): {PRESETS[args.preset]}")
+                generate_corpus(**PRESETS[args.preset], log=lambda message: None)
+            with sqlite3.connect(database) as conn:
+                experts = min(experts, conn.execute("SELECT COUNT(*) FROM users WHERE role = 'expert'").fetchone()[0])
+        args.experts = experts
+
+        if args.url:
+            results = asyncio.run(run(args.url, None, args))
+        elif args.uvicorn:
+            process, base_url = start_uvicorn(database_url, args.workers)
+            results = asyncio.run(run(base_url, None, args))
+        else:
+            results = asyncio.run(run_in_process(args))
+
+        sustained = [
+            result["concurrency"] for result in results
+            if AUTOSAVE_ROUTE in result["routes"] and result["routes"][AUTOSAVE_ROUTE]["p99_ms"] <= args.p99_target_ms
+            and not result["errors"]
+        ]
+        print(f"\n自动保存 p99 ≤ {args.p99_target_ms:g} ms 且无错误的最大并发: {max(sustained) if sustained else '无'}")
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"mode": "url" if args.url else "uvicorn" if args.uvicorn else "asgi",
+                           "args": {key: value for key, value in vars(args).items() if key != "password"},
+                           "levels": results}, f, ensure_ascii=False, indent=2)
+            print(f"结果已写入 {args.output}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
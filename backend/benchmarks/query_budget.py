@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+接口查询预算检查
+
+在临时数据库中生成文档、专家和标注，在 track_queries() 中请求列表、详情和统计接口，
+检查每个接口的SQL语句数与同一语句的重复次数（N+1）。语句数应与返回行数无关，
+任一接口超出预算时列出其执行最多的语句并以非零状态退出，可在提交前或CI中运行。
+
+用法:
+    python backend/benchmarks/query_budget.py --documents 500 --experts 50
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+# 检查使用临时数据库，须在导入 app 之前设置
+_tmp_dir = tempfile.mkdtemp(prefix="query_budget_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'benchmark.db')}"
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+from app.models import Annotation, Document, User
+from app.querylog import track_queries, QueryBudgetExceeded
+from app.services.auth import get_current_user
+from main import app
+
+# (角色, 路径, 语句数上限)；同一语句最多执行 MAX_REPEATS 次
+BUDGETS = [
+    ("admin", "/api/documents/", 6),
+    ("admin", "/api/documents/?annotation_status=进行中&sort=updated_at&order=desc", 6),
+    ("expert", "/api/documents/", 6),
+    ("expert", "/api/documents/my/assigned", 6),
+    ("expert", "/api/documents/available", 6),
+    ("expert", "/api/documents/1", 10),
+    ("admin", "/api/stats/overview", 6),
+    ("expert", "/api/stats/my-stats", 6),
+    ("admin", "/api/stats/all-users", 6),
+    ("admin", "/api/stats/temporal", 6),
+    ("admin", "/api/stats/user-activity", 6),
+    ("admin", "/api/stats/document-completion", 6),
+    ("admin", "/api/stats/approval-analysis", 6),
+    ("admin", "/api/stats/dashboard", 10),
+]
+MAX_REPEATS = 3
+
+
+def seed(documents: int, experts: int, annotations: int):
+    rng = random.Random(0)
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), [{"username": "admin", "hashed_password": "-", "role": "admin"}] + [
+            {"username": f"expert{i}", "hashed_password": "-", "role": "expert"}
+            for i in range(experts)
+        ])
+        db.execute(insert(Document), [
+            {
+                "title": f"文档{i}", "source_content": "原文", "generated_content": "生成内容", "status": "pending",
+                # 一半文档分配给第一个专家，其余未分配
+                "assigned_to": 2 if i % 2 == 0 else None
+            }
+            for i in range(documents)
+        ])
+        pairs = set()
+        while len(pairs) < min(annotations, documents * experts):
+            pairs.add((rng.randint(1, documents), rng.randint(2, experts + 1)))
+        db.execute(insert(Annotation), [
+            {
+                "document_id": document_id, "annotator_id": annotator_id, "evaluation": rng.random() < 0.7,
+                "time_spent": rng.randint(30, 900), "is_completed": rng.random() < 0.8
+            }
+            for document_id, annotator_id in pairs
+        ])
+        db.commit()
+        users = {}
+        for role in ("admin", "expert"):
+            user = db.query(User).filter(User.role == role).order_by(User.id).first()
+            db.expunge(user)
+            users[role] = user
+        return users
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口查询预算检查")
+    parser.add_argument("--documents", "-d", type=int, default=500, help="文档数（默认500）")
+    parser.add_argument("--experts", "-e", type=int, default=50, help="专家数（默认50）")
+    parser.add_argument("--annotations", "-a", type=int, default=2000, help="标注数（默认2000）")
+    args = parser.parse_args()
+
+    failures = 0
+    try:
+        with TestClient(app) as client:
+            users = seed(args.documents, args.experts, args.annotations)
+            for role, path, max_queries in BUDGETS:
+                # 跳过登录，直接以对应角色请求
+                app.dependency_overrides[get_current_user] = lambda user=users[role]: user
+                try:
+                    with track_queries(max_queries=max_queries, max_repeats=MAX_REPEATS, label=path) as stats:
+                        client.get(path).raise_for_status()
+                    print(f"通过  {role:<6} {path:<70} {stats.queries:>3} 条语句")
+                except QueryBudgetExceeded as e:
+                    failures += 1
+                    print(f"超出  {role:<6} {path}\n{e}")
+    finally:
+        app.dependency_overrides.clear()
+        shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+    print(f"\n{len(BUDGETS) - failures}/{len(BUDGETS)} 个接口在预算内")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
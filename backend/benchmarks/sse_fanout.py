@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+进度推送扇出基准测试
+
+在临时数据库上启动服务，建立大量 GET /api/stats/stream 连接，按指定速率发布事件，
+统计每个事件从发布到各客户端收到的延迟、送达数量以及发布一个事件的耗时。
+
+用法:
+    python backend/benchmarks/sse_fanout.py --clients 500 --events 200 --rate 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+# 基准测试使用临时数据库，须在导入 app 之前设置
+_tmp_dir = tempfile.mkdtemp(prefix="sse_fanout_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'benchmark.db')}"
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+
+from main import app
+from app.database import SessionLocal
+from app.events import broker
+from app.models import User
+from app.services.auth import create_access_token
+from app.startup import check_schema
+
+
+def start_server() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return port
+
+
+async def client(port: int, token: str, ready: asyncio.Event, connected: list, latencies: list,
+                 expected: int):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /api/stats/stream?token={token} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    received = 0
+    event = None
+    while received < expected:
+        line = (await reader.readline()).decode("utf-8").strip()
+        if line.startswith("event: "):
+            event = line[7:]
+        elif line.startswith("data: "):
+            if event == "snapshot":
+                connected.append(time.perf_counter())
+                if len(connected) == ready.total:
+                    ready.set()
+            elif event == "benchmark":
+                latencies.append(time.perf_counter() - json.loads(line[6:])["sent"])
+                received += 1
+    writer.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+async def run(args, port: int, token: str):
+    ready = asyncio.Event()
+    ready.total = args.clients
+    connected, latencies = [], []
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(client(port, token, ready, connected, latencies, args.events))
+             for _ in range(args.clients)]
+    await asyncio.wait_for(ready.wait(), 120)
+    connect_time = time.perf_counter() - start
+
+    publish_costs = []
+    start = time.perf_counter()
+    for index in range(args.events):
+        sent = time.perf_counter()
+        broker.publish("benchmark", {"index": index, "sent": sent,
+                                     "counters": {"annotations": {"total": 1, "completed": 1}}})
+        publish_costs.append(time.perf_counter() - sent)
+        await asyncio.sleep(max(0.0, start + (index + 1) / args.rate - time.perf_counter()))
+    await asyncio.wait_for(asyncio.gather(*tasks), 120)
+    elapsed = time.perf_counter() - start
+
+    print(f"客户端: {args.clients}  事件: {args.events}  发布速率: {args.rate}/s")
+    print(f"建立连接并收到快照: {connect_time:.2f}s")
+    print(f"送达: {len(latencies)}/{args.clients * args.events}，耗时 {elapsed:.2f}s，"
+          f"{len(latencies) / elapsed:.0f} 条/秒")
+    print(f"送达延迟: p50 {percentile(latencies, 50) * 1000:.1f} ms  p99 {percentile(latencies, 99) * 1000:.1f} ms  "
+          f"max {max(latencies) * 1000:.1f} ms")
+    print(f"发布耗时: 平均 {sum(publish_costs) / len(publish_costs) * 1e6:.0f} us")
+    print(f"因积压丢弃的订阅者队列: {broker.dropped}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="进度推送扇出基准测试")
+    parser.add_argument("--clients", "-c", type=int, default=200, help="并发连接数（默认200）")
+    parser.add_argument("--events", "-n", type=int, default=100, help="发布事件数（默认100）")
+    parser.add_argument("--rate", "-r", type=float, default=50, help="每秒发布事件数（默认50）")
+    args = parser.parse_args()
+
+    # 服务在 lifespan 中建表，这里先于启动写入用户
+    check_schema(log=lambda message: None)
+    db = SessionLocal()
+    db.add(User(username="benchmark", hashed_password="-", role="admin"))
+    db.commit()
+    db.close()
+    token = create_access_token({"sub": "benchmark"})
+
+    port = start_server()
+    try:
+        asyncio.run(run(args, port, token))
+    finally:
+        shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+冷启动基准测试
+
+在子进程中反复启动 uvicorn，测量从启动进程到 /api 首次返回200的时间，以及启动后第一次登录、
+第一次打开文档（最近有标注的文档，即预热的对象）的延迟。比较以下配置（见 app/startup.py）：
+- default：启动时检查表结构，不预热
+- skip_schema：SKIP_SCHEMA_CHECK=1
+- warmup：WARMUP=all，后台预热，不推迟开始服务
+- warmup_blocking：WARMUP=all WARMUP_BLOCKING=1，预热完成后才开始服务
+
+各阶段耗时取自 /metrics 的 startup_phase_seconds。每种配置重复 --repeats 次取中位数。
+
+用法:
+    python backend/benchmarks/startup_benchmark.py --database ./corpus.db --repeats 5
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from corpus import PRESETS, generate_corpus, EXPERT_PASSWORD
+from load_test import _free_port
+
+VARIANTS = {
+    "default": {},
+    "skip_schema": {"SKIP_SCHEMA_CHECK": "1"},
+    "warmup": {"WARMUP": "all"},
+    "warmup_blocking": {"WARMUP": "all", "WARMUP_BLOCKING": "1"},
+}
+PHASE_PREFIX = "startup_phase_seconds{phase=\""
+
+
+def _phases(base_url: str) -> Dict[str, float]:
+    phases = {}
+    for line in httpx.get(f"{base_url}/metrics").text.splitlines():
+        if line.startswith(PHASE_PREFIX):
+            name, value = line[len(PHASE_PREFIX):].split("\"} ")
+            phases[name] = float(value) * 1000
+    return phases
+
+
+def measure(database_url: str, env: Dict[str, str], username: str, document_id: int) -> Dict[str, float]:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, **env, "DATABASE_URL": database_url},
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        deadline = start + 120
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn 启动失败")
+            if time.perf_counter() > deadline:
+                raise RuntimeError("等待 uvicorn 启动超时")
+            # 单核机器上轮询本身会与被测进程争用CPU：先以低开销的TCP连接探测端口，连通后再请求
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            except OSError:
+                time.sleep(0.01)
+                continue
+            if httpx.get(f"{base_url}/api", timeout=5).status_code == 200:
+                break
+        result = {"ready_ms": (time.perf_counter() - start) * 1000}
+
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            begin = time.perf_counter()
+            response = client.post("/api/auth/login", data={"username": username, "password": EXPERT_PASSWORD})
+            response.raise_for_status()
+            result["first_login_ms"] = (time.perf_counter() - begin) * 1000
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            begin = time.perf_counter()
+            client.get(f"/api/documents/{document_id}", headers=headers).raise_for_status()
+            result["first_open_ms"] = (time.perf_counter() - begin) * 1000
+            result["first_login_and_open_ms"] = result["ready_ms"] + result["first_login_ms"] + result["first_open_ms"]
+        result.update({f"phase_{name}_ms": value for name, value in _phases(base_url).items()})
+        return result
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动基准测试")
+    parser.add_argument("--database", help="语料数据库，测试在其副本上进行；省略时临时生成小规模语料")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small", help="临时生成语料的规模（默认small）")
+    parser.add_argument("--variants", default=",".join(VARIANTS),
+                        help=f"测试的配置，逗号分隔（默认全部: {','.join(VARIANTS)}）")
+    parser.add_argument("--repeats", "-n", type=int, default=5, help="每种配置的启动次数（默认5）")
+    parser.add_argument("--output", "-o", help="结果JSON文件")
+    args = parser.parse_args()
+    variants = [name.strip() for name in args.variants.split(",") if name.strip()]
+
+    tmp_dir = tempfile.mkdtemp(prefix="startup_benchmark_")
+    database = os.path.join(tmp_dir, "startup.db")
+    database_url = f"sqlite:///{database}"
+    try:
+        os.environ["DATABASE_URL"] = database_url
+        if args.database:
+            with sqlite3.connect(args.database) as source, sqlite3.connect(database) as target:
+                source.backup(target)
+        else:
+            print(f"生成语料 ({args.preset}): {PRESETS[args.preset]}")
+            generate_corpus(**PRESETS[args.preset], log=lambda message: None)
+        # 最近一条标注的专家与文档，模拟专家重新打开正在标注的文档
+        with sqlite3.connect(database) as conn:
+            username, document_id = conn.execute(
+                "SELECT u.username, a.document_id FROM annotations a JOIN users u ON u.id = a.annotator_id "
+                "ORDER BY a.created_at DESC LIMIT 1"
+            ).fetchone()
+
+        results = {}
+        for name in variants:
+            runs: List[Dict[str, float]] = [
+                measure(database_url, VARIANTS[name], username, document_id) for _ in range(args.repeats)
+            ]
+            summary = {key: round(float(np.median([run[key] for run in runs if key in run])), 1)
+                       for key in runs[0]}
+            results[name] = summary
+            print(f"{name:<16} 就绪 {summary['ready_ms']:>7.0f} ms  首次登录 {summary['first_login_ms']:>6.0f} ms  "
+                  f"首次打开文档 {summary['first_open_ms']:>5.0f} ms  合计 {summary['first_login_and_open_ms']:>7.0f} ms")
+            phases = {key[6:-3]: value for key, value in summary.items() if key.startswith("phase_")}
+            print(" " * 17 + ", ".join(f"{phase} {value:.0f} ms" for phase, value in phases.items()))
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "variants": results}, f, ensure_ascii=False, indent=2)
+            print(f"结果已写入 {args.output}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+基准测试套件
+
+在合成语料（benchmarks/corpus.py）上依次运行各场景，记录每个接口的延迟分布和每次请求的SQL语句数，
+结果写入JSON文件，可与之前的结果对比：
+- 列表：管理员文档列表、带筛选排序的列表、专家的已分配/可领取文档
+- 打开文档：详情（未缓存与缓存命中）、按段落分页读取
+- 自动保存：专家反复保存自己文档的标注（含评论）
+- 领取：POST /api/documents/next 领取后释放租约
+- 导入：POST /api/documents/bulk 批量导入JSONL
+- 统计：全部统计接口、dashboard 与一致性统计
+
+请求直接以对应角色发出（跳过登录），通过 TestClient 在进程内执行，不含网络开销。
+
+用法:
+    # 临时生成小规模语料并运行
+    python backend/benchmarks/suite.py --preset small --output results.json
+    # 在已生成的语料副本上运行（场景会写入数据，原文件不变），并与上次结果对比
+    python backend/benchmarks/corpus.py --preset production --database ./corpus.db
+    python backend/benchmarks/suite.py --database ./corpus.db --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import func
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import PRESETS, TextGenerator, generate_corpus
+
+
+class Scenario(NamedTuple):
+    name: str
+    role: str
+    iterations: int
+    # (上下文, 随机数) -> (方法, 路径, 请求参数)
+    build: Callable[["Context", random.Random], tuple]
+
+
+class Context:
+    def __init__(self, db, models):
+        User, Document, Annotation = models.User, models.Document, models.Annotation
+        self.admin = db.query(User).filter(User.role == "admin").first()
+        # 分配文档最多的专家，自动保存与打开文档都在其文档上进行
+        expert_id = db.query(Document.assigned_to).filter(Document.assigned_to.isnot(None)).group_by(
+            Document.assigned_to).order_by(func.count().desc()).limit(1).scalar()
+        self.expert = db.get(User, expert_id)
+        self.expert_ids = [row[0] for row in db.query(User.id).filter(User.role == "expert")]
+        self.expert_documents = [row[0] for row in db.query(Document.id).filter(Document.assigned_to == expert_id)]
+        self.max_document_id = db.query(Document.id).order_by(Document.id.desc()).first()[0]
+        self.annotation_count = db.query(Annotation.id).count()
+        for user in (self.admin, self.expert):
+            db.expunge(user)
+        self.users = {"admin": self.admin, "expert": self.expert}
+        self.generator = TextGenerator(1)
+        self.imported = 0
+
+
+def _save_annotation(ctx: Context, rng: random.Random):
+    document_id = rng.choice(ctx.expert_documents)
+    comments = json.loads(ctx.generator.comments("原文" * 40))
+    return "POST", f"/api/annotations/{document_id}", {"json": {
+        "evaluation": rng.random() < 0.7, "comments": comments, "time_spent": 5, "is_completed": False
+    }}
+
+
+def _import_batch(ctx: Context, rng: random.Random, size: int = 200):
+    lines = []
+    for _ in range(size):
+        ctx.imported += 1
+        source, _ = ctx.generator.text(int(ctx.generator.lengths(1, 3000)[0]))
+        generated, _ = ctx.generator.text(int(len(source) * 1.4))
+        lines.append(json.dumps({"title": f"基准导入文档{ctx.imported}", "source_content": source,
+                                 "generated_content": generated}, ensure_ascii=False))
+    return "POST", "/api/documents/bulk", {"content": "\n".join(lines).encode("utf-8")}
+
+
+SCENARIOS = [
+    Scenario("list_admin", "admin", 20, lambda ctx, rng: ("GET", "/api/documents/?limit=2000", {})),
+    Scenario("list_admin_deep_page", "admin", 20,
+             lambda ctx, rng: ("GET", f"/api/documents/?skip={max(0, ctx.max_document_id - 2000)}&limit=2000", {})),
+    Scenario("list_filtered", "admin", 20, lambda ctx, rng: (
+        "GET", "/api/documents/?annotation_status=进行中&sort=updated_at&order=desc&limit=2000", {})),
+    Scenario("list_expert_assigned", "expert", 20, lambda ctx, rng: ("GET", "/api/documents/my/assigned", {})),
+    Scenario("list_expert_available", "expert", 20, lambda ctx, rng: ("GET", "/api/documents/available", {})),
+    Scenario("open_document", "admin", 200, lambda ctx, rng: (
+        "GET", f"/api/documents/{rng.randint(1, ctx.max_document_id)}", {})),
+    Scenario("open_document_cached", "expert", 200, lambda ctx, rng: (
+        "GET", f"/api/documents/{ctx.expert_documents[rng.randrange(min(20, len(ctx.expert_documents)))]}", {})),
+    Scenario("open_paragraphs", "admin", 200, lambda ctx, rng: (
+        "GET", f"/api/documents/{rng.randint(1, ctx.max_document_id)}/paragraphs?field=generated&start=0&count=50",
+        {})),
+    Scenario("autosave", "expert", 300, _save_annotation),
+    Scenario("claim", "expert", 100, lambda ctx, rng: ("POST", "/api/documents/next", {})),
+    Scenario("import", "admin", 5, _import_batch),
+    Scenario("stats_overview", "admin", 10, lambda ctx, rng: ("GET", "/api/stats/overview", {})),
+    Scenario("stats_my", "expert", 10, lambda ctx, rng: ("GET", "/api/stats/my-stats", {})),
+    Scenario("stats_all_users", "admin", 5, lambda ctx, rng: ("GET", "/api/stats/all-users", {})),
+    Scenario("stats_temporal", "admin", 5, lambda ctx, rng: ("GET", "/api/stats/temporal?days=30", {})),
+    Scenario("stats_user_activity", "admin", 5, lambda ctx, rng: ("GET", "/api/stats/user-activity", {})),
+    Scenario("stats_document_completion", "admin", 3, lambda ctx, rng: ("GET", "/api/stats/document-completion", {})),
+    Scenario("stats_approval_analysis", "admin", 5, lambda ctx, rng: ("GET", "/api/stats/approval-analysis", {})),
+    Scenario("stats_dashboard", "admin", 3, lambda ctx, rng: ("GET", "/api/stats/dashboard", {})),
+    Scenario("stats_agreement", "admin", 5, lambda ctx, rng: ("GET", "/api/stats/agreement", {})),
+]
+
+
+def summarize(latencies: List[float], queries: List[int], errors: int, elapsed: float,
+              cpu_times: List[float]) -> Dict[str, float]:
+    values = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0,
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+        "queries_per_request": round(sum(queries) / len(queries), 2),
+        # 进程CPU时间（含 TestClient 线程中的应用和客户端解析响应）
+        "cpu_p50_ms": round(float(np.percentile(np.array(cpu_times) * 1000, 50)), 3),
+    }
+
+
+def run_scenario(client, app, get_current_user, track_queries, ctx: Context, scenario: Scenario,
+                 scale: float, rng: random.Random) -> Dict[str, float]:
+    user = ctx.users[scenario.role]
+    app.dependency_overrides[get_current_user] = lambda: user
+    latencies, queries, cpu_times, errors = [], [], [], 0
+    started = time.perf_counter()
+    for _ in range(max(1, int(scenario.iterations * scale))):
+        method, path, kwargs = scenario.build(ctx, rng)
+        with track_queries() as stats:
+            start, cpu_start = time.perf_counter(), time.process_time()
+            response = client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            cpu_times.append(time.process_time() - cpu_start)
+        queries.append(stats.queries)
+        if response.status_code >= 400:
+            errors += 1
+        elif scenario.name == "claim":
+            # 释放租约，下一次领取仍有文档可领
+            client.delete(f"/api/documents/{response.json()['document_id']}/lease")
+    return summarize(latencies, queries, errors, time.perf_counter() - started, cpu_times)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["scenarios"]
+    print(f"\n与 {baseline_path} 对比（p50 / p95，比值 <1 表示变快）")
+    for name, current in results["scenarios"].items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        print(f"  {name:<28} p50 {before['p50_ms']:>9.2f} -> {current['p50_ms']:>9.2f} ms "
+              f"({current['p50_ms'] / max(before['p50_ms'], 1e-9):.2f}x)   "
+              f"p95 {before['p95_ms']:>9.2f} -> {current['p95_ms']:>9.2f} ms   "
+              + (f"CPU p50 {before['cpu_p50_ms']:>9.2f} -> {current['cpu_p50_ms']:>9.2f} ms   "
+                 if "cpu_p50_ms" in before else "") +
+              f"语句 {before['queries_per_request']:g} -> {current['queries_per_request']:g}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="基准测试套件")
+    parser.add_argument("--database", help="已生成的语料数据库，测试在其副本上进行；省略时临时生成")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small", help="临时生成语料的规模（默认small）")
+    parser.add_argument("--scenarios", help="只运行指定场景（逗号分隔，支持前缀，如 list,stats）")
+    parser.add_argument("--scale", type=float, default=1.0, help="各场景请求次数的倍数（默认1）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（默认0）")
+    parser.add_argument("--output", "-o", help="结果JSON文件")
+    parser.add_argument("--compare", help="与之前的结果JSON对比")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="benchmark_suite_")
+    database = os.path.join(tmp_dir, "benchmark.db")
+    # 须在导入 app 之前设置
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    try:
+        if args.database:
+            # 在线备份得到一致的副本（含WAL中的内容）
+            with sqlite3.connect(args.database) as source, sqlite3.connect(database) as target:
+                source.backup(target)
+            corpus = {"source": os.path.abspath(args.database)}
+        else:
+            print(f"生成语料 ({args.preset}): {PRESETS[args.preset]}")
+            corpus = generate_corpus(**PRESETS[args.preset], log=lambda message: None)
+
+        from fastapi.testclient import TestClient
+        from app import models
+        from app.database import SessionLocal
+        from app.querylog import track_queries
+        from app.services.auth import get_current_user
+        from main import app
+
+        # 语句数已记录在结果中，不逐条输出慢查询和N+1警告（导入场景每个请求都有）
+        logging.getLogger("app.sql").setLevel(logging.ERROR)
+
+        selected = SCENARIOS
+        if args.scenarios:
+            prefixes = [prefix.strip() for prefix in args.scenarios.split(",") if prefix.strip()]
+            selected = [scenario for scenario in SCENARIOS if any(scenario.name.startswith(p) for p in prefixes)]
+
+        db = SessionLocal()
+        try:
+            ctx = Context(db, models)
+        finally:
+            db.close()
+        corpus.update(documents=ctx.max_document_id, experts=len(ctx.expert_ids), annotations=ctx.annotation_count)
+        print(f"语料: {corpus}")
+
+        rng = random.Random(args.seed)
+        results = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "revision": _git_revision(),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "scale": args.scale,
+            },
+            "corpus": corpus,
+            "scenarios": {},
+        }
+        with TestClient(app) as client:
+            for scenario in selected:
+                result = run_scenario(client, app, get_current_user, track_queries, ctx, scenario, args.scale, rng)
+                results["scenarios"][scenario.name] = result
+                print(f"  {scenario.name:<28} {result['requests']:>4} 次  p50 {result['p50_ms']:>9.2f} ms  "
+                      f"p95 {result['p95_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms  "
+                      f"CPU p50 {result['cpu_p50_ms']:>9.2f} ms  "
+                      f"语句 {result['queries_per_request']:>6g}" + (f"  错误 {result['errors']}" if result['errors'] else ""))
+        app.dependency_overrides.clear()
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"\n结果已写入 {args.output}")
+        if args.compare:
+            compare(results, args.compare)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
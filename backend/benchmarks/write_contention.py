@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+多进程写入争用基准测试
+
+模拟多个工作进程（WORKERS > 1）同时保存标注：--processes 个进程各启动 --threads 个线程，每个线程以
+create_or_update_annotation 保存 --saves 次（与 POST /api/annotations/{id} 相同的事务），统计保存延迟和
+database is locked 错误数。在语料副本上比较以下配置（见 app/write_lock.py、app/database.py）：
+- delete / wal：回滚日志或WAL模式，只依靠SQLite自身的忙等待（WRITE_LOCK=0，busy_timeout 5秒）
+- delete+lock / wal+lock：写事务先在跨进程写锁上排队（默认配置为 wal+lock）
+
+用法:
+    python backend/benchmarks/write_contention.py --database ./corpus.db --processes 4 --threads 50 --saves 20
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+VARIANTS = {
+    "delete": {"SQLITE_JOURNAL_MODE": "DELETE", "WRITE_LOCK": "0"},
+    "delete+lock": {"SQLITE_JOURNAL_MODE": "DELETE", "WRITE_LOCK": "1"},
+    "wal": {"SQLITE_JOURNAL_MODE": "WAL", "WRITE_LOCK": "0"},
+    "wal+lock": {"SQLITE_JOURNAL_MODE": "WAL", "WRITE_LOCK": "1"},
+}
+
+
+def worker(database_url: str, env: dict, pairs: list, saves: int, start_at: float, seed: int):
+    """在子进程中运行：每个 (文档, 专家) 对一个线程，返回延迟列表（秒）和错误计数"""
+    os.environ.update(env, DATABASE_URL=database_url)
+    import logging
+    logging.getLogger("app.sql").setLevel(logging.ERROR)
+    from app.database import SessionLocal
+    from app.services.annotation import create_or_update_annotation
+
+    latencies, errors = [], {"locked": 0, "other": 0}
+    lock = threading.Lock()
+
+    def run(document_id: int, user_id: int, rng: random.Random):
+        while time.time() < start_at:
+            time.sleep(0.001)
+        for i in range(saves):
+            db = SessionLocal()
+            begin = time.perf_counter()
+            try:
+                create_or_update_annotation(db, document_id, user_id, evaluation=rng.random() < 0.7,
+                                            time_spent=rng.randint(1, 30), is_completed=i == saves - 1)
+                with lock:
+                    latencies.append(time.perf_counter() - begin)
+            except Exception as e:
+                with lock:
+                    errors["locked" if "database is locked" in str(e) else "other"] += 1
+            finally:
+                db.close()
+            time.sleep(rng.uniform(0, 0.02))
+
+    threads = [threading.Thread(target=run, args=(document_id, user_id, random.Random(seed + i)))
+               for i, (document_id, user_id) in enumerate(pairs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def run_variant(source: str, tmp_dir: str, name: str, args) -> dict:
+    database = os.path.join(tmp_dir, f"{name.replace('+', '_')}.db")
+    with sqlite3.connect(source) as src, sqlite3.connect(database) as target:
+        src.backup(target)
+    with sqlite3.connect(database) as conn:
+        document_ids = [row[0] for row in conn.execute("SELECT id FROM documents ORDER BY id")]
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE role = 'expert'")]
+    rng = random.Random(args.seed)
+    writers = args.processes * args.threads
+    pairs = list(zip(rng.sample(document_ids, writers), [user_ids[i % len(user_ids)] for i in range(writers)]))
+
+    context = multiprocessing.get_context("spawn")
+    # 各进程导入完成后同时开始
+    start_at = time.time() + 5
+    with context.Pool(args.processes) as pool:
+        jobs = [
+            pool.apply_async(worker, (f"sqlite:///{database}", VARIANTS[name],
+                                      pairs[p * args.threads:(p + 1) * args.threads], args.saves, start_at,
+                                      args.seed + p * args.threads))
+            for p in range(args.processes)
+        ]
+        results = [job.get() for job in jobs]
+    elapsed = time.time() - start_at
+
+    latencies = np.array([value for latency, _ in results for value in latency]) * 1000
+    errors = {kind: sum(error[kind] for _, error in results) for kind in ("locked", "other")}
+    summary = {"saves": len(latencies), "saves_per_second": round(len(latencies) / elapsed, 1), **errors}
+    if len(latencies):
+        summary.update({f"p{q}_ms": round(float(np.percentile(latencies, q)), 1) for q in (50, 95, 99)})
+        summary["max_ms"] = round(float(latencies.max()), 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程写入争用基准测试")
+    parser.add_argument("--database", help="语料数据库，测试在其副本上进行；省略时临时生成小规模语料")
+    parser.add_argument("--processes", "-p", type=int, default=4, help="进程数（默认4）")
+    parser.add_argument("--threads", "-t", type=int, default=50, help="每个进程的写入线程数（默认50）")
+    parser.add_argument("--saves", "-n", type=int, default=20, help="每个线程的保存次数（默认20）")
+    parser.add_argument("--variants", default=",".join(VARIANTS),
+                        help=f"测试的配置，逗号分隔（默认全部: {','.join(VARIANTS)}）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（默认0）")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="write_contention_")
+    try:
+        source = args.database
+        if not source:
+            from corpus import PRESETS, generate_corpus
+            source = os.path.join(tmp_dir, "corpus.db")
+            os.environ["DATABASE_URL"] = f"sqlite:///{source}"
+            print(f"生成语料 (small): {PRESETS['small']}")
+            generate_corpus(**PRESETS["small"], log=lambda message: None)
+
+        print(f"{args.processes} 个进程 x {args.threads} 个线程，每个线程保存 {args.saves} 次")
+        for name in [name.strip() for name in args.variants.split(",") if name.strip()]:
+            summary = run_variant(source, tmp_dir, name, args)
+            latency = "  ".join(f"{key[:-3]} {summary[key]:>8.1f}" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+                                if key in summary)
+            print(f"{name:<12} 成功 {summary['saves']:>6}  {summary['saves_per_second']:>7.1f} 次/秒  "
+                  f"locked {summary['locked']:>5}  其他错误 {summary['other']:>3}  {latency} ms")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+文档正文压缩迁移脚本
+将已有文档的 source_content / generated_content 按当前压缩配置重新编码，
+可选先从语料中训练共享字典，并输出存储空间与 read_document 读取延迟的前后对比。
+设置 CONTENT_STORAGE=blob 时，大正文迁移到文件存储。
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+from statistics import median
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, engine, Base
+from app.models import Document, CompressionDictionary
+from app.migrations import upgrade
+from app.compression import (
+    CONTENT_CODEC, BLOB_REF_SIZE, compress_text, decompress_text, train_dictionary, reset_dictionary_cache
+)
+from app.services.document import get_document
+from app import blob_store
+
+
+def measure_storage(db: Session) -> dict:
+    """统计正文占用的字节数和数据库文件大小"""
+    content_bytes = db.execute(text(
+        "SELECT COALESCE(SUM(LENGTH(CAST(source_content AS BLOB)) + "
+        "LENGTH(CAST(generated_content AS BLOB))), 0) FROM documents"
+    )).scalar()
+    page_count = db.execute(text("PRAGMA page_count")).scalar()
+    page_size = db.execute(text("PRAGMA page_size")).scalar()
+    freelist = db.execute(text("PRAGMA freelist_count")).scalar()
+    return {
+        "content_bytes": content_bytes,
+        "database_bytes": page_count * page_size,
+        "used_bytes": (page_count - freelist) * page_size,
+    }
+
+
+def measure_read_latency(document_ids: list, rounds: int = 3) -> float:
+    """测量按 read_document 方式加载文档正文的延迟中位数（毫秒）"""
+    timings = []
+    for _ in range(rounds):
+        for document_id in document_ids:
+            db = SessionLocal()
+            try:
+                start = time.perf_counter()
+                document = get_document(db, document_id, with_content=True)
+                len(document.source_content) + len(document.generated_content)
+                timings.append((time.perf_counter() - start) * 1000)
+            finally:
+                db.close()
+    return median(timings) if timings else 0.0
+
+
+def train_content_dictionary(db: Session, sample_size: int) -> CompressionDictionary:
+    """从随机抽样的文档中训练压缩字典并保存"""
+    ids = [row.id for row in db.query(Document.id).all()]
+    sample_ids = random.sample(ids, min(sample_size, len(ids)))
+
+    samples = []
+    for document in db.query(Document).filter(Document.id.in_(sample_ids)).all():
+        samples.append(document.source_content)
+        samples.append(document.generated_content)
+
+    data = train_dictionary(samples)
+    dictionary = CompressionDictionary(codec=CONTENT_CODEC, data=data, sample_count=len(sample_ids))
+    db.add(dictionary)
+    db.commit()
+    db.refresh(dictionary)
+    reset_dictionary_cache()
+    return dictionary
+
+
+def recompress_documents(db: Session, batch_size: int) -> int:
+    """逐批将正文重新编码为当前压缩格式，每批一个短事务，不阻塞在线写入"""
+    updated = 0
+    last_id = 0
+    while True:
+        # 读取原始列值，绕过ORM的自动解压
+        rows = db.execute(text(
+            "SELECT id, source_content, generated_content FROM documents "
+            "WHERE id > :last_id ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": batch_size}).all()
+        if not rows:
+            break
+
+        changes = []
+        for row in rows:
+            source = compress_text(decompress_text(row.source_content))
+            generated = compress_text(decompress_text(row.generated_content))
+            if source != row.source_content or generated != row.generated_content:
+                changes.append({"id": row.id, "source": source, "generated": generated})
+
+        if changes:
+            db.execute(text(
+                "UPDATE documents SET source_content = :source, generated_content = :generated "
+                "WHERE id = :id"
+            ), changes)
+        db.commit()
+
+        updated += len(changes)
+        last_id = rows[-1].id
+        print(f"  已处理至文档 [{last_id}]，累计更新 {updated} 个")
+
+    return updated
+
+
+def referenced_blob_digests(db: Session) -> set:
+    """收集数据库中引用的全部正文文件摘要"""
+    digests = set()
+    for column in ("source_content", "generated_content"):
+        rows = db.execute(text(
+            f"SELECT {column} FROM documents WHERE LENGTH(CAST({column} AS BLOB)) = :size"
+        ), {"size": BLOB_REF_SIZE})
+        for (value,) in rows:
+            digest = blob_store.parse_digest(value)
+            if digest:
+                digests.add(digest)
+    return digests
+
+
+def format_size(size: int) -> str:
+    return f"{size / 1024 / 1024:.2f} MB"
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='压缩存储已有文档的正文')
+    parser.add_argument('--train-dict', '-t', action='store_true',
+                       help='先从语料中训练共享压缩字典')
+    parser.add_argument('--sample-size', type=int, default=1000,
+                       help='训练字典时抽样的文档数（默认1000）')
+    parser.add_argument('--batch-size', '-b', type=int, default=200,
+                       help='每个事务重新编码的文档数（默认200）')
+    parser.add_argument('--latency-samples', type=int, default=100,
+                       help='测量读取延迟时抽样的文档数（默认100）')
+    parser.add_argument('--vacuum', action='store_true',
+                       help='迁移完成后执行VACUUM回收空间')
+    parser.add_argument('--report-only', '-r', action='store_true',
+                       help='只输出当前存储与延迟情况，不做迁移')
+    parser.add_argument('--gc-blobs', action='store_true',
+                       help='只清理文件存储中不再被引用的正文文件')
+
+    args = parser.parse_args()
+
+    # 创建数据库表并执行未完成的迁移
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine, log=print)
+
+    db = SessionLocal()
+
+    try:
+        if args.gc_blobs:
+            removed = blob_store.collect_garbage(referenced_blob_digests(db))
+            print(f"已清理未引用的正文文件: {removed} 个")
+            return
+
+        ids = [row.id for row in db.query(Document.id).all()]
+        latency_ids = random.sample(ids, min(args.latency_samples, len(ids)))
+
+        before = measure_storage(db)
+        before_latency = measure_read_latency(latency_ids)
+        print(f"压缩算法: {CONTENT_CODEC}，文档数: {len(ids)}")
+        print(f"正文大小: {format_size(before['content_bytes'])}，"
+              f"数据库文件: {format_size(before['database_bytes'])}，"
+              f"读取延迟中位数: {before_latency:.3f} ms")
+
+        if args.report_only:
+            return
+
+        if args.train_dict:
+            dictionary = train_content_dictionary(db, args.sample_size)
+            print(f"已训练压缩字典 [{dictionary.id}]，大小 {len(dictionary.data)} 字节，"
+                  f"样本文档 {dictionary.sample_count} 个")
+
+        print("\n开始重新编码文档正文...")
+        updated = recompress_documents(db, args.batch_size)
+
+        if args.vacuum:
+            print("执行VACUUM...")
+            db.close()
+            with engine.connect() as conn:
+                conn.execute(text("VACUUM"))
+            db = SessionLocal()
+
+        after = measure_storage(db)
+        after_latency = measure_read_latency(latency_ids)
+
+        ratio = after['content_bytes'] / before['content_bytes'] if before['content_bytes'] else 1
+        print(f"\n迁移完成! 更新文档: {updated}")
+        print(f"正文大小: {format_size(before['content_bytes'])} -> {format_size(after['content_bytes'])} "
+              f"（{ratio:.1%}）")
+        print(f"数据库已用空间: {format_size(before['used_bytes'])} -> {format_size(after['used_bytes'])}")
+        print(f"读取延迟中位数: {before_latency:.3f} ms -> {after_latency:.3f} ms")
+
+    except KeyboardInterrupt:
+        print("\n\n用户中断操作")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
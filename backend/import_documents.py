@@ -1,14 +1,15 @@
 #!/usr/bin/env python3
 """
 快速导入文档到数据库的脚本
-从JSON文件中读取文档数据并导入到SQLite数据库
+从JSON文件、目录或 .tar(.gz)/.zip 归档中读取文档数据并导入到SQLite数据库
 """
 
 import json
 import sys
 import os
-from pathlib import Path
-from typing import List, Dict, Any
+import tarfile
+import zipfile
+from typing import Dict, Any, Iterable
 import argparse
 from datetime import datetime
 
@@ -17,41 +18,19 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine, Base
-from app.models import Document, User
-
-
-def count_words(text: str) -> int:
-    """统计中文字符数（简单统计）"""
-    if not text:
-        return 0
-    # 对于中文，按字符数统计；对于英文，按单词数统计
-    chinese_chars = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
-    english_words = len([w for w in text.replace('\n', ' ').split(' ') if w.strip()])
-    return chinese_chars + english_words
+from app.models import Document
+from app.migrations import upgrade
+from app.services.dedup import rebuild_duplicate_index
+from app.services.document_sources import iter_documents, DocumentSourceError
+from app.services.ingest import (
+    ingest_batch, DEFAULT_BATCH_SIZE,
+    validate_document_data as validate_document_fields
+)
 
 
 def validate_document_data(doc_data: Dict[str, Any], index: int) -> bool:
     """验证单个文档数据的完整性和格式"""
-    errors = []
-
-    # 检查必需字段
-    required_fields = ['title', 'source_content', 'generated_content']
-    for field in required_fields:
-        if not doc_data.get(field):
-            errors.append(f"缺少必需字段: {field}")
-        elif not isinstance(doc_data[field], str):
-            errors.append(f"字段 {field} 必须是字符串类型")
-
-    # 检查字段长度限制
-    title = doc_data.get('title', '')
-    if isinstance(title, str) and len(title) > 500:
-        errors.append(f"标题长度超过500个字符限制")
-
-    # 检查status值
-    status = doc_data.get('status', 'pending')
-    valid_statuses = ['pending', 'in_progress', 'completed']
-    if status not in valid_statuses:
-        errors.append(f"无效的status值: {status}，有效值为: {', '.join(valid_statuses)}")
+    errors = validate_document_fields(doc_data)
 
     if errors:
         print(f"警告: 第{index+1}个文档验证失败:")
@@ -62,113 +41,93 @@ def validate_document_data(doc_data: Dict[str, Any], index: int) -> bool:
     return True
 
 
-def create_document(db: Session, doc_data: Dict[str, Any]) -> Document:
-    """创建单个文档记录"""
-    # 统计字数
-    source_word_count = count_words(doc_data.get('source_content', ''))
-    generated_word_count = count_words(doc_data.get('generated_content', ''))
-
-    # 处理assigned_to字段
-    assigned_to = doc_data.get('assigned_to')
-    if assigned_to is not None:
-        # 验证用户是否存在且是专家角色
-        target_user = db.query(User).filter(User.id == assigned_to).first()
-        if not target_user:
-            print(f"警告: 用户ID {assigned_to} 不存在，文档将不被分配")
-            assigned_to = None
-        elif target_user.role != 'expert':
-            print(f"警告: 用户 {target_user.username} 不是专家角色，文档将不被分配")
-            assigned_to = None
-
-    # 创建文档对象
-    db_document = Document(
-        title=doc_data.get('title', ''),
-        source_content=doc_data.get('source_content', ''),
-        generated_content=doc_data.get('generated_content', ''),
-        status=doc_data.get('status', 'pending'),
-        assigned_to=assigned_to,
-        word_count_source=source_word_count,
-        word_count_generated=generated_word_count
-    )
-
-    return db_document
+def print_ingest_result(result: Dict[str, Any]) -> None:
+    """输出单个文档的导入结果"""
+    index = result["key"]
+    if result["status"] == "created":
+        if result.get("replaced"):
+            print(f"覆盖已存在的文档: {result['title']}")
+        for warning in result.get("warnings", []):
+            print(f"警告: {warning}")
+        print(f"导入文档: {result['title']}")
+        if result.get("duplicate_of"):
+            print(f"  疑似重复: 与文档 [{result['duplicate_of']}] 相似度 {result['similarity']:.2f}")
+    elif result["status"] == "skipped":
+        print(f"跳过已存在的文档: {result['title']}")
+    elif result["status"] == "invalid":
+        print(f"警告: 第{index+1}个文档验证失败:")
+        for error in result["errors"]:
+            print(f"  - {error}")
+    else:
+        print(f"错误: 导入第{index+1}个文档时出现问题 - {'; '.join(result['errors'])}")
 
 
-def import_documents_from_json(json_file_path: str, db: Session,
-                             overwrite: bool = False) -> int:
+def import_documents(documents_data: Iterable[Dict[str, Any]], db: Session,
+                     overwrite: bool = False, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
     """
-    从JSON文件导入文档
+    将数据源产出的文档分批验证并写入数据库，每批一个事务
 
     Args:
-        json_file_path: JSON文件路径
+        documents_data: 文档字典的可迭代对象（可以是流式生成器）
         db: 数据库会话
         overwrite: 是否覆盖已存在的文档（根据标题判断）
+        batch_size: 每个事务写入的文档数
 
     Returns:
         int: 导入的文档数量
     """
-    try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print(f"错误: 找不到文件 {json_file_path}")
-        return 0
-    except json.JSONDecodeError as e:
-        print(f"错误: JSON文件格式不正确 - {e}")
-        return 0
-    except Exception as e:
-        print(f"错误: 读取文件时出现问题 - {e}")
-        return 0
-
-    # 支持两种JSON格式：单个文档或文档列表
-    if isinstance(data, dict):
-        documents_data = [data]
-    elif isinstance(data, list):
-        documents_data = data
-    else:
-        print("错误: JSON文件根元素必须是对象或数组")
-        return 0
-
     imported_count = 0
     skipped_count = 0
 
-    for i, doc_data in enumerate(documents_data):
-        try:
-            # 使用新的验证函数验证文档数据
-            if not validate_document_data(doc_data, i):
+    def flush(batch):
+        nonlocal imported_count, skipped_count
+        for result in ingest_batch(db, batch, overwrite):
+            print_ingest_result(result)
+            if result["status"] == "created":
+                imported_count += 1
+            else:
                 skipped_count += 1
-                continue
 
-            # 检查是否已存在相同标题的文档
-            existing_doc = db.query(Document).filter(Document.title == doc_data['title']).first()
-            if existing_doc:
-                if overwrite:
-                    print(f"覆盖已存在的文档: {doc_data['title']}")
-                    db.delete(existing_doc)
-                    db.commit()
-                else:
-                    print(f"跳过已存在的文档: {doc_data['title']}")
-                    skipped_count += 1
-                    continue
-
-            # 创建新文档
-            db_document = create_document(db, doc_data)
-            db.add(db_document)
-            db.commit()
-            db.refresh(db_document)
-
-            print(f"导入文档: {doc_data['title']}")
-            imported_count += 1
-
-        except Exception as e:
-            print(f"错误: 导入第{i+1}个文档时出现问题 - {e}")
-            db.rollback()
-            skipped_count += 1
+    batch = []
+    try:
+        for i, doc_data in enumerate(documents_data):
+            batch.append((i, doc_data))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+    except (DocumentSourceError, json.JSONDecodeError, tarfile.TarError, zipfile.BadZipFile, OSError) as e:
+        print(f"错误: 读取数据源时出现问题 - {e}")
+    if batch:
+        flush(batch)
 
     print(f"\n导入完成! 成功: {imported_count}, 跳过: {skipped_count}")
     return imported_count
 
 
+def import_documents_from_json(json_file_path: str, db: Session,
+                             overwrite: bool = False) -> int:
+    """从JSON文件导入文档（兼容旧接口）"""
+    return import_documents_from_source(json_file_path, db, overwrite)
+
+
+def import_documents_from_source(source_path: str, db: Session,
+                                 overwrite: bool = False,
+                                 batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    从数据源导入文档：JSON文件、目录、.tar(.gz)或.zip归档
+
+    目录和归档中每个子目录包含一对 source.txt / generated.txt（可选 meta.json），
+    子目录名作为文档标题；归档内容直接流式读取，不解压到磁盘。
+    """
+    try:
+        documents_data = iter_documents(source_path)
+    except DocumentSourceError as e:
+        print(f"错误: {e}")
+        return 0
+
+    return import_documents(documents_data, db, overwrite, batch_size)
+
+
 def list_existing_documents(db: Session) -> None:
     """列出数据库中已存在的文档"""
     documents = db.query(Document).all()
@@ -181,17 +140,29 @@ def list_existing_documents(db: Session) -> None:
         print(f"  [{doc.id}] {doc.title} ({doc.status})")
 
 
-def validate_json_file(json_file_path: str) -> bool:
-    """验证JSON文件格式"""
-    try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+def rebuild_dedup_index(db: Session) -> None:
+    """重建近似重复索引并输出重复组概况"""
+    start = datetime.now()
+    processed = rebuild_duplicate_index(db)
+    elapsed = (datetime.now() - start).total_seconds()
+
+    from app.models import DocumentFingerprint
+    duplicate_count = db.query(DocumentFingerprint).filter(
+        DocumentFingerprint.duplicate_of.isnot(None)
+    ).count()
+    group_count = db.query(DocumentFingerprint.duplicate_of).filter(
+        DocumentFingerprint.duplicate_of.isnot(None)
+    ).distinct().count()
+
+    print(f"已为 {processed} 个文档重建近似重复索引，用时 {elapsed:.1f} 秒")
+    print(f"发现 {group_count} 个重复组，共 {duplicate_count} 个疑似重复文档")
 
-        documents_data = data if isinstance(data, list) else [data]
 
-        # 使用新的验证函数验证每个文档
+def validate_source(source_path: str) -> bool:
+    """验证数据源中所有文档的格式"""
+    try:
         all_valid = True
-        for i, doc_data in enumerate(documents_data):
+        for i, doc_data in enumerate(iter_documents(source_path)):
             if not isinstance(doc_data, dict):
                 print(f"错误: 第{i+1}个文档不是有效的JSON对象")
                 all_valid = False
@@ -201,36 +172,50 @@ def validate_json_file(json_file_path: str) -> bool:
                 all_valid = False
 
         if all_valid:
-            print("JSON文件格式验证通过")
+            print("数据源格式验证通过")
             return True
         else:
-            print("JSON文件验证未通过，请修复上述问题后重试")
+            print("数据源验证未通过，请修复上述问题后重试")
             return False
 
-    except FileNotFoundError:
-        print(f"错误: 找不到文件 {json_file_path}")
+    except DocumentSourceError as e:
+        print(f"错误: {e}")
         return False
     except json.JSONDecodeError as e:
-        print(f"错误: JSON文件格式不正确 - {e}")
+        print(f"错误: JSON格式不正确 - {e}")
+        return False
+    except (tarfile.TarError, zipfile.BadZipFile, OSError) as e:
+        print(f"错误: 读取数据源时出现问题 - {e}")
         return False
 
 
+def validate_json_file(json_file_path: str) -> bool:
+    """验证JSON文件格式（兼容旧接口）"""
+    return validate_source(json_file_path)
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description='导入文档到数据库')
-    parser.add_argument('json_file', nargs='?', help='JSON文件路径（使用--create-sample时可选）')
+    parser.add_argument('source', nargs='?',
+                       help='数据源路径：JSON文件、目录、.tar(.gz)或.zip归档（使用--create-sample时可选）')
     parser.add_argument('--list', '-l', action='store_true', help='列出数据库中现有的文档')
     parser.add_argument('--overwrite', '-o', action='store_true',
                        help='覆盖已存在的文档（根据标题判断）')
     parser.add_argument('--validate', '-v', action='store_true',
-                       help='仅验证JSON文件格式，不导入')
+                       help='仅验证数据源格式，不导入')
     parser.add_argument('--create-sample', '-s', action='store_true',
                        help='创建示例JSON文件')
+    parser.add_argument('--batch-size', '-b', type=int, default=DEFAULT_BATCH_SIZE,
+                       help=f'每个事务写入的文档数（默认{DEFAULT_BATCH_SIZE}）')
+    parser.add_argument('--rebuild-dedup', action='store_true',
+                       help='为数据库中现有文档重建近似重复索引')
 
     args = parser.parse_args()
 
-    # 创建数据库表
+    # 创建数据库表并执行未完成的迁移
     Base.metadata.create_all(bind=engine)
+    upgrade(engine, log=print)
 
     db = SessionLocal()
 
@@ -243,23 +228,27 @@ def main():
             list_existing_documents(db)
             return
 
+        if args.rebuild_dedup:
+            rebuild_dedup_index(db)
+            return
+
         if args.validate:
-            is_valid = validate_json_file(args.json_file)
+            is_valid = validate_source(args.source)
             sys.exit(0 if is_valid else 1)
 
-        # 检查JSON文件是否存在
-        if not os.path.exists(args.json_file):
-            print(f"错误: 找不到文件 {args.json_file}")
+        # 检查数据源是否存在
+        if not args.source or not os.path.exists(args.source):
+            print(f"错误: 找不到数据源 {args.source}")
             print("提示: 使用 --create-sample 创建示例文件")
             sys.exit(1)
 
         # 导入文档
-        print(f"开始从 {args.json_file} 导入文档...")
+        print(f"开始从 {args.source} 导入文档...")
         if args.overwrite:
             print("覆盖模式已启用")
 
-        imported_count = import_documents_from_json(
-            args.json_file, db, args.overwrite
+        imported_count = import_documents_from_source(
+            args.source, db, args.overwrite, args.batch_size
         )
 
         if imported_count > 0:
@@ -4,8 +4,10 @@
 """
 
 from app.database import Base, SessionLocal, engine
-from app.models import User, Document
+from app.models import User
 from app.services.auth import get_password_hash
+from app.migrations import upgrade
+from app.services.ingest import ingest_batch
 
 def create_test_data():
     """创建测试数据"""
@@ -142,21 +144,15 @@ def create_test_data():
             }
         ]
 
-        for doc_data in documents_data:
-            # 检查文档是否已存在
-            existing_doc = db.query(Document).filter(Document.title == doc_data["title"]).first()
-            if not existing_doc:
-                document = Document(
-                    title=doc_data["title"],
-                    source_content=doc_data["source_content"],
-                    generated_content=doc_data["generated_content"],
-                    word_count_source=len(doc_data["source_content"]),
-                    word_count_generated=len(doc_data["generated_content"])
-                )
-                db.add(document)
-                print(f"创建文档: {doc_data['title']}")
+        # 先提交用户；文档经导入流程写入，同时建立查重指纹、段落索引和全文检索条目
+        db.commit()
+        for result in ingest_batch(db, list(enumerate(documents_data))):
+            if result["status"] == "created":
+                print(f"创建文档: {result['title']}")
+            elif result["status"] == "skipped":
+                print(f"文档已存在: {result['title']}")
             else:
-                print(f"文档已存在: {doc_data['title']}")
+                print(f"创建文档失败: {result['title']} {result.get('errors')}")
 
         db.commit()
         print("\n测试数据创建完成！")
@@ -174,6 +170,7 @@ def create_test_data():
 if __name__ == "__main__":
     print("正在创建数据库表...")
     Base.metadata.create_all(bind=engine)
+    upgrade(engine, log=print)
     print("数据库表创建完成！")
 
     print("\n正在创建测试数据...")
@@ -1,15 +1,32 @@
+import time
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from fastapi.staticfiles import StaticFiles
 import os
 
-from app.database import Base, engine
+from app.database import engine
 from app.api import auth, documents, annotations, stats, users
+from app import metrics, startup
+from app.events import broker
+from app.services.document import document_cache
+from app.services.write_queue import annotation_write_queue
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 建表、迁移与预热在开始服务前执行，不在导入时访问数据库
+    warmup = startup.initialize()
+    yield
+    startup.shutdown(warmup)
+    # 写入队列中尚未提交的标注保存
+    annotation_write_queue.stop()
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="地方志标注平台", version="1.0.0")
+app = FastAPI(title="地方志标注平台", version="1.0.0", lifespan=lifespan)
 
 # 配置CORS
 app.add_middleware(
@@ -20,6 +37,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求与数据库指标，GET /metrics 以Prometheus文本格式输出
+metrics.instrument_engine(engine)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.registry.register(metrics.CallbackGauge(
+    "sse_subscribers", "Connected progress stream clients", lambda: broker.subscriber_count))
+metrics.registry.register(metrics.CallbackGauge(
+    "document_cache_bytes", "Estimated size of cached document payloads", lambda: document_cache.current_bytes))
+
 # 挂载静态文件 - 新的前端结构
 # 前端现在是React SPA，主要开发使用
 # 保留旧的前端页面路由用于测试和对比
@@ -37,6 +62,23 @@ app.include_router(users.router, prefix="/api/users", tags=["用户"])
 async def root():
     return {"message": "地方志标注平台 API"}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+startup.report.record("import", time.perf_counter() - _import_started)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    workers = int(os.environ.get("WORKERS", "1"))
+    port = os.environ.get("PORT", "8001")
+    if workers > 1:
+        # 多进程：先完成建表和迁移，工作进程跳过结构检查；各进程的写入经 app/write_lock.py 排队。
+        # 以 uvicorn 命令行替换当前进程：spawn 的工作进程会重新执行主模块，直接在这里启动会把本文件导入两次
+        import sys
+        startup.check_schema()
+        os.environ["SKIP_SCHEMA_CHECK"] = "1"
+        os.execv(sys.executable, [sys.executable, "-m", "uvicorn", "main:app",
+                                  "--host", "0.0.0.0", "--port", port, "--workers", str(workers)])
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=int(port))
\ No newline at end of file
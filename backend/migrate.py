@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+数据库迁移脚本
+执行尚未执行的结构迁移，查看迁移状态及每个迁移前后热点查询的执行计划
+"""
+
+import sys
+import os
+import json
+import argparse
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, Base
+import app.models  # noqa: F401  注册全部模型
+from app.migrations import load_migrations, applied_versions, upgrade
+
+
+def print_status():
+    """输出每个迁移的执行状态"""
+    applied = applied_versions(engine)
+    for migration in load_migrations():
+        record = applied.get(migration.REVISION)
+        if record:
+            state = f"已执行 {record['applied_at']}，耗时 {record['duration_ms']:.1f} ms"
+        else:
+            state = "未执行"
+        print(f"{migration.REVISION:04d}  {migration.DESCRIPTION:<20} {state}")
+
+
+def print_plans(version: int):
+    """输出迁移前后的查询计划对比"""
+    record = applied_versions(engine).get(version)
+    if not record:
+        print(f"迁移 {version:04d} 尚未执行")
+        return
+
+    before = json.loads(record["plans_before"] or "{}")
+    after = json.loads(record["plans_after"] or "{}")
+    print(f"迁移 {version:04d}: {record['description']}")
+    for query, plan in before.items():
+        print(f"\n{query}")
+        print("  迁移前:")
+        for step in plan:
+            print(f"    {step}")
+        print("  迁移后:")
+        for step in after.get(query, []):
+            print(f"    {step}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='执行数据库结构迁移')
+    parser.add_argument('--target', '-t', type=int,
+                       help='只迁移到指定版本（默认迁移到最新）')
+    parser.add_argument('--status', '-s', action='store_true',
+                       help='只显示迁移状态，不执行')
+    parser.add_argument('--plans', '-p', type=int, metavar='VERSION',
+                       help='显示指定迁移前后热点查询的执行计划')
+
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+        return
+    if args.plans:
+        print_plans(args.plans)
+        return
+
+    # 创建缺少的表，再执行迁移
+    Base.metadata.create_all(bind=engine)
+    executed = upgrade(engine, target=args.target, log=print)
+    if executed:
+        print(f"\n迁移完成! 执行了 {len(executed)} 个迁移")
+    else:
+        print("数据库已是最新版本")
+    print_status()
+
+
+if __name__ == "__main__":
+    main()
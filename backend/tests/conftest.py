@@ -0,0 +1,110 @@
+"""
+测试公共配置
+
+应用在导入时读取配置（数据库地址、文件存储目录等），因此先指向临时目录，再导入 app。
+每个测试使用新建的数据库（create_all 与全部迁移），并清空进程内缓存。
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TMP_DIR = tempfile.mkdtemp(prefix="backend_tests_")
+DATABASE_FILE = os.path.join(_TMP_DIR, "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_FILE}"
+os.environ["BLOB_STORE_DIR"] = os.path.join(_TMP_DIR, "blobs")
+os.environ["WARMUP"] = ""
+sys.path.insert(0, BACKEND_DIR)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.compression import reset_dictionary_cache  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.models import User  # noqa: E402
+from app.services.agreement import agreement_matrix  # noqa: E402
+from app.services.auth import create_access_token  # noqa: E402
+from app.services.document import document_cache  # noqa: E402
+from app.services.ingest import ingest_batch  # noqa: E402
+from app.startup import check_schema  # noqa: E402
+from main import app  # noqa: E402
+
+
+def pytest_sessionfinish(session, exitstatus):
+    engine.dispose()
+    shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def database():
+    """每个测试一个新数据库"""
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DATABASE_FILE + suffix):
+            os.remove(DATABASE_FILE + suffix)
+    check_schema(log=lambda message: None)
+    document_cache.clear()
+    agreement_matrix.invalidate()
+    reset_dictionary_cache()
+    yield
+    engine.dispose()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def users(db):
+    """管理员 admin 与专家 expert1、expert2（请求通过 headers 直接签发令牌，不校验密码）"""
+    created = {}
+    for username, role in (("admin", "admin"), ("expert1", "expert"), ("expert2", "expert")):
+        user = User(username=username, full_name=username, email=f"{username}@example.com",
+                    role=role, hashed_password="-")
+        db.add(user)
+        created[username] = user
+    db.commit()
+    for user in created.values():
+        db.refresh(user)
+        db.expunge(user)
+    return created
+
+
+@pytest.fixture
+def headers(users):
+    """用户名 -> 请求头"""
+    return {
+        username: {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+        for username in users
+    }
+
+
+@pytest.fixture
+def make_document(db):
+    """经导入流程创建文档（同时写入查重、段落和检索索引），返回文档ID"""
+    counter = iter(range(1, 1 << 30))
+
+    def make(title: str = None, source_content: str = "原始素材", generated_content: str = "生成内容",
+             **fields) -> int:
+        number = next(counter)
+        doc_data = {"title": title or f"文档{number}", "source_content": source_content,
+                    "generated_content": generated_content, **fields}
+        result = ingest_batch(db, [(number, doc_data)])[0]
+        assert result["status"] == "created", result
+        return result["document_id"]
+
+    return make
@@ -0,0 +1,120 @@
+"""
+标注一致性（services/agreement.py）：与手算结果比较
+"""
+
+import numpy as np
+import pytest
+
+from app.models import Annotation
+from app.services.agreement import (
+    ANNOTATOR_BITS, agreement_matrix, cohen_kappas, compute_agreement, fleiss_kappa, pairwise_tables
+)
+
+
+def _matrix(ratings):
+    """{(文档ID, 专家ID): 评价} -> 按key排序的稀疏矩阵"""
+    keys = np.array([(document_id << ANNOTATOR_BITS) | annotator_id for document_id, annotator_id in ratings],
+                    dtype=np.int64)
+    values = np.array(list(ratings.values()), dtype=np.int64)
+    order = np.argsort(keys)
+    return keys[order], values[order]
+
+
+def _two_raters(counts):
+    """按2x2列联表 {(a评价, b评价): 文档数} 生成专家1、2的评价"""
+    ratings = {}
+    document_id = 0
+    for (a, b), count in counts.items():
+        for _ in range(count):
+            document_id += 1
+            ratings[(document_id, 1)] = a
+            ratings[(document_id, 2)] = b
+    return ratings
+
+
+# 两人都好评20、仅A好评5、仅B好评10、都差评15：
+# Po = 35/50 = 0.7，Pe = 0.5*0.6 + 0.5*0.4 = 0.5，kappa = 0.4
+COHEN_COUNTS = {(1, 1): 20, (1, 0): 5, (0, 1): 10, (0, 0): 15}
+
+
+def test_cohen_kappa_known_value():
+    tables = np.array([[15, 10, 5, 20]])
+    overlap, observed, kappa = cohen_kappas(tables)
+    assert overlap.tolist() == [50]
+    assert observed[0] == pytest.approx(0.7)
+    assert kappa[0] == pytest.approx(0.4)
+
+    # 完全一致为1，所有评价相同时无定义
+    assert cohen_kappas(np.array([[10, 0, 0, 10]]))[2][0] == pytest.approx(1.0)
+    assert np.isnan(cohen_kappas(np.array([[0, 0, 0, 10]]))[2][0])
+
+
+def test_pairwise_tables_from_ratings():
+    keys, values = _matrix(_two_raters(COHEN_COUNTS))
+    document_index = np.unique(keys >> ANNOTATOR_BITS, return_inverse=True)[1]
+    annotator_index = np.unique(keys & ((1 << ANNOTATOR_BITS) - 1), return_inverse=True)[1]
+    pairs, tables = pairwise_tables(document_index, annotator_index, values, 2)
+    assert pairs.tolist() == [[0, 1]]
+    assert tables.tolist() == [[15, 10, 5, 20]]
+
+
+def test_fleiss_kappa_known_value():
+    # 4篇文档各3人评价，好评数 3、2、1、0：
+    # 各文档一致对比例 1、1/3、1/3、1，Po = 2/3；好评比例 0.5，Pe = 0.5；kappa = 1/3
+    # 第5篇只有1人评价，不计入
+    document_index = np.array([0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 4])
+    values = np.array([1, 1, 1, 1, 1, 0, 1, 0, 0, 0, 0, 0, 1])
+    result = fleiss_kappa(document_index, values)
+    assert result["documents"] == 4
+    assert result["observed_agreement"] == pytest.approx(0.6667)
+    assert result["expected_agreement"] == pytest.approx(0.5)
+    assert result["kappa"] == pytest.approx(0.3333)
+
+
+def test_fleiss_kappa_with_varying_raters():
+    # 文档A：2人都好评（一致对比例1）；文档B：4人中3好评1差评（(6+0)/12 = 0.5）
+    # Po = 0.75，好评比例 5/6，Pe = 25/36 + 1/36 = 26/36，kappa = (0.75 - 26/36) / (10/36) = 0.1
+    document_index = np.array([0, 0, 1, 1, 1, 1])
+    values = np.array([1, 1, 1, 1, 1, 0])
+    result = fleiss_kappa(document_index, values)
+    assert result["kappa"] == pytest.approx(0.1)
+    assert fleiss_kappa(np.array([0]), np.array([1]))["kappa"] is None
+
+
+def test_compute_agreement_reports_pairs_and_majority():
+    ratings = _two_raters(COHEN_COUNTS)
+    # 专家3只与专家1在3篇文档上共同评价，低于 min_overlap 不报告
+    for document_id in (1, 2, 3):
+        ratings[(document_id, 3)] = 0
+    keys, values = _matrix(ratings)
+    result = compute_agreement(keys, values, min_overlap=10)
+
+    assert result["annotator_ids"].tolist() == [1, 2, 3]
+    assert result["pairs"].tolist() == [[1, 2]]
+    assert result["pair_kappa"][0] == pytest.approx(0.4)
+    assert result["pair_overlap"].tolist() == [50]
+    # 文档1-3上专家1、2都好评，专家3的两位同伴一致好评，专家3偏离3次
+    assert result["compared"][2] == 3 and result["deviated"][2] == 3
+
+
+def test_agreement_endpoint(client, headers, users, make_document, db):
+    expert1, expert2 = users["expert1"].id, users["expert2"].id
+    for (a, b), count in COHEN_COUNTS.items():
+        for _ in range(count):
+            document_id = make_document()
+            db.add_all([
+                Annotation(document_id=document_id, annotator_id=expert1, evaluation=bool(a), is_completed=True),
+                Annotation(document_id=document_id, annotator_id=expert2, evaluation=bool(b), is_completed=True),
+            ])
+    # 未完成的标注不计入
+    db.add(Annotation(document_id=make_document(), annotator_id=expert1, evaluation=True, is_completed=False))
+    db.commit()
+    agreement_matrix.invalidate()
+
+    response = client.get("/api/stats/agreement", headers=headers["admin"])
+    assert response.status_code == 200
+    result = response.json()
+    assert result["annotation_count"] == 100
+    assert result["pairwise"]["pairs"][0]["kappa"] == 0.4
+    assert result["pairwise"]["pairs"][0]["agreement"] == 0.7
+    assert client.get("/api/stats/agreement", headers=headers["expert1"]).status_code == 403
@@ -0,0 +1,68 @@
+"""
+正文文件存储与未引用文件清理（app/blob_store.py）
+"""
+
+import os
+import time
+
+import pytest
+
+from app import blob_store
+from app.models import Document
+from compress_documents import referenced_blob_digests
+
+HOUR = 3600
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_STORE_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setattr(blob_store, "CONTENT_STORAGE", "blob")
+    return blob_store
+
+
+def _put(store, content: str, age_seconds: float = 0) -> str:
+    digest_hex = store.put_blob(content.encode("utf-8")).hex()
+    if age_seconds:
+        past = time.time() - age_seconds
+        os.utime(store.blob_path(digest_hex), (past, past))
+    return digest_hex
+
+
+def test_identical_content_is_stored_once(store):
+    first = _put(store, "相同正文")
+    assert _put(store, "相同正文") == first
+    assert list(store.iter_blob_digests()) == [first]
+    assert store.read_blob(first) == "相同正文"
+
+
+def test_garbage_collection_keeps_recent_and_referenced_files(store):
+    referenced = _put(store, "仍被引用", age_seconds=2 * HOUR)
+    recent = _put(store, "刚写入尚未提交", age_seconds=60)
+    stale = _put(store, "已无引用", age_seconds=2 * HOUR)
+
+    assert store.collect_garbage([referenced], min_age_seconds=HOUR) == 1
+    assert sorted(store.iter_blob_digests()) == sorted([referenced, recent])
+
+    # 缩短最短保留时间后，较新的未引用文件也会被清理
+    assert store.collect_garbage([referenced], min_age_seconds=0) == 1
+    assert list(store.iter_blob_digests()) == [referenced]
+    assert not os.path.exists(store.blob_path(stale))
+
+
+def test_dry_run_deletes_nothing(store):
+    digests = {_put(store, "未引用一", age_seconds=2 * HOUR), _put(store, "未引用二", age_seconds=2 * HOUR)}
+    assert store.collect_garbage([], min_age_seconds=HOUR, dry_run=True) == 2
+    assert set(store.iter_blob_digests()) == digests
+
+
+def test_documents_keep_their_blobs(store, db, make_document):
+    document_id = make_document(source_content="长" * store.BLOB_MIN_SIZE)
+    orphan = _put(store, "孤立正文", age_seconds=2 * HOUR)
+
+    referenced = referenced_blob_digests(db)
+    assert len(referenced) == 1 and orphan not in referenced
+    assert store.collect_garbage(referenced, min_age_seconds=0) == 1
+
+    assert set(store.iter_blob_digests()) == referenced
+    assert db.get(Document, document_id).source_content == "长" * store.BLOB_MIN_SIZE
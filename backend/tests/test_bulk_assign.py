@@ -0,0 +1,94 @@
+"""
+批量分配文档（services/assignment.py，POST /api/documents/assign/bulk）
+"""
+
+from app.models import Document
+from app.services.assignment import interleave, least_loaded_quotas, round_robin_quotas, weighted_quotas
+
+
+def _assignments(db):
+    db.expire_all()
+    return {document.id: document.assigned_to for document in db.query(Document).order_by(Document.id)}
+
+
+def _assign(client, headers, **body):
+    return client.post("/api/documents/assign/bulk", headers=headers["admin"], json=body)
+
+
+def test_quotas():
+    assert round_robin_quotas(7, 3) == [3, 2, 2]
+    assert least_loaded_quotas(5, [3, 0, 1]) == [0, 3, 2]
+    assert weighted_quotas(10, [3.0, 1.0, 1.0]) == [6, 2, 2]
+    assert sum(weighted_quotas(7, [1.0, 1.0, 1.0])) == 7
+    assert weighted_quotas(4, [0.0, 0.0]) == [2, 2]
+    # 每位专家分得的位置均匀分布
+    assert interleave([2, 2]).tolist() == [0, 1, 0, 1]
+    assert interleave([3, 1]).tolist() == [0, 0, 1, 0]
+
+
+def test_round_robin_by_ids(client, headers, users, make_document, db):
+    document_ids = [make_document() for _ in range(5)]
+    expert1, expert2 = users["expert1"].id, users["expert2"].id
+
+    response = _assign(client, headers, document_ids=document_ids, expert_ids=[expert1, expert2])
+    assert response.status_code == 200
+    result = response.json()
+    assert result["assigned"] == 5 and result["total_documents"] == 5
+    assert [expert["assigned"] for expert in result["experts"]] == [3, 2]
+
+    assignments = _assignments(db)
+    assert [assignments[document_id] for document_id in document_ids] == [expert1, expert2, expert1, expert2, expert1]
+
+
+def test_assigned_documents_are_skipped_unless_reassign(client, headers, users, make_document, db):
+    expert1, expert2 = users["expert1"].id, users["expert2"].id
+    taken = make_document(assigned_to=expert1)
+    free = [make_document() for _ in range(2)]
+
+    result = _assign(client, headers, document_ids=[taken, *free, taken], expert_ids=[expert2]).json()
+    assert result["total_documents"] == 2 and result["skipped"] == 1
+    assert _assignments(db) == {taken: expert1, free[0]: expert2, free[1]: expert2}
+
+    result = _assign(client, headers, document_ids=[taken], expert_ids=[expert2], reassign=True).json()
+    assert result["assigned"] == 1
+    assert _assignments(db)[taken] == expert2
+
+
+def test_filter_and_least_loaded(client, headers, users, make_document, db):
+    expert1, expert2 = users["expert1"].id, users["expert2"].id
+    for _ in range(2):
+        make_document(assigned_to=expert1)
+    pending = [make_document() for _ in range(4)]
+    make_document(status="completed")
+
+    result = _assign(client, headers, filter={"status": "pending"}, strategy="least_loaded").json()
+    assert result["total_documents"] == 4
+    by_expert = {expert["expert_id"]: expert for expert in result["experts"]}
+    assert by_expert[expert1]["open_documents"] == 2
+    assert by_expert[expert1]["open_documents_after"] == by_expert[expert2]["open_documents_after"] == 3
+
+    assignments = _assignments(db)
+    assert sorted(assignments[document_id] for document_id in pending) == [expert1, expert2, expert2, expert2]
+
+
+def test_dry_run_writes_nothing(client, headers, users, make_document, db):
+    document_ids = [make_document() for _ in range(3)]
+    result = _assign(client, headers, document_ids=document_ids, dry_run=True).json()
+    assert result["dry_run"] is True and result["assigned"] == 3
+    assert set(_assignments(db).values()) == {None}
+
+
+def test_invalid_requests_return_400(client, headers, users, make_document):
+    document_id = make_document()
+    # 未指定文档、非专家用户、不存在的用户
+    for body in ({"expert_ids": [users["expert1"].id]},
+                 {"document_ids": [document_id], "expert_ids": [users["admin"].id]},
+                 {"document_ids": [document_id], "expert_ids": [999]}):
+        assert _assign(client, headers, **body).status_code == 400, body
+
+
+def test_only_admin_can_bulk_assign(client, headers, make_document):
+    document_id = make_document()
+    response = client.post("/api/documents/assign/bulk", headers=headers["expert1"],
+                           json={"document_ids": [document_id]})
+    assert response.status_code == 403
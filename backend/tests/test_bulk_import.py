@@ -0,0 +1,51 @@
+"""
+JSONL 批量导入（POST /api/documents/bulk）
+"""
+
+import json
+
+
+def _body(documents, trailing_newline=True) -> bytes:
+    body = "\n".join(json.dumps(doc, ensure_ascii=False) for doc in documents)
+    return (body + ("\n" if trailing_newline else "")).encode("utf-8")
+
+
+def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_lines_split_across_chunks(client, headers):
+    documents = [
+        {"title": "短文档", "source_content": "素材", "generated_content": "内容"},
+        {"title": "长文档", "source_content": "长" * 20000, "generated_content": "内容"},
+        {"title": "末行无换行", "source_content": "素材", "generated_content": "内容"},
+    ]
+    # 分块大小不整除行长，且多字节字符会被切开；长行跨越上千个分块
+    response = client.post("/api/documents/bulk", params={"report": "lines"}, headers=headers["admin"],
+                           content=_chunks(_body(documents, trailing_newline=False), 7))
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 3
+    assert [r["line"] for r in result["results"]] == [1, 2, 3]
+
+    listed = client.get("/api/documents/", headers=headers["admin"]).json()
+    assert sorted(doc["title"] for doc in listed) == ["末行无换行", "短文档", "长文档"]
+
+
+def test_invalid_line_reports_its_number(client, headers):
+    body = _body([{"title": "正常", "source_content": "素材", "generated_content": "内容"}]) + b"not json\n"
+    response = client.post("/api/documents/bulk", headers=headers["admin"], content=_chunks(body, 5))
+    result = response.json()
+    assert result["created"] == 1
+    assert [failure["line"] for failure in result["failures"]] == [2]
+
+
+def test_atomic_import_rolls_back_on_failure(client, headers):
+    body = _body([{"title": "正常", "source_content": "素材", "generated_content": "内容"},
+                  {"title": "", "source_content": "素材", "generated_content": "内容"}])
+    response = client.post("/api/documents/bulk", params={"atomic": "true"}, headers=headers["admin"],
+                           content=_chunks(body, 3))
+    result = response.json()
+    assert result["committed"] is False
+    assert client.get("/api/documents/", headers=headers["admin"]).json() == []
@@ -0,0 +1,112 @@
+"""
+正文压缩编解码（app/compression.py 与 CompressedText 列类型）
+"""
+
+import pytest
+from sqlalchemy import text
+
+from app import blob_store, compression
+from app.compression import compress_text, decompress_text, reset_dictionary_cache, train_dictionary
+from app.models import Document
+from app.models.compression import CompressionDictionary
+
+SHORT = "短正文"
+LONG = "本市今年经济运行总体平稳，产业结构持续优化，居民收入稳步增长。" * 40
+
+
+def _add_dictionary(db, codec: str, data: bytes) -> int:
+    dictionary = CompressionDictionary(codec=codec, data=data, sample_count=1)
+    db.add(dictionary)
+    db.commit()
+    reset_dictionary_cache()
+    return dictionary.id
+
+
+@pytest.fixture
+def codec(monkeypatch):
+    def use(name: str):
+        monkeypatch.setattr(compression, "CONTENT_CODEC", name)
+        reset_dictionary_cache()
+    return use
+
+
+def test_short_text_is_stored_raw():
+    packed = compress_text(SHORT)
+    assert packed[0] == compression.RAW
+    assert decompress_text(packed) == SHORT
+
+
+def test_codec_none_stores_raw(codec):
+    codec("none")
+    packed = compress_text(LONG)
+    assert packed[0] == compression.RAW
+    assert decompress_text(packed) == LONG
+
+
+def test_zlib_round_trip():
+    packed = compress_text(LONG)
+    assert packed[0] == compression.ZLIB
+    assert len(packed) < len(LONG.encode("utf-8"))
+    assert decompress_text(packed) == LONG
+
+
+def test_zlib_dictionary_round_trip(db):
+    dict_id = _add_dictionary(db, "zlib", train_dictionary([LONG], codec="zlib"))
+    packed = compress_text(LONG)
+    assert packed[0] == compression.ZLIB_DICT
+    assert compression._DICT_ID.unpack_from(packed, 1)[0] == dict_id
+    # 读取时按ID从数据库加载字典
+    compression._dictionaries.clear()
+    assert decompress_text(packed) == LONG
+
+
+def test_zstd_round_trip(codec):
+    pytest.importorskip("zstandard")
+    codec("zstd")
+    packed = compress_text(LONG)
+    assert packed[0] == compression.ZSTD
+    assert decompress_text(packed) == LONG
+
+
+def test_zstd_dictionary_round_trip(db, codec):
+    pytest.importorskip("zstandard")
+    codec("zstd")
+    samples = [LONG[i:] + str(i) for i in range(0, 400, 7)]
+    _add_dictionary(db, "zstd", train_dictionary(samples, codec="zstd", size=4096))
+    packed = compress_text(LONG)
+    assert packed[0] == compression.ZSTD_DICT
+    compression._dictionaries.clear()
+    assert decompress_text(packed) == LONG
+
+
+def test_blob_reference_round_trip(monkeypatch):
+    monkeypatch.setattr(blob_store, "CONTENT_STORAGE", "blob")
+    content = "大" * blob_store.BLOB_MIN_SIZE
+    packed = compress_text(content)
+    assert packed[0] == compression.BLOB_REF
+    assert len(packed) == compression.BLOB_REF_SIZE
+    assert blob_store.parse_digest(packed) is not None
+    assert decompress_text(packed) == content
+    # 小正文仍存入数据库
+    assert compress_text(SHORT)[0] == compression.RAW
+
+
+def test_legacy_text_is_returned_as_is():
+    assert decompress_text(LONG) == LONG
+
+
+def test_unknown_marker_is_rejected():
+    with pytest.raises(ValueError):
+        decompress_text(b"\x7fdata")
+
+
+def test_compressed_column_round_trip(db, make_document):
+    document_id = make_document(source_content=LONG, generated_content=SHORT)
+    raw = db.execute(text("SELECT source_content, generated_content FROM documents WHERE id = :id"),
+                     {"id": document_id}).one()
+    assert raw.source_content[0] == compression.ZLIB
+    assert raw.generated_content[0] == compression.RAW
+
+    document = db.get(Document, document_id)
+    assert document.source_content == LONG
+    assert document.generated_content == SHORT
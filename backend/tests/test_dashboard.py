@@ -0,0 +1,37 @@
+"""
+统计页接口（GET /api/stats/dashboard）
+"""
+
+from fastapi.responses import JSONResponse
+
+from app.database import SessionLocal
+from app.services.stats import DASHBOARD_SECTIONS, get_dashboard
+
+
+def test_dashboard_bytes_match_json_response(client, headers, users, make_document):
+    for index in range(3):
+        document_id = make_document(assigned_to=users["expert1"].id)
+        client.post(f"/api/annotations/{document_id}", headers=headers["expert1"],
+                    json={"evaluation": index % 2 == 0, "comments": [{"text": "评论", "selection": "内容"}],
+                          "time_spent": 30 + index, "is_completed": index < 2})
+
+    response = client.get("/api/stats/dashboard", headers=headers["admin"], params={"days": 30})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+
+    db = SessionLocal()
+    try:
+        expected = get_dashboard(db, users["admin"].id, list(DASHBOARD_SECTIONS), 30)
+    finally:
+        db.close()
+    assert response.content == JSONResponse(expected).body
+    assert set(response.json()) >= {"overview", "all_users", "temporal"}
+
+
+def test_dashboard_sections_are_checked(client, headers, users):
+    assert client.get("/api/stats/dashboard", headers=headers["expert1"],
+                      params={"sections": "all_users"}).status_code == 403
+    assert client.get("/api/stats/dashboard", headers=headers["admin"],
+                      params={"sections": "unknown"}).status_code == 400
+    response = client.get("/api/stats/dashboard", headers=headers["expert1"], params={"sections": "my_stats"})
+    assert list(response.json()) == ["my_stats"]
@@ -0,0 +1,86 @@
+"""
+近似重复检测（MinHash / LSH，services/dedup.py）
+"""
+
+import random
+
+import numpy as np
+
+from app.models.fingerprint import DocumentFingerprint
+from app.services.dedup import (
+    DUPLICATE_THRESHOLD, estimate_similarity, find_similar_documents, get_duplicate_group_ids,
+    minhash_signature, remove_document_from_index, shingle_hashes
+)
+
+ALPHABET = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处理世车"
+
+
+def make_text(seed: int, length: int = 1500) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def edit(text: str, seed: int, changes: int = 10) -> str:
+    """随机替换少量字符，得到近似重复的文本"""
+    rng = random.Random(seed)
+    chars = list(text)
+    for _ in range(changes):
+        chars[rng.randrange(len(chars))] = rng.choice(ALPHABET)
+    return "".join(chars)
+
+
+def exact_jaccard(a: str, b: str) -> float:
+    first, second = set(shingle_hashes(a).tolist()), set(shingle_hashes(b).tolist())
+    return len(first & second) / len(first | second)
+
+
+def test_signature_is_deterministic_and_ignores_whitespace():
+    text = make_text(1)
+    spaced = " ".join(text[i:i + 40] for i in range(0, len(text), 40))
+    assert np.array_equal(minhash_signature(text), minhash_signature(text))
+    assert np.array_equal(minhash_signature(text), minhash_signature(spaced))
+
+
+def test_similarity_estimates_jaccard():
+    base = make_text(2)
+    for changes in (5, 40, 150):
+        other = edit(base, seed=changes, changes=changes)
+        estimated = estimate_similarity(minhash_signature(base), minhash_signature(other)[None, :])[0]
+        assert abs(estimated - exact_jaccard(base, other)) < 0.12
+    unrelated = estimate_similarity(minhash_signature(base), minhash_signature(make_text(3))[None, :])[0]
+    assert unrelated < 0.1
+
+
+def test_near_duplicates_join_the_earliest_group(db, make_document):
+    base = make_text(4)
+    first = make_document(generated_content=base)
+    second = make_document(generated_content=edit(base, seed=1))
+    third = make_document(generated_content=edit(base, seed=2))
+    unrelated = make_document(generated_content=make_text(5))
+
+    fingerprints = {fp.document_id: fp for fp in db.query(DocumentFingerprint)}
+    assert fingerprints[first].duplicate_of is None
+    assert fingerprints[second].duplicate_of == first
+    # 第三篇与前两篇都相似，归入代表文档（而不是指向第二篇）
+    assert fingerprints[third].duplicate_of == first
+    assert fingerprints[second].similarity >= DUPLICATE_THRESHOLD
+    assert fingerprints[unrelated].duplicate_of is None
+    assert get_duplicate_group_ids(db, third) == [first, second, third]
+
+    similar = find_similar_documents(db, first)
+    assert {item["document_id"] for item in similar} == {second, third}
+    assert similar == sorted(similar, key=lambda item: -item["similarity"])
+
+
+def test_removing_group_root_promotes_earliest_member(db, make_document):
+    base = make_text(6)
+    first = make_document(generated_content=base)
+    second = make_document(generated_content=edit(base, seed=3))
+    third = make_document(generated_content=edit(base, seed=4))
+
+    remove_document_from_index(db, first)
+    db.commit()
+    fingerprints = {fp.document_id: fp for fp in db.query(DocumentFingerprint)}
+    assert first not in fingerprints
+    assert fingerprints[second].duplicate_of is None
+    assert fingerprints[third].duplicate_of == second
@@ -0,0 +1,53 @@
+"""
+文档列表接口的快速编码路径（FastJSONResponse）与声明的 response_model 一致
+
+/api/documents/、/available 和 /my/assigned 直接编码查询得到的行，跳过 response_model 的校验和过滤；
+这里按 List[DocumentList] 校验并序列化，结果须与接口返回的内容（含字段顺序）完全相同。
+"""
+
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from app.schemas.document import DocumentList
+
+DOCUMENT_LIST = TypeAdapter(List[DocumentList])
+
+# 足够长的相同正文，三篇文档归入同一重复组
+DUPLICATE_TEXT = "".join(chr(0x4E00 + (i * 7919) % 2000) for i in range(1500))
+
+
+@pytest.fixture
+def documents(client, headers, users, make_document):
+    expert = users["expert1"].id
+    make_document(generated_content=DUPLICATE_TEXT)
+    duplicate = make_document(generated_content=DUPLICATE_TEXT, assigned_to=expert)
+    make_document(generated_content=DUPLICATE_TEXT)
+    make_document(assigned_to=expert)
+    make_document()
+    response = client.post(f"/api/annotations/{duplicate}", headers=headers["expert1"], json={
+        "evaluation": True, "comments": [], "time_spent": 5, "is_completed": True
+    })
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("path, username, count", [
+    ("/api/documents/", "admin", 5),
+    ("/api/documents/", "expert1", 5),
+    ("/api/documents/available", "expert1", 3),
+    ("/api/documents/my/assigned", "expert1", 2),
+])
+def test_fast_path_matches_response_model(client, headers, documents, path, username, count):
+    response = client.get(path, headers=headers[username])
+    assert response.status_code == 200
+    items = response.json()
+    assert len(items) == count
+    assert DOCUMENT_LIST.dump_python(DOCUMENT_LIST.validate_python(items, strict=True), mode="json") == items
+    for item in items:
+        assert list(item) == list(DocumentList.model_fields)
+    # 可选字段确实出现了非空值
+    if path != "/api/documents/available":
+        assert any(item["assigned_to"] for item in items)
+        assert any(item["annotation_status"] for item in items)
+    assert any(item["duplicate_of"] for item in items)
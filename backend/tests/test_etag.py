@@ -0,0 +1,71 @@
+"""
+文档详情与正文接口的ETag / 304
+"""
+
+import pytest
+
+
+@pytest.fixture
+def document_id(make_document, users):
+    return make_document(source_content="原始素材。" * 100, generated_content="生成内容。" * 100,
+                         assigned_to=users["expert1"].id)
+
+
+def _get(client, headers, url, if_none_match=None, **params):
+    request_headers = dict(headers)
+    if if_none_match is not None:
+        request_headers["If-None-Match"] = if_none_match
+    return client.get(url, headers=request_headers, params=params)
+
+
+def test_matching_etag_returns_304(client, headers, document_id):
+    url = f"/api/documents/{document_id}"
+    response = _get(client, headers["admin"], url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        cached = _get(client, headers["admin"], url, if_none_match)
+        assert cached.status_code == 304, if_none_match
+        assert cached.headers["ETag"] == etag
+        assert cached.content == b""
+
+    assert _get(client, headers["admin"], url, '"other"').status_code == 200
+
+
+def test_etag_depends_on_role_and_content_mode(client, headers, document_id):
+    url = f"/api/documents/{document_id}"
+    admin = _get(client, headers["admin"], url).headers["ETag"]
+    expert = _get(client, headers["expert1"], url).headers["ETag"]
+    by_url = _get(client, headers["admin"], url, content="url").headers["ETag"]
+    assert len({admin, expert, by_url}) == 3
+    assert _get(client, headers["expert1"], url, admin).status_code == 200
+
+
+def test_annotation_save_changes_etag(client, headers, document_id):
+    url = f"/api/documents/{document_id}"
+    before = {role: _get(client, headers[role], url).headers["ETag"] for role in ("admin", "expert1")}
+
+    response = client.post(f"/api/annotations/{document_id}", headers=headers["expert1"],
+                           json={"evaluation": True, "comments": [{"text": "评论", "selection": "素材"}],
+                                 "time_spent": 5})
+    assert response.status_code == 200
+
+    for role in ("admin", "expert1"):
+        response = _get(client, headers[role], url, before[role])
+        assert response.status_code == 200
+        assert response.headers["ETag"] != before[role]
+    assert response.json()["comments"] == [{"text": "评论", "selection": "素材"}]
+
+    # 同一秒内再次保存（updated_at 相同）也得到新的ETag
+    etag = response.headers["ETag"]
+    client.post(f"/api/annotations/{document_id}", headers=headers["expert1"],
+                json={"evaluation": False, "comments": [], "time_spent": 1})
+    assert _get(client, headers["expert1"], url, etag).status_code == 200
+
+
+def test_content_and_paragraph_etags(client, headers, document_id):
+    for url in (f"/api/documents/{document_id}/content/source", f"/api/documents/{document_id}/paragraphs"):
+        response = _get(client, headers["expert1"], url)
+        assert response.status_code == 200
+        assert _get(client, headers["expert1"], url, response.headers["ETag"]).status_code == 304
@@ -0,0 +1,135 @@
+"""
+文档领取租约（services/lease.py，POST /api/documents/next 与 /{id}/lease）
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.database import SessionLocal
+from app.models import Document
+from app.services import lease
+from app.services.lease import lease_next_document
+
+
+def _lease_state(db, document_id):
+    db.expire_all()
+    document = db.get(Document, document_id)
+    return document.assigned_to, document.lease_expires_at
+
+
+def test_next_leases_documents_in_order(client, headers, users, make_document, db):
+    first, second = make_document(), make_document()
+
+    response = client.post("/api/documents/next", headers=headers["expert1"])
+    assert response.status_code == 200
+    assert response.json()["document_id"] == first
+    assigned_to, expires_at = _lease_state(db, first)
+    assert assigned_to == users["expert1"].id
+    assert expires_at > datetime.utcnow()
+
+    # 已持有未完成的租约时返回同一篇
+    assert client.post("/api/documents/next", headers=headers["expert1"]).json()["document_id"] == first
+    assert client.post("/api/documents/next", headers=headers["expert2"]).json()["document_id"] == second
+    assert client.post("/api/documents/next", headers=headers["admin"]).status_code == 403
+
+
+
+def test_no_document_available(client, headers, users, make_document):
+    make_document(assigned_to=users["expert2"].id)
+    assert client.post("/api/documents/next", headers=headers["expert1"]).status_code == 404
+
+
+def test_concurrent_claims_get_different_documents(users, make_document):
+    document_ids = [make_document() for _ in range(4)]
+    expert_ids = [users["expert1"].id, users["expert2"].id]
+    claimed, errors = [], []
+    start = threading.Barrier(len(expert_ids))
+
+    def claim(user_id):
+        db = SessionLocal()
+        try:
+            start.wait()
+            document = lease_next_document(db, user_id)
+            claimed.append((user_id, document.id))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=claim, args=(user_id,)) for user_id in expert_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert sorted(document_id for _, document_id in claimed) == document_ids[:2]
+
+
+def test_conditional_update_skips_documents_taken_meanwhile(db, users, make_document, monkeypatch):
+    """不支持 UPDATE ... RETURNING 时逐个尝试候选文档，已被其他连接领取的候选不会被覆盖"""
+    first, second = make_document(), make_document()
+    monkeypatch.setattr(db.get_bind().dialect, "update_returning", False)
+    # 候选已读出后，第一篇被手动认领
+    original = lease._CANDIDATES_SQL
+
+    def taken_meanwhile(session, sql):
+        if sql == original:
+            session.execute(text("UPDATE documents SET assigned_to = :user_id WHERE id = :id"),
+                            {"user_id": users["expert2"].id, "id": first})
+        return lease.text(sql.format(source="documents"))
+
+    monkeypatch.setattr(lease, "_claimable_sql", taken_meanwhile)
+    document = lease_next_document(db, users["expert1"].id)
+    assert document.id == second
+    assert _lease_state(db, first) == (users["expert2"].id, None)
+
+
+def test_renew_and_release_require_the_lease(client, headers, users, make_document, db):
+    document_id = make_document()
+    client.post("/api/documents/next", headers=headers["expert1"])
+    _, expires_at = _lease_state(db, document_id)
+
+    assert client.post(f"/api/documents/{document_id}/lease", headers=headers["expert2"]).status_code == 409
+    assert client.delete(f"/api/documents/{document_id}/lease", headers=headers["expert2"]).status_code == 409
+
+    response = client.post(f"/api/documents/{document_id}/lease", headers=headers["expert1"])
+    assert response.status_code == 200
+    assert _lease_state(db, document_id)[1] >= expires_at
+
+    assert client.delete(f"/api/documents/{document_id}/lease", headers=headers["expert1"]).status_code == 200
+    assert _lease_state(db, document_id) == (None, None)
+    assert client.delete(f"/api/documents/{document_id}/lease", headers=headers["expert1"]).status_code == 409
+
+
+def test_manual_assignment_has_no_lease(client, headers, users, make_document):
+    document_id = make_document(assigned_to=users["expert1"].id)
+    assert client.post(f"/api/documents/{document_id}/lease", headers=headers["expert1"]).status_code == 409
+
+    unassigned = make_document()
+    assert client.post(f"/api/documents/claim/{unassigned}", headers=headers["expert2"]).status_code == 200
+    assert client.post(f"/api/documents/claim/{unassigned}", headers=headers["expert1"]).status_code == 400
+    assert client.post(f"/api/documents/{unassigned}/lease", headers=headers["expert2"]).status_code == 409
+
+
+def test_expired_leases_are_reclaimed(db, users, make_document):
+    document_id = make_document()
+    expert1, expert2 = users["expert1"].id, users["expert2"].id
+    assert lease_next_document(db, expert1).id == document_id
+    db.execute(text("UPDATE documents SET lease_expires_at = :past WHERE id = :id"),
+               {"past": datetime.utcnow() - timedelta(minutes=1), "id": document_id})
+    db.commit()
+
+    assert lease_next_document(db, expert2).id == document_id
+    assert _lease_state(db, document_id)[0] == expert2
+
+
+def test_completed_annotation_keeps_the_document(client, headers, users, make_document, db):
+    document_id = make_document()
+    client.post("/api/documents/next", headers=headers["expert1"])
+    response = client.post(f"/api/annotations/{document_id}", headers=headers["expert1"],
+                           json={"evaluation": True, "comments": [], "time_spent": 3, "is_completed": True})
+    assert response.status_code == 200
+    assert _lease_state(db, document_id) == (users["expert1"].id, None)
+    assert client.delete(f"/api/documents/{document_id}/lease", headers=headers["expert1"]).status_code == 409
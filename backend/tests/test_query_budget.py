@@ -0,0 +1,89 @@
+"""
+接口查询预算（app/querylog.py 的 track_queries）
+
+列表和统计接口的SQL语句数应与返回行数无关，同一语句不应在循环中逐行执行（N+1）。
+预算与 benchmarks/query_budget.py 一致；认证依赖被替换，不计入用户查询。
+"""
+
+import random
+
+import pytest
+from sqlalchemy import insert, text
+
+from app.models import Annotation, Document
+from app.querylog import QueryBudgetExceeded, track_queries
+from app.services.auth import get_current_user
+from main import app
+
+DOCUMENTS = 60
+MAX_REPEATS = 3
+BUDGETS = [
+    ("admin", "/api/documents/", 6),
+    ("admin", "/api/documents/?annotation_status=进行中&sort=updated_at&order=desc", 6),
+    ("expert1", "/api/documents/", 6),
+    ("expert1", "/api/documents/my/assigned", 6),
+    ("expert1", "/api/documents/available", 6),
+    ("expert1", "/api/documents/1", 10),
+    ("admin", "/api/stats/overview", 6),
+    ("expert1", "/api/stats/my-stats", 6),
+    ("admin", "/api/stats/all-users", 6),
+    ("admin", "/api/stats/temporal", 6),
+    ("admin", "/api/stats/user-activity", 6),
+    ("admin", "/api/stats/document-completion", 6),
+    ("admin", "/api/stats/approval-analysis", 6),
+    ("admin", "/api/stats/dashboard", 10),
+    ("expert1", "/api/stats/dashboard", 10),
+]
+
+
+@pytest.fixture
+def seeded(db, users):
+    """一半文档分配给 expert1，两位专家各标注约一半文档"""
+    rng = random.Random(0)
+    expert1, expert2 = users["expert1"].id, users["expert2"].id
+    db.execute(insert(Document), [
+        {"title": f"文档{i}", "source_content": "原文", "generated_content": "生成内容", "status": "pending",
+         "assigned_to": expert1 if i % 2 == 0 else None}
+        for i in range(DOCUMENTS)
+    ])
+    db.execute(insert(Annotation), [
+        {"document_id": document_id, "annotator_id": annotator_id, "evaluation": rng.random() < 0.7,
+         "time_spent": rng.randint(30, 900), "is_completed": rng.random() < 0.8}
+        for document_id in range(1, DOCUMENTS + 1)
+        for annotator_id in (expert1, expert2) if rng.random() < 0.5
+    ])
+    db.commit()
+    yield users
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("role, path, max_queries", BUDGETS)
+def test_endpoint_within_query_budget(client, seeded, role, path, max_queries):
+    app.dependency_overrides[get_current_user] = lambda: seeded[role]
+    with track_queries(max_queries=max_queries, max_repeats=MAX_REPEATS, label=path):
+        response = client.get(path)
+    assert response.status_code == 200
+    if path == "/api/documents/":
+        # 专家可见分配给自己和未分配的文档，这里即全部文档
+        assert len(response.json()) == DOCUMENTS
+
+
+def test_exceeding_budget_raises(db, seeded):
+    with pytest.raises(QueryBudgetExceeded, match="语句数"):
+        with track_queries(max_queries=2):
+            for _ in range(3):
+                db.execute(text("SELECT 1")).all()
+
+
+def test_repeated_statement_is_reported_as_n_plus_one(db, seeded):
+    # 逐行查询标注者：同一语句（参数不同）执行多次
+    with pytest.raises(QueryBudgetExceeded, match="疑似N\\+1") as error:
+        with track_queries(max_repeats=MAX_REPEATS):
+            for document in db.query(Document).limit(10).all():
+                db.execute(text("SELECT COUNT(*) FROM annotations WHERE document_id = :id"), {"id": document.id})
+    assert "annotations WHERE document_id" in str(error.value)
+
+    # IN 列表长度不同的语句按同一形状计数，但一次批量查询只算一条
+    with track_queries(max_queries=2, max_repeats=1) as stats:
+        db.query(Annotation).filter(Annotation.document_id.in_(list(range(1, DOCUMENTS + 1)))).all()
+    assert stats.queries == 1
@@ -0,0 +1,130 @@
+"""
+文档全文检索（无内容FTS5表，services/search.py）与检索表迁移（r0004）
+"""
+
+from sqlalchemy import text
+
+from app.compression import compress_text
+from app.database import engine
+from app.migrations import r0004_contentless_search_index as r0004
+from app.models.search import SEARCH_TABLE, detect_search_index, is_search_index_available
+from app.services.ingest import ingest_batch
+from app.services.search import search_documents
+
+
+def _ids(page):
+    return [item["id"] for item in page["items"]]
+
+
+def test_search_index_stores_no_content(db, make_document):
+    assert is_search_index_available()
+    sql = db.execute(text("SELECT sql FROM sqlite_master WHERE name = :name"), {"name": SEARCH_TABLE}).scalar()
+    assert "content = ''" in sql
+    document_id = make_document(source_content="关于城市更新的调研报告")
+    row = db.execute(text(f"SELECT rowid, source_content FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH '城市更新'")).one()
+    assert row.rowid == document_id and row.source_content is None
+
+
+def test_long_terms_ranked_with_snippet(db, make_document):
+    in_title = make_document(title="城市更新专题", source_content="正文")
+    in_body = make_document(source_content="前文" * 20 + "城市更新的进展" + "后文" * 20)
+    make_document(source_content="无关内容")
+
+    page = search_documents(db, "城市更新", user_role="admin")
+    # 标题权重更高
+    assert _ids(page) == [in_title, in_body]
+    assert page["items"][0]["snippet"] == "<mark>城市更新</mark>专题"
+    snippet = page["items"][1]["snippet"]
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "<mark>城市更新</mark>的进展" in snippet
+    assert len(snippet) < 100
+
+    assert _ids(search_documents(db, "城市更新", field="source", user_role="admin")) == [in_body]
+
+
+def test_short_terms_filter_decompressed_content(db, make_document):
+    long_text = "城市更新的进展。" * 100
+    both = make_document(source_content=long_text + "人口")
+    make_document(source_content=long_text)
+    short_only = make_document(title="人口普查", source_content="素材")
+
+    # 长短检索词混合：索引命中后按正文过滤短检索词
+    assert _ids(search_documents(db, "城市更新 人口", user_role="admin")) == [both]
+    # 只有短检索词：按文档顺序扫描
+    assert _ids(search_documents(db, "人口", user_role="admin")) == [both, short_only]
+    assert _ids(search_documents(db, "人口", field="title", user_role="admin")) == [short_only]
+    assert _ids(search_documents(db, "人口", field="generated", user_role="admin")) == []
+    assert "<mark>人口</mark>" in search_documents(db, "人口", user_role="admin")["items"][0]["snippet"]
+
+
+def test_cursor_pages_through_filtered_results(db, make_document, monkeypatch):
+    from app.services import search
+    monkeypatch.setattr(search, "SEARCH_SCAN_BATCH", 3)
+    expected = []
+    for index in range(10):
+        source = "城市更新" + ("人口" if index % 2 else "")
+        document_id = make_document(source_content=source)
+        if index % 2:
+            expected.append(document_id)
+
+    for query in ("城市更新 人口", "人口"):
+        found, cursor = [], None
+        while True:
+            page = search_documents(db, query, limit=2, cursor=cursor, user_role="admin")
+            found.extend(_ids(page))
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert sorted(found) == expected, query
+
+
+def test_expert_sees_only_accessible_documents(db, make_document, users):
+    mine = make_document(source_content="城市更新", assigned_to=users["expert1"].id)
+    make_document(source_content="城市更新", assigned_to=users["expert2"].id)
+    unassigned = make_document(source_content="城市更新")
+    page = search_documents(db, "城市更新", user_id=users["expert1"].id, user_role="expert")
+    assert sorted(_ids(page)) == [mine, unassigned]
+
+
+def test_overwrite_removes_old_entry(db, make_document):
+    old_id = make_document(title="同名文档", source_content="旧版本的独特内容" * 50)
+    result = ingest_batch(db, [(1, {"title": "同名文档", "source_content": "新版本的正文",
+                                    "generated_content": "生成内容"})], overwrite=True)[0]
+    assert result["replaced"] == old_id
+
+    assert search_documents(db, "旧版本", user_role="admin")["items"] == []
+    assert _ids(search_documents(db, "新版本", user_role="admin")) == [result["document_id"]]
+    db.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('integrity-check')"))
+
+
+def test_migration_replaces_table_with_content_copies(db):
+    # 迁移前的检索表：保存正文副本，由 create_all 钩子创建
+    db.execute(text(f"DROP TABLE {SEARCH_TABLE}"))
+    db.execute(text(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(title, source_content, generated_content, tokenize = 'trigram')"
+    ))
+    for document_id in range(1, 6):
+        db.execute(text(
+            "INSERT INTO documents (id, title, source_content, generated_content, status) "
+            "VALUES (:id, :title, :source, :generated, 'pending')"
+        ), {"id": document_id, "title": f"文档{document_id}",
+            "source": compress_text(f"第{document_id}篇的城市更新报告" * 30), "generated": compress_text("生成内容")})
+        db.execute(text(f"INSERT INTO {SEARCH_TABLE} (rowid, title) VALUES (:id, :title)"),
+                   {"id": document_id, "title": f"文档{document_id}"})
+    db.commit()
+    with engine.connect() as connection:
+        # 旧表在迁移完成前不使用
+        assert not detect_search_index(connection)
+
+    messages = []
+    r0004.upgrade(engine, log=messages.append)
+    # 重复执行不会重复写入
+    r0004.upgrade(engine)
+    with engine.connect() as connection:
+        assert detect_search_index(connection)
+
+    assert db.execute(text(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")).scalar() == 5
+    page = search_documents(db, "第3篇", user_role="admin")
+    assert _ids(page) == [3]
+    assert page["items"][0]["snippet"].startswith("<mark>第3篇</mark>的城市更新报告")
+    assert any("已回填 5 行" in message for message in messages)
@@ -0,0 +1,119 @@
+"""
+全文检索在跳过结构检查的进程中仍然可用
+
+SKIP_SCHEMA_CHECK=1 时进程不执行 create_all，检索表是否可用须按数据库中的实际状态判断；
+否则文档检索退化为标题LIKE、评论检索返回400，写入也不再同步检索表。
+服务在子进程中启动（配置在导入 app 时读取），通过HTTP请求验证。
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_TIMEOUT = 60
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _env(database, **extra) -> dict:
+    return {**os.environ, "DATABASE_URL": f"sqlite:///{database}", "WARMUP": "", **extra}
+
+
+@pytest.fixture
+def seeded_database(tmp_path):
+    """已建表并写入测试数据的数据库（init_data.py）"""
+    database = tmp_path / "database.db"
+    subprocess.run([sys.executable, "init_data.py"], cwd=BACKEND_DIR, env=_env(database),
+                   check=True, capture_output=True)
+    return database
+
+
+def _serve(args, env, port: int) -> subprocess.Popen:
+    process = subprocess.Popen(args, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"服务启动失败，退出码 {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    _stop(process)
+    raise RuntimeError("服务启动超时")
+
+
+def _stop(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _login(client: httpx.Client, username: str, password: str) -> dict:
+    response = client.post("/api/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def check_search(client: httpx.Client):
+    """检索已有文档，并检索服务启动后新建的文档和保存的评论"""
+    admin = _login(client, "admin", "admin123")
+    expert = _login(client, "expert1", "expert123")
+
+    response = client.get("/api/documents/search", params={"q": "北京市", "field": "source"}, headers=admin)
+    assert response.status_code == 200
+    assert [item["title"] for item in response.json()["items"]] == ["2023年北京市经济发展概况"]
+
+    response = client.post("/api/documents/", headers=admin, json={
+        "title": "新建文档", "source_content": "正文中的独特短语甲乙丙", "generated_content": "生成内容"
+    })
+    assert response.status_code == 200
+    document_id = response.json()["id"]
+    response = client.get("/api/documents/search", params={"q": "独特短语甲乙丙"}, headers=admin)
+    assert [item["id"] for item in response.json()["items"]] == [document_id]
+
+    response = client.post(f"/api/annotations/{document_id}", headers=expert, json={
+        "evaluation": True, "comments": [{"text": "评论里的独特说法丁戊己", "selection": "独特短语"}],
+        "time_spent": 5
+    })
+    assert response.status_code == 200
+    response = client.get("/api/annotations/search", params={"q": "独特说法丁戊己"}, headers=admin)
+    assert response.status_code == 200
+    assert [item["document_id"] for item in response.json()["items"]] == [document_id]
+
+
+def test_search_with_skip_schema_check(seeded_database):
+    port = _free_port()
+    process = _serve([sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+                     _env(seeded_database, SKIP_SCHEMA_CHECK="1"), port)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            check_search(client)
+    finally:
+        _stop(process)
+
+
+def test_search_with_multiple_workers(seeded_database):
+    """WORKERS>1：主进程检查结构后以 SKIP_SCHEMA_CHECK=1 启动各工作进程"""
+    port = _free_port()
+    process = _serve([sys.executable, "main.py"], _env(seeded_database, WORKERS="2", PORT=str(port)), port)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            check_search(client)
+    finally:
+        _stop(process)
@@ -0,0 +1,92 @@
+"""
+写事务排队（write_lock.py）与连接池上限（database.py）
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.database import engine
+from app.write_lock import CoordinatedConnection
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "lock.db")
+    with sqlite3.connect(path) as conn:
+        execute(conn, "CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT)")
+    return path
+
+
+def connect(path) -> sqlite3.Connection:
+    return sqlite3.connect(path, factory=CoordinatedConnection, timeout=5, check_same_thread=False)
+
+
+def execute(conn, sql: str) -> list:
+    # 与 SQLAlchemy 一样经 cursor() 执行（Connection.execute 不使用重写的 cursor 工厂）
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    return cursor.fetchall()
+
+
+def test_second_connection_on_same_thread_fails_immediately(db_path):
+    first, second = connect(db_path), connect(db_path)
+    try:
+        execute(first, "INSERT INTO items (value) VALUES ('a')")
+        start = time.perf_counter()
+        with pytest.raises(sqlite3.OperationalError, match="database is locked"):
+            execute(second, "INSERT INTO items (value) VALUES ('b')")
+        assert time.perf_counter() - start < 1
+        first.commit()
+        # 第一个事务结束后同一线程可以再次写入
+        execute(second, "INSERT INTO items (value) VALUES ('b')")
+        second.commit()
+        assert [row[0] for row in execute(first, "SELECT value FROM items ORDER BY id")] == ["a", "b"]
+    finally:
+        first.close()
+        second.close()
+
+
+def test_other_thread_waits_for_commit(db_path):
+    first, second = connect(db_path), connect(db_path)
+    done = threading.Event()
+
+    def write():
+        execute(second, "INSERT INTO items (value) VALUES ('b')")
+        second.commit()
+        done.set()
+
+    try:
+        execute(first, "INSERT INTO items (value) VALUES ('a')")
+        thread = threading.Thread(target=write)
+        thread.start()
+        assert not done.wait(0.3)
+        first.commit()
+        thread.join(5)
+        assert done.is_set()
+        assert [row[0] for row in execute(first, "SELECT value FROM items ORDER BY id")] == ["a", "b"]
+    finally:
+        first.close()
+        second.close()
+
+
+def test_transaction_released_on_another_thread(db_path):
+    """事务可以在取得写锁之外的线程中提交（例如异步接口的依赖清理）"""
+    conn = connect(db_path)
+    try:
+        execute(conn, "INSERT INTO items (value) VALUES ('a')")
+        thread = threading.Thread(target=conn.commit)
+        thread.start()
+        thread.join(5)
+        execute(conn, "INSERT INTO items (value) VALUES ('b')")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_connection_pool_is_bounded():
+    assert engine.pool.size() > 0
+    assert engine.pool._max_overflow >= 0
+    assert engine.pool._timeout > 0
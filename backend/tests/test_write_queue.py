@@ -0,0 +1,124 @@
+"""
+标注保存的组提交队列（services/write_queue.py）
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.models import Annotation
+from app.services import write_queue
+from app.services.annotation import AnnotationSave
+from app.services.write_queue import AnnotationWriteQueue
+
+
+@pytest.fixture
+def writer():
+    """收集窗口足够长的队列，同一批的保存确定地合并"""
+    queue = AnnotationWriteQueue(window=0.2)
+    yield queue
+    queue.stop()
+
+
+def make_save(document_id, user_id, time_spent=100, evaluation=True, is_completed=False, comment=None):
+    comments = json.dumps([{"text": comment, "selection": ""}]) if comment else "[]"
+    return AnnotationSave(document_id, user_id, evaluation, comments, time_spent, is_completed)
+
+
+def annotation_of(db, document_id, user_id):
+    db.expire_all()
+    return db.query(Annotation).filter_by(document_id=document_id, annotator_id=user_id).one_or_none()
+
+
+def test_saves_for_one_annotation_are_merged(writer, db, users, make_document):
+    document_id, other_id = make_document(), make_document()
+    expert = users["expert1"].id
+    writer.submit(make_save(document_id, expert, time_spent=5)).result(5)
+
+    futures = [
+        writer.submit(make_save(document_id, expert, time_spent=10, comment="第一次")),
+        writer.submit(make_save(other_id, expert, time_spent=7)),
+        writer.submit(make_save(document_id, expert, time_spent=20, evaluation=False, comment="最后一次")),
+    ]
+    results = [future.result(5) for future in futures]
+    assert writer.batches == 2
+    assert results[0] == results[2] != results[1]
+
+    annotation = annotation_of(db, document_id, expert)
+    assert annotation.id == results[0]
+    # 用时累加，其余字段取最后一次
+    assert annotation.time_spent == 35
+    assert annotation.evaluation is False
+    assert json.loads(annotation.comments)[0]["text"] == "最后一次"
+    assert annotation_of(db, other_id, expert).time_spent == 7
+
+
+def test_cancelled_save_is_skipped(writer, db, users, make_document):
+    """客户端断开时 asyncio.wrap_future 取消 Future：未写入的保存跳过，同批其他保存只提交一次"""
+    first_id, second_id = make_document(), make_document()
+    expert = users["expert1"].id
+
+    async def save_both():
+        first = asyncio.ensure_future(asyncio.wrap_future(writer.submit(make_save(first_id, expert))))
+        second = asyncio.wrap_future(writer.submit(make_save(second_id, expert)))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await asyncio.wait_for(second, 5)
+
+    annotation_id = asyncio.run(save_both())
+    assert annotation_of(db, first_id, expert) is None
+    annotation = annotation_of(db, second_id, expert)
+    assert annotation.id == annotation_id
+    assert annotation.time_spent == 100
+
+    # 写线程仍在运行
+    assert writer.submit(make_save(first_id, expert, time_spent=1)).result(5)
+    assert annotation_of(db, first_id, expert).time_spent == 1
+
+
+def test_committed_batch_is_not_retried(writer, db, users, make_document, monkeypatch):
+    document_id = make_document()
+    expert = users["expert1"].id
+
+    def fail(saved):
+        raise RuntimeError("推送失败")
+
+    monkeypatch.setattr(write_queue, "publish_saved", fail)
+    assert writer.submit(make_save(document_id, expert)).result(5)
+    assert annotation_of(db, document_id, expert).time_spent == 100
+
+
+def test_failed_save_does_not_affect_others(writer, db, users, make_document, monkeypatch):
+    good_id, bad_id = make_document(), make_document()
+    expert = users["expert1"].id
+    save_annotations = write_queue.save_annotations
+
+    def save_or_fail(session, saves):
+        if any(save.document_id == bad_id for save in saves):
+            raise ValueError("无法保存")
+        return save_annotations(session, saves)
+
+    monkeypatch.setattr(write_queue, "save_annotations", save_or_fail)
+    good = writer.submit(make_save(good_id, expert))
+    bad = writer.submit(make_save(bad_id, expert))
+    assert good.result(5)
+    with pytest.raises(ValueError):
+        bad.result(5)
+    assert annotation_of(db, good_id, expert).time_spent == 100
+    assert annotation_of(db, bad_id, expert) is None
+
+
+def test_writer_survives_unexpected_errors(writer, db, users, make_document, monkeypatch):
+    document_id = make_document()
+    expert = users["expert1"].id
+
+    def broken(batch):
+        raise RuntimeError("写线程内部错误")
+
+    monkeypatch.setattr(writer, "_write", broken)
+    with pytest.raises(RuntimeError):
+        writer.submit(make_save(document_id, expert)).result(5)
+    monkeypatch.undo()
+    assert writer.submit(make_save(document_id, expert)).result(5)
+    assert annotation_of(db, document_id, expert).time_spent == 100
@@ -47,20 +47,16 @@ const StatsPage: React.FC = () => {
     try {
       setLoading(true);
       setError(null);
-      const overviewPromise = api.get('/stats/overview');
-      const myStatsPromise = api.get('/stats/my-stats');
-      const documentPromise = api.get('/stats/document-completion');
-      const approvalPromise = api.get('/stats/approval-analysis');
-
-      const [overviewRes, myStatsRes, documentRes, approvalRes] = await Promise.all([
-        overviewPromise, myStatsPromise, documentPromise, approvalPromise
-      ]);
+      // 各项统计一次请求获取，取自同一数据快照
+      const res = await api.get('/stats/dashboard', {
+        params: { sections: 'overview,my_stats,document_completion,approval_analysis' }
+      });
 
       setStats({
-        overview: overviewRes.data,
-        my_stats: myStatsRes.data,
-        document_stats: documentRes.data,
-        approval_analysis: approvalRes.data
+        overview: res.data.overview,
+        my_stats: res.data.my_stats,
+        document_stats: res.data.document_completion,
+        approval_analysis: res.data.approval_analysis
       });
     } catch (error) {
       console.error('Failed to fetch stats:', error);